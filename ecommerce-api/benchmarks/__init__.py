@@ -0,0 +1,7 @@
+"""
+Benchmarks for the store.
+
+Each module is a script run from the ecommerce-api directory, e.g.
+``python -m benchmarks.bench_import``. They run against a throwaway test
+database created from the migrations, never against db.sqlite3.
+"""
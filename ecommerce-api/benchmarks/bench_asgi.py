@@ -0,0 +1,136 @@
+"""
+Compares the WSGI application with the ASGI application and its native async views.
+
+Requests are driven in-process: the WSGI app from a thread pool (like a threaded WSGI server)
+and the ASGI app from one event loop with a bounded number of requests in flight (like uvicorn).
+
+    python -m benchmarks.bench_asgi --requests 2000 --concurrency 32
+"""
+import argparse
+import asyncio
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.harness import benchmark_database, setup_django, summarize
+
+SYNC_PATHS = ['/api/items/?limit=50', '/api/cart/view/{user}/', '/api/admin/stats/']
+ASYNC_PATHS = ['/api/async/items/?limit=50', '/api/async/cart/view/{user}/', '/api/async/admin/stats/']
+
+
+def seed(items, users):
+    from store.models import Cart, Item
+
+    Item.objects.bulk_create([
+        Item(item_id=f'ITEM{i}', name=f'Item {i}', description='Benchmark item', price=1 + i % 100)
+        for i in range(items)
+    ])
+    item_pks = list(Item.objects.values_list('pk', flat=True)[:5])
+    Cart.objects.bulk_create([
+        Cart(user_id=f'user{u}', item_id=pk, quantity=1) for u in range(users) for pk in item_pks
+    ])
+
+
+def request_paths(templates, count, users):
+    return [templates[i % len(templates)].format(user=f'user{i % users}') for i in range(count)]
+
+
+def run_wsgi(application, paths, concurrency):
+    def call(path):
+        path_info, _, query_string = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path_info,
+            'QUERY_STRING': query_string,
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'wsgi.input': io.BytesIO(),
+            'wsgi.errors': io.StringIO(),
+            'wsgi.url_scheme': 'http',
+        }
+        started = time.perf_counter()
+        statuses = []
+        body = b''.join(application(environ, lambda status, headers: statuses.append(status)))
+        assert statuses[0].startswith('200'), (path, statuses[0], body[:200])
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        latencies = list(pool.map(call, paths))
+    return latencies, time.perf_counter() - started
+
+
+def run_asgi(application, paths, concurrency):
+    async def call(path, semaphore):
+        path_info, _, query_string = path.partition('?')
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path_info,
+            'query_string': query_string.encode(),
+            'headers': [(b'host', b'testserver')],
+            'server': ('testserver', 80),
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        async with semaphore:
+            started = time.perf_counter()
+            await application(scope, receive, send)
+            elapsed = time.perf_counter() - started
+        assert messages[0]['status'] == 200, (path, messages)
+        return elapsed
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(*[call(path, semaphore) for path in paths])
+
+    started = time.perf_counter()
+    latencies = asyncio.run(main())
+    return latencies, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--items', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.asgi import get_asgi_application
+    from django.core.wsgi import get_wsgi_application
+
+    with benchmark_database():
+        seed(args.items, args.users)
+        wsgi = get_wsgi_application()
+        asgi = get_asgi_application()
+
+        runs = [
+            ('WSGI, sync views', run_wsgi, wsgi, SYNC_PATHS),
+            ('ASGI, sync views', run_asgi, asgi, SYNC_PATHS),
+            ('ASGI, async views', run_asgi, asgi, ASYNC_PATHS),
+        ]
+        for label, run, application, templates in runs:
+            paths = request_paths(templates, args.requests, args.users)
+            run(application, paths[:min(100, len(paths))], args.concurrency)  # warm up
+            latencies, elapsed = run(application, paths, args.concurrency)
+            summary = summarize(latencies, elapsed)
+            print(
+                f"{label:<20} {summary['rps']:8.0f} req/s   "
+                f"p50 {summary['p50_ms']:7.2f} ms   p99 {summary['p99_ms']:7.2f} ms"
+            )
+
+
+if __name__ == '__main__':
+    main()
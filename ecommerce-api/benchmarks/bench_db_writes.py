@@ -0,0 +1,136 @@
+"""
+Compares write throughput of the SQLite profiles under concurrent checkouts.
+
+Writer threads repeatedly add items to their cart and check out; reader threads read carts
+at the same time. Every operation runs like a request: with CONN_MAX_AGE=0 the connection is
+closed after each one, otherwise it is kept for the next.
+
+    before  rollback journal, synchronous=FULL, a new connection per operation
+    after   the SQLite profile of ecommerce/database.py: WAL, synchronous=NORMAL, mmap,
+            connections kept open (CONN_MAX_AGE)
+
+    python -m benchmarks.bench_db_writes --writers 8 --readers 4 --iterations 50
+"""
+import argparse
+import threading
+import time
+
+from benchmarks.harness import benchmark_database, setup_django, summarize
+
+PROFILES = {
+    'before': ({'journal_mode': 'DELETE', 'synchronous': 'FULL'}, 0),
+    'after': (None, 60),
+}
+
+
+def apply_profile(pragmas, conn_max_age):
+    from django.db import connections
+    from ecommerce.database import SQLITE_PRAGMAS
+
+    connection = connections['default']
+    connection.settings_dict['OPTIONS']['pragmas'] = dict(SQLITE_PRAGMAS if pragmas is None else pragmas)
+    connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+    # Reopen the connection (and forget its cached PRAGMAs) so the test database is created with the profile
+    connection.close()
+    connection.__dict__.pop('pragmas', None)
+
+
+def run(writers, readers, iterations, items):
+    from django.db import close_old_connections, connections
+    from store.carts import add_quantity
+    from store.checkout import place_order
+    from store.models import Item
+    from store.views import cart_contents
+
+    Item.objects.bulk_create([
+        Item(item_id=f'ITEM{i}', name=f'Item {i}', description='Benchmark item', price=1 + i % 100)
+        for i in range(items)
+    ])
+    catalog = list(Item.objects.order_by('id'))
+    connections['default'].close()
+
+    barrier = threading.Barrier(writers + readers)
+    done = threading.Event()
+    write_latencies, read_latencies, errors = [], [], []
+    lock = threading.Lock()
+
+    def timed(func, *args):
+        started = time.perf_counter()
+        try:
+            func(*args)
+        except Exception as e:
+            with lock:
+                errors.append(f'{type(e).__name__}: {e}')
+            return None
+        finally:
+            # Like the end of a request: closes the connection unless CONN_MAX_AGE keeps it
+            close_old_connections()
+        return time.perf_counter() - started
+
+    def writer(index):
+        user_id = f'writer{index}'
+        barrier.wait()
+        for i in range(iterations):
+            for offset in (0, 1):
+                latency = timed(add_quantity, user_id, catalog[(index + i + offset) % len(catalog)], 1)
+                if latency is not None:
+                    with lock:
+                        write_latencies.append(latency)
+            latency = timed(place_order, user_id)
+            if latency is not None:
+                with lock:
+                    write_latencies.append(latency)
+        connections.close_all()
+
+    def reader(index):
+        barrier.wait()
+        while not done.is_set():
+            latency = timed(cart_contents, f'writer{index % writers}')
+            if latency is not None:
+                with lock:
+                    read_latencies.append(latency)
+        connections.close_all()
+
+    write_threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    read_threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    started = time.perf_counter()
+    for thread in write_threads + read_threads:
+        thread.start()
+    for thread in write_threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    for thread in read_threads:
+        thread.join()
+
+    return summarize(write_latencies, elapsed), summarize(read_latencies, elapsed), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--iterations', type=int, default=50, help="Checkouts per writer, each after two cart adds.")
+    parser.add_argument('--items', type=int, default=100)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+
+    if connection.vendor != 'sqlite':
+        parser.error("This benchmark compares SQLite profiles; unset DATABASE_URL.")
+
+    for name, (pragmas, conn_max_age) in PROFILES.items():
+        apply_profile(pragmas, conn_max_age)
+        with benchmark_database():
+            writes, reads, errors = run(args.writers, args.readers, args.iterations, args.items)
+        print(
+            f"{name:<7} writes {writes['rps']:7.0f}/s p50 {writes['p50_ms']:6.1f} ms p95 {writes['p95_ms']:6.1f} ms   "
+            f"reads {reads['rps']:7.0f}/s p95 {reads['p95_ms']:6.1f} ms   errors {len(errors)}"
+        )
+        for error in sorted(set(errors))[:5]:
+            print(f"        {error}")
+
+
+if __name__ == '__main__':
+    main()
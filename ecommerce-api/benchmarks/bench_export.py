@@ -0,0 +1,66 @@
+"""
+Measures export_orders throughput and peak memory as the number of orders grows.
+
+Orders (three lines each) are added in place, so each size adds to the previous one, and every
+size is exported to a gzip NDJSON file. Peak memory is the Python allocations traced during the
+export; it should stay flat across sizes.
+
+    python -m benchmarks.bench_export --sizes 10000,100000
+"""
+import argparse
+import os
+import tempfile
+import tracemalloc
+
+from benchmarks.harness import benchmark_database, setup_django, timer
+
+
+def grow_orders(start, stop, batch_size=5000):
+    from django.db import transaction
+    from store.models import Order, OrderItem
+
+    for offset in range(start, stop, batch_size):
+        with transaction.atomic():
+            # Explicit ids: bulk_create does not return them on every backend
+            orders = Order.objects.bulk_create([
+                Order(id=i + 1, user_id=f'user{i % 1000}', total_amount=30 + i % 100, discount_amount=0)
+                for i in range(offset, min(offset + batch_size, stop))
+            ])
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, item_id=f'ITEM{line}', quantity=1 + line, price=10)
+                for order in orders for line in range(3)
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10000,100000', help="Comma separated order counts.")
+    parser.add_argument('--format', choices=('ndjson', 'csv'), default='ndjson')
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+
+    setup_django()
+    from django.core.management import call_command
+
+    with benchmark_database() as connection, tempfile.TemporaryDirectory() as directory:
+        print(f"{connection.vendor}, {args.format}, 3 lines per order")
+        grown = 0
+        for size in sizes:
+            grow_orders(grown, size)
+            grown = size
+            path = os.path.join(directory, f'orders-{size}.{args.format}.gz')
+
+            tracemalloc.start()
+            with timer() as elapsed:
+                call_command('export_orders', '--output', path, stderr=open(os.devnull, 'w'))
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            print(
+                f"{size:>9} orders  {size / elapsed['elapsed']:8.0f} orders/s  "
+                f"peak {peak / 2 ** 20:6.1f} MiB  file {os.path.getsize(path) / 2 ** 20:6.1f} MiB"
+            )
+
+
+if __name__ == '__main__':
+    main()
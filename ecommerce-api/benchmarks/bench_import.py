@@ -0,0 +1,54 @@
+"""
+Compares catalog loading through the one-item add_item endpoint with the bulk importer.
+
+    python -m benchmarks.bench_import --rows 5000
+"""
+import argparse
+
+from benchmarks.harness import benchmark_database, setup_django, timer
+
+
+def generate_rows(count, prefix):
+    for i in range(count):
+        yield {'item_id': f'{prefix}{i}', 'name': f'Item {i}', 'description': 'Benchmark item', 'price': 1 + i % 500}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000, help="Rows loaded by the bulk importer.")
+    parser.add_argument('--single-rows', type=int, default=1000, help="Rows loaded one request at a time.")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import Client
+    from django.urls import reverse
+    from store.importer import import_items
+
+    with benchmark_database():
+        client = Client()
+        url = reverse('add_item')
+        with timer() as single:
+            for row in generate_rows(args.single_rows, 'SINGLE'):
+                client.post(url, row, content_type='application/json')
+
+        lines = ['item_id,name,description,price']
+        lines += [f"{row['item_id']},{row['name']},{row['description']},{row['price']}" for row in generate_rows(args.rows, 'BULK')]
+        with timer() as bulk:
+            result = import_items(iter(lines), 'csv', args.batch_size)
+        assert result.created == args.rows, result.as_dict()
+
+        # A second pass updates every row instead of creating it
+        with timer() as update:
+            import_items(iter(lines), 'csv', args.batch_size)
+
+    single_rate = args.single_rows / single['elapsed']
+    bulk_rate = args.rows / bulk['elapsed']
+    print(f"add_item, one per request: {args.single_rows:>8} rows {single['elapsed']:8.2f}s {single_rate:10.0f} rows/s")
+    print(f"bulk import, create:       {args.rows:>8} rows {bulk['elapsed']:8.2f}s {bulk_rate:10.0f} rows/s")
+    print(f"bulk import, update:       {args.rows:>8} rows {update['elapsed']:8.2f}s {args.rows / update['elapsed']:10.0f} rows/s")
+    print(f"speed-up: {bulk_rate / single_rate:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
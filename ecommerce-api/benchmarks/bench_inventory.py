@@ -0,0 +1,96 @@
+"""
+Measures flash-sale checkouts of one hot item against the number of shards its stock is split over.
+
+Buyer threads each add the item to their cart and check out, all at once, until the stock runs
+out. Each run checks that exactly the stock was sold. With one shard every checkout updates the
+same row; with more, concurrent checkouts decrement different rows. That only pays off on a
+database with row locks: SQLite serializes every write transaction, so expect flat numbers there
+and run against PostgreSQL (DATABASE_URL) to see the scaling.
+
+    python -m benchmarks.bench_inventory --buyers 16 --shards 1,4,16
+"""
+import argparse
+import threading
+import time
+
+from benchmarks.harness import benchmark_database, setup_django, summarize
+
+
+def run(buyers, shards, stock, checkouts):
+    from django.db import close_old_connections, connections
+    from django.db.models import Sum
+    from store.carts import add_quantity
+    from store.checkout import CheckoutError, place_order
+    from store.inventory import set_stock, stock_levels
+    from store.models import Item, OrderItem
+
+    item = Item.objects.create(item_id=f'HOT{shards}', name='Hot item', description='Benchmark item', price=10)
+    set_stock(item, stock, shards)
+    connections['default'].close()
+
+    barrier = threading.Barrier(buyers)
+    latencies, refused, errors = [], [], []
+    lock = threading.Lock()
+
+    def buyer(index):
+        barrier.wait()
+        for i in range(checkouts):
+            user_id = f'buyer{shards}-{index}-{i}'
+            started = time.perf_counter()
+            try:
+                add_quantity(user_id, item, 1)
+                place_order(user_id)
+            except CheckoutError:
+                with lock:
+                    refused.append(user_id)
+                continue
+            except Exception as e:
+                with lock:
+                    errors.append(f'{type(e).__name__}: {e}')
+                continue
+            finally:
+                close_old_connections()
+            with lock:
+                latencies.append(time.perf_counter() - started)
+        connections.close_all()
+
+    threads = [threading.Thread(target=buyer, args=(i,)) for i in range(buyers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    sold = OrderItem.objects.filter(item_id=item.item_id).aggregate(sold=Sum('quantity'))['sold'] or 0
+    left = stock_levels([item.pk])[item.pk]
+    return summarize(latencies, elapsed), sold, left, len(refused), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--buyers', type=int, default=16, help="Concurrent buyer threads.")
+    parser.add_argument('--checkouts', type=int, default=20, help="Checkouts per buyer, one unit each.")
+    parser.add_argument('--stock', type=int, help="Stock of the item (default: 80%% of all checkouts).")
+    parser.add_argument('--shards', default='1,4,16', help="Comma separated shard counts.")
+    args = parser.parse_args()
+    stock = args.stock if args.stock is not None else args.buyers * args.checkouts * 4 // 5
+
+    setup_django()
+
+    with benchmark_database() as connection:
+        print(f"{connection.vendor}, {args.buyers} buyers, {args.buyers * args.checkouts} checkouts for a stock of {stock}")
+        for shards in (int(value) for value in args.shards.split(',')):
+            orders, sold, left, refused, errors = run(args.buyers, shards, stock, args.checkouts)
+            oversold = 'OVERSOLD' if sold + left != stock or left < 0 else 'ok'
+            print(
+                f"{shards:>3} shards  {orders['rps']:7.0f} orders/s  p50 {orders['p50_ms']:6.1f} ms  "
+                f"p95 {orders['p95_ms']:6.1f} ms   sold {sold}, left {left}, refused {refused} ({oversold})   "
+                f"errors {len(errors)}"
+            )
+            for error in sorted(set(errors))[:5]:
+                print(f"           {error}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Replays a seeded mixed workload against every store endpoint and reports req/s,
+latency percentiles and queries per request for each endpoint.
+
+    python -m benchmarks.bench_load --requests 5000 --save baseline.json
+    python -m benchmarks.bench_load --requests 5000 --compare baseline.json
+
+With --compare the run exits with status 1 when any endpoint's queries per request or p95
+got worse than the baseline past the thresholds. Baselines are only comparable between runs
+with the same seed and scale, on the same machine.
+"""
+import argparse
+import json
+import sys
+
+from benchmarks.harness import benchmark_database, setup_django
+from benchmarks.workload import Workload, find_regressions, load_postman_templates, replay, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--warmup', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--cart-lines', type=int, default=3)
+    parser.add_argument('--discount-codes', type=int, default=200)
+    parser.add_argument('--orders', type=int, default=5, help="Past orders seeded per user.")
+    parser.add_argument('--save', metavar='PATH', help="Write the report to PATH as a JSON baseline.")
+    parser.add_argument('--compare', metavar='PATH', help="Fail if the run regressed against the baseline at PATH.")
+    parser.add_argument('--max-p95-increase', type=float, default=0.25, help="Allowed p95 growth, as a fraction.")
+    parser.add_argument('--max-query-increase', type=float, default=0, help="Allowed growth of queries per request.")
+    args = parser.parse_args()
+
+    setup_django()
+
+    with benchmark_database():
+        workload = Workload(
+            seed=args.seed,
+            items=args.items,
+            users=args.users,
+            cart_lines=args.cart_lines,
+            discount_codes=args.discount_codes,
+            orders=args.orders,
+            templates=load_postman_templates(),
+        )
+        workload.populate()
+        samples, elapsed = replay(workload, args.requests, warmup=args.warmup)
+
+    result = report(samples, elapsed, workload.config())
+
+    print(f"{'endpoint':<28} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8}")
+    for name, endpoint in result['endpoints'].items():
+        print(
+            f"{name:<28} {endpoint['requests']:>8} {endpoint['p50_ms']:>8.2f} {endpoint['p95_ms']:>8.2f} "
+            f"{endpoint['p99_ms']:>8.2f} {endpoint['queries_mean']:>8.2f}"
+        )
+    total = result['total']
+    print(f"total: {total['requests']} requests in {elapsed:.2f}s, {total['rps']:.0f} req/s, p95 {total['p95_ms']:.2f} ms")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+        print(f"baseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(
+            baseline, result, max_p95_increase=args.max_p95_increase, max_query_increase=args.max_query_increase
+        )
+        if regressions:
+            print("regressions against the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("no regressions against the baseline")
+
+
+if __name__ == '__main__':
+    main()
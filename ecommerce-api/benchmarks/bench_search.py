@@ -0,0 +1,98 @@
+"""
+Measures catalog search latency as the catalog grows, against a LIKE scan of the same catalog.
+
+Items get names and descriptions drawn from a synthetic vocabulary. Queries are autocomplete
+keystrokes: a word of an existing item's name followed by the first letters of another one.
+The catalog is grown in place, so each size adds to the previous one.
+
+    python -m benchmarks.bench_search --sizes 10000,100000,1000000
+"""
+import argparse
+import random
+import string
+
+from benchmarks.harness import benchmark_database, setup_django, summarize, timer
+
+
+def make_vocabulary(rng, size):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10))))
+    return sorted(words)
+
+
+def grow_catalog(rng, vocabulary, start, stop, batch_size=10000):
+    from django.db import transaction
+    from store.models import Item
+
+    for offset in range(start, stop, batch_size):
+        with transaction.atomic():
+            Item.objects.bulk_create([
+                Item(
+                    item_id=f'ITEM{i}',
+                    name=' '.join(rng.choices(vocabulary, k=3)).capitalize(),
+                    description=' '.join(rng.choices(vocabulary, k=12)),
+                    price=rng.randint(100, 50000) / 100,
+                )
+                for i in range(offset, min(offset + batch_size, stop))
+            ])
+
+
+def make_queries(rng, size, count):
+    from store.models import Item
+
+    names = list(Item.objects.filter(item_id__in=[f'ITEM{rng.randrange(size)}' for _ in range(count)]).values_list('name', flat=True))
+    queries = []
+    for name in names:
+        first, second = rng.sample(name.lower().split(), 2)
+        queries.append(f'{first} {second[:rng.randint(2, 4)]}')
+    return queries
+
+
+def measure(func, queries):
+    latencies = []
+    with timer() as total:
+        for query in queries:
+            with timer() as elapsed:
+                func(query)
+            latencies.append(elapsed['elapsed'])
+    return summarize(latencies, total['elapsed'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10000,100000,1000000', help="Comma separated catalog sizes.")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--scan-queries', type=int, default=10, help="Queries timed with the LIKE scan (0 to skip).")
+    parser.add_argument('--vocabulary', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+
+    setup_django()
+    from store.search import _scan_search, search_catalog, search_terms
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(rng, args.vocabulary)
+
+    with benchmark_database() as connection:
+        print(f"{connection.vendor}, {args.queries} queries per size, limit 20")
+        grown = 0
+        for size in sizes:
+            grow_catalog(rng, vocabulary, grown, size)
+            grown = size
+            queries = make_queries(rng, size, args.queries)
+
+            indexed = measure(lambda query: search_catalog(query, limit=20), queries)
+            line = f"{size:>9} items   index p50 {indexed['p50_ms']:7.2f} ms  p95 {indexed['p95_ms']:7.2f} ms"
+            if args.scan_queries:
+                scan = measure(
+                    lambda query: _scan_search(connection.alias, search_terms(query), None, None, None, 21),
+                    queries[:args.scan_queries],
+                )
+                line += f"   LIKE scan p50 {scan['p50_ms']:8.2f} ms"
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Compares serializing a catalog with the DRF serializers against the fast read paths.
+
+Rows are fetched once up front, so only serialization and rendering are timed.
+
+    python -m benchmarks.bench_serializers --rows 10000
+"""
+import argparse
+
+from benchmarks.harness import benchmark_database, setup_django, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.renderers import JSONRenderer
+    from store.models import Cart, Item
+    from store.renderers import FastJSONRenderer, orjson
+    from store.serializers import (
+        CART_LINE_COLUMNS, ITEM_FIELDS, CartSerializer, ItemSerializer, cart_line_dicts, item_dicts
+    )
+
+    with benchmark_database():
+        Item.objects.bulk_create([
+            Item(item_id=f'ITEM{i}', name=f'Item {i}', description='Benchmark item', price=1 + i % 500)
+            for i in range(args.rows)
+        ])
+        Cart.objects.bulk_create([Cart(user_id='user1', item_id=pk) for pk in Item.objects.values_list('pk', flat=True)])
+
+        items = list(Item.objects.order_by('id'))
+        item_rows = list(Item.objects.order_by('id').values_list(*ITEM_FIELDS))
+        cart = list(Cart.objects.order_by('id').select_related('item'))
+        cart_rows = list(Cart.objects.order_by('id').values_list(*CART_LINE_COLUMNS))
+
+    cases = [
+        ('catalog', lambda: JSONRenderer().render(ItemSerializer(items, many=True).data),
+         lambda: FastJSONRenderer().render(item_dicts(item_rows))),
+        ('cart', lambda: JSONRenderer().render(CartSerializer(cart, many=True).data),
+         lambda: FastJSONRenderer().render(cart_line_dicts(cart_rows))),
+    ]
+
+    print(f"{args.rows} rows, best of {args.repeat}, orjson {'installed' if orjson else 'not installed'}")
+    for label, slow, fast in cases:
+        assert slow() == fast(), f"{label}: the fast path renders different bytes"
+        timings = {}
+        for name, func in (('drf', slow), ('fast', fast)):
+            best = None
+            for _ in range(args.repeat):
+                with timer() as elapsed:
+                    func()
+                best = elapsed['elapsed'] if best is None else min(best, elapsed['elapsed'])
+            timings[name] = best
+        print(
+            f"{label:<8} DRF {timings['drf'] * 1000:8.1f} ms   fast {timings['fast'] * 1000:8.1f} ms   "
+            f"{args.rows / timings['fast']:10.0f} rows/s   speed-up {timings['drf'] / timings['fast']:.1f}x"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Measures sweep_carts throughput against the batch size.
+
+Each run fills the cart table with abandoned carts (three lines each, aged past the ttl)
+interleaved with as many active ones, and sweeps it. The mean batch time is about how long
+the sweep holds each write transaction, which the cart writes running next to it may wait for.
+
+    python -m benchmarks.bench_sweep --carts 100000 --batch-sizes 100,1000,10000
+"""
+import argparse
+
+from benchmarks.harness import benchmark_database, setup_django, timer
+
+TTL = 30 * 24 * 60 * 60
+
+
+def fill_carts(carts, batch_size=5000):
+    from datetime import timedelta
+
+    from django.db import transaction
+    from django.utils import timezone
+    from store.models import Cart, Item
+
+    items = list(Item.objects.order_by('pk')[:3])
+    if len(items) < 3:
+        items = Item.objects.bulk_create([
+            Item(id=i + 1, item_id=f'SWEEP{i}', name=f'Item {i}', description='Benchmark item', price=10)
+            for i in range(3)
+        ])
+
+    Cart.objects.all().delete()
+    for offset in range(0, carts * 2, batch_size):
+        with transaction.atomic():
+            Cart.objects.bulk_create([
+                Cart(user_id=f'{"abandoned" if i % 2 else "active"}{i}', item=item, quantity=1)
+                for i in range(offset, min(offset + batch_size, carts * 2)) for item in items
+            ])
+    # bulk_create applies auto_now, so the abandoned carts are aged afterwards
+    Cart.objects.filter(user_id__startswith='abandoned').update(updated_at=timezone.now() - timedelta(seconds=TTL * 2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--carts', type=int, default=100000, help="Abandoned carts, next to as many active ones.")
+    parser.add_argument('--batch-sizes', default='100,1000,10000', help="Comma separated batch sizes.")
+    args = parser.parse_args()
+
+    setup_django()
+    from store.carts import sweep_expired_carts
+    from store.models import Cart
+
+    with benchmark_database() as connection:
+        print(f"{connection.vendor}, {args.carts} abandoned carts of 3 lines next to {args.carts} active ones")
+        for batch_size in (int(value) for value in args.batch_sizes.split(',')):
+            fill_carts(args.carts)
+            batches = -(-args.carts * 6 // batch_size)
+            with timer() as elapsed:
+                swept = sweep_expired_carts(TTL, batch_size)
+
+            print(
+                f"batch {batch_size:>6}  {swept / elapsed['elapsed']:9.0f} rows/s  {batches:>5} batches  "
+                f"mean {elapsed['elapsed'] / batches * 1000:7.2f} ms   swept {swept}, left {Cart.objects.count()}"
+            )
+
+
+if __name__ == '__main__':
+    main()
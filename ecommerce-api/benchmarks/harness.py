@@ -0,0 +1,67 @@
+import math
+import os
+import time
+from contextlib import contextmanager
+
+
+def setup_django():
+    """
+    Configures Django for a standalone benchmark script.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce.settings')
+    import django
+    django.setup()
+
+
+@contextmanager
+def benchmark_database():
+    """
+    Creates a fresh test database from the migrations for the duration of the block.
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+@contextmanager
+def timer():
+    """
+    Measures the wall time of the block; read ``elapsed`` on the yielded dict afterwards.
+    """
+    result = {}
+    started = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result['elapsed'] = time.perf_counter() - started
+
+
+def percentile(sorted_values, fraction):
+    """
+    Returns the value at the given fraction (0..1) of an ascending list, nearest rank.
+    """
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed):
+    """
+    Summarises per-request latencies (seconds) and the wall time of the run.
+    """
+    ordered = sorted(latencies)
+    return {
+        'requests': len(ordered),
+        'rps': len(ordered) / elapsed if elapsed else 0,
+        'p50_ms': percentile(ordered, 0.50) * 1000,
+        'p95_ms': percentile(ordered, 0.95) * 1000,
+        'p99_ms': percentile(ordered, 0.99) * 1000,
+    }
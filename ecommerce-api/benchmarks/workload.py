@@ -0,0 +1,413 @@
+"""
+Seeded, reproducible mixed workload over every endpoint in store/urls.py.
+
+The method and body shape of each request come from the Postman collection at the root of
+the repository where it has one; the values (users, items, codes) are drawn from a seeded
+random generator, so the same seed and scale replay the exact same requests.
+"""
+import json
+import random
+import threading
+import time
+from pathlib import Path
+
+from benchmarks.harness import summarize
+
+POSTMAN_COLLECTION = Path(__file__).resolve().parents[2] / 'E-Commerce Store.postman_collection.json'
+
+# Relative frequency of each endpoint in the mixed workload, keyed by URL name
+ENDPOINT_WEIGHTS = {
+    'list_items': 30,
+    'search_items': 10,
+    'add_to_cart': 15,
+    'view_cart': 12,
+    'view_cart_availability': 3,
+    'list_orders': 4,
+    'view_order': 2,
+    'batch_update_cart': 4,
+    'checkout': 8,
+    'view_purchase_summary': 4,
+    'add_item': 2,
+    'bulk_import_items': 1,
+    'set_item_stock': 1,
+    'generate_discount_code': 2,
+    'view_cache_stats': 1,
+    'metrics': 1,
+    'async_list_items': 8,
+    'async_view_cart': 6,
+    'async_checkout': 3,
+    'async_view_purchase_summary': 3,
+}
+
+
+def load_postman_templates(path=POSTMAN_COLLECTION):
+    """
+    Returns {url name: {'method', 'body'}} for the requests of a Postman collection
+    whose path resolves to one of the store's URLs.
+    """
+    from django.urls import Resolver404, resolve
+
+    with open(path) as f:
+        collection = json.load(f)
+
+    templates = {}
+    pending = list(collection.get('item', []))
+    while pending:
+        entry = pending.pop(0)
+        if 'item' in entry:
+            pending.extend(entry['item'])
+            continue
+
+        request = entry['request']
+        url = request['url'] if isinstance(request['url'], str) else request['url']['raw']
+        path = '/' + url.split('://')[-1].split('/', 1)[-1].split('?')[0]
+        try:
+            match = resolve(path if path.endswith('/') else path + '/')
+        except Resolver404:
+            continue
+
+        raw_body = (request.get('body') or {}).get('raw') or '{}'
+        templates[match.url_name] = {'method': request['method'], 'body': json.loads(raw_body)}
+    return templates
+
+
+class QueryCounter:
+    """
+    Counts the SQL statements run on every connection of every thread, including the
+    worker threads used by the async views, which a per-connection capture would miss.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self):
+        from django.db import connections
+        from django.db.backends.signals import connection_created
+
+        for connection in connections.all():
+            self._attach(connection)
+        connection_created.connect(self._on_connection_created, weak=False)
+
+    def uninstall(self):
+        from django.db import connections
+        from django.db.backends.signals import connection_created
+
+        connection_created.disconnect(self._on_connection_created)
+        for connection in connections.all():
+            if self in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self)
+
+    def _on_connection_created(self, sender, connection, **kwargs):
+        self._attach(connection)
+
+    def _attach(self, connection):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+
+class Workload:
+    """
+    Seeds a catalog and user population and generates the request sequence replayed against it.
+    """
+
+    def __init__(self, seed=0, items=1000, users=100, cart_lines=3, discount_codes=200, orders=5, templates=None):
+        self.seed = seed
+        self.items = items
+        self.users = users
+        self.cart_lines = cart_lines
+        self.discount_codes = discount_codes
+        self.orders = orders
+        self.templates = templates or {}
+        self.rng = random.Random(seed)
+
+        self.item_ids = [f'ITEM{i}' for i in range(items)]
+        self.user_ids = [f'user{i}' for i in range(users)]
+        self.users_with_carts = set()
+        self.unused_codes = []
+        self.order_ids = []
+        self.created_items = 0
+
+    def config(self):
+        return {
+            'seed': self.seed,
+            'items': self.items,
+            'users': self.users,
+            'cart_lines': self.cart_lines,
+            'discount_codes': self.discount_codes,
+            'orders': self.orders,
+        }
+
+    def populate(self):
+        """
+        Writes the seeded catalog, carts, discount codes and past orders to the database.
+        """
+        from store.models import Cart, DiscountCode, Item, Order, OrderItem
+
+        Item.objects.bulk_create([
+            Item(item_id=item_id, name=f'Item {i}', description='Benchmark item', price=self.rng.randint(1, 500))
+            for i, item_id in enumerate(self.item_ids)
+        ])
+        pks = dict(Item.objects.values_list('item_id', 'pk'))
+
+        carts = []
+        for user_id in self.user_ids:
+            for item_id in self.rng.sample(self.item_ids, min(self.cart_lines, self.items)):
+                carts.append(Cart(user_id=user_id, item_id=pks[item_id], quantity=self.rng.randint(1, 3)))
+            self.users_with_carts.add(user_id)
+        Cart.objects.bulk_create(carts)
+
+        self.unused_codes = [f'BENCH{i:06d}' for i in range(self.discount_codes)]
+        DiscountCode.objects.bulk_create([
+            DiscountCode(code=code, discount_percentage=10) for code in self.unused_codes
+        ])
+
+        Order.objects.bulk_create([
+            Order(user_id=user_id, total_amount=0) for user_id in self.user_ids for _ in range(self.orders)
+        ])
+        self.order_ids = list(Order.objects.order_by('id').values_list('id', flat=True))
+        lines = []
+        for order_id in self.order_ids:
+            for item_id in self.rng.sample(self.item_ids, min(self.cart_lines, self.items)):
+                lines.append(OrderItem(order_id=order_id, item_id=item_id, quantity=1, price=self.rng.randint(1, 500)))
+        OrderItem.objects.bulk_create(lines)
+
+    def requests(self, count):
+        """
+        Yields count (url name, method, path, body, content type) tuples in a reproducible order.
+        """
+        from django.urls import reverse
+
+        names = list(ENDPOINT_WEIGHTS)
+        weights = [ENDPOINT_WEIGHTS[name] for name in names]
+        for _ in range(count):
+            name = self.rng.choices(names, weights)[0]
+            kwargs, method, body, content_type = getattr(self, f'_build_{name}')()
+            template = self.templates.get(name)
+            if template:
+                method = template['method']
+            yield name, method, reverse(name, kwargs=kwargs), body, content_type
+
+    def _body(self, endpoint, **values):
+        """
+        Returns the given values restricted to the keys of the endpoint's Postman body,
+        or all of them for endpoints the collection does not have.
+        """
+        template = self.templates.get(endpoint, {}).get('body', {})
+        return {key: value for key, value in values.items() if key in template or not template}
+
+    def _user(self):
+        return self.rng.choice(self.user_ids)
+
+    def _user_with_cart(self):
+        if not self.users_with_carts:
+            return self._user()
+        user_id = self.rng.choice(sorted(self.users_with_carts))
+        self.users_with_carts.discard(user_id)
+        return user_id
+
+    def _discount_code(self):
+        if self.unused_codes and self.rng.random() < 0.3:
+            return self.unused_codes.pop()
+        return None
+
+    def _build_list_items(self):
+        return None, 'GET', {'limit': self.rng.choice([20, 50, 100])}, None
+
+    def _build_search_items(self):
+        # An autocomplete keystroke: the start of an item's name
+        number = str(self.rng.randrange(self.items))
+        return None, 'GET', {'q': f'item {number[:self.rng.randint(1, len(number))]}', 'limit': 10}, None
+
+    def _build_async_list_items(self):
+        return self._build_list_items()
+
+    def _build_add_to_cart(self):
+        user_id = self._user()
+        self.users_with_carts.add(user_id)
+        body = self._body(
+            'add_to_cart', user_id=user_id, item_id=self.rng.choice(self.item_ids), quantity=self.rng.randint(1, 3)
+        )
+        return None, 'POST', body, 'application/json'
+
+    def _build_batch_update_cart(self):
+        user_id = self._user()
+        self.users_with_carts.add(user_id)
+        operations = [
+            {'item_id': item_id, 'quantity': self.rng.randint(1, 3), 'op': self.rng.choice(['add', 'set'])}
+            for item_id in self.rng.sample(self.item_ids, min(10, self.items))
+        ]
+        return None, 'POST', {'user_id': user_id, 'operations': operations}, 'application/json'
+
+    def _build_view_cart(self):
+        return {'user_id': self._user()}, 'GET', None, None
+
+    def _build_async_view_cart(self):
+        return self._build_view_cart()
+
+    def _build_view_cart_availability(self):
+        return {'user_id': self._user()}, 'GET', None, None
+
+    def _build_list_orders(self):
+        return {'user_id': self._user()}, 'GET', {'limit': 10}, None
+
+    def _build_view_order(self):
+        return {'order_id': self.rng.choice(self.order_ids or [1])}, 'GET', None, None
+
+    def _build_checkout(self):
+        body = {'user_id': self._user_with_cart()}
+        code = self._discount_code()
+        if code:
+            body['discount_code'] = code
+        return None, 'POST', body, 'application/json'
+
+    def _build_async_checkout(self):
+        return self._build_checkout()
+
+    def _build_view_purchase_summary(self):
+        return None, 'GET', {'limit': 20}, None
+
+    def _build_async_view_purchase_summary(self):
+        return self._build_view_purchase_summary()
+
+    def _build_add_item(self):
+        self.created_items += 1
+        body = self._body(
+            'add_item',
+            item_id=f'NEW{self.seed}-{self.created_items}',
+            name=f'New item {self.created_items}',
+            price=self.rng.randint(1, 500),
+            description='Added during the benchmark'
+        )
+        return None, 'POST', body, 'application/json'
+
+    def _build_bulk_import_items(self):
+        lines = ['item_id,name,description,price']
+        for item_id in self.rng.sample(self.item_ids, min(50, self.items)):
+            lines.append(f'{item_id},Reimported {item_id},Benchmark item,{self.rng.randint(1, 500)}')
+        return None, 'POST', '\n'.join(lines) + '\n', 'text/csv'
+
+    def _build_set_item_stock(self):
+        # Plenty of stock, so that the checkouts of the workload are not refused
+        body = self._body('set_item_stock', item_id=self.rng.choice(self.item_ids), quantity=self.rng.randint(1000, 5000))
+        return None, 'POST', body, 'application/json'
+
+    def _build_generate_discount_code(self):
+        return None, 'POST', self._body('generate_discount_code', discount_percentage=5), 'application/json'
+
+    def _build_view_cache_stats(self):
+        return None, 'GET', None, None
+
+    def _build_metrics(self):
+        return None, 'GET', None, None
+
+
+def replay(workload, count, warmup=0):
+    """
+    Replays the workload in-process through Django's test client, one request at a time.
+    Returns {url name: [(latency in seconds, queries, status code), ...]} and the wall time.
+    """
+    from django.test import Client
+
+    client = Client()
+    counter = QueryCounter()
+    counter.install()
+    samples = {}
+    started = time.perf_counter()
+    try:
+        for index, (name, method, path, body, content_type) in enumerate(workload.requests(warmup + count)):
+            if index == warmup:
+                started = time.perf_counter()
+
+            queries_before = counter.count
+            request_started = time.perf_counter()
+            if method == 'GET':
+                response = client.get(path, body)
+            elif isinstance(body, str):
+                response = client.post(path, body, content_type=content_type)
+            else:
+                response = client.post(path, json.dumps(body), content_type=content_type)
+            latency = time.perf_counter() - request_started
+
+            if response.status_code >= 500:
+                raise RuntimeError(f"{method} {path} failed with {response.status_code}: {response.content[:200]!r}")
+            if index >= warmup:
+                samples.setdefault(name, []).append((latency, counter.count - queries_before, response.status_code))
+    finally:
+        counter.uninstall()
+
+    return samples, time.perf_counter() - started
+
+
+def report(samples, elapsed, config):
+    """
+    Builds the JSON report saved as a baseline: per endpoint latency percentiles,
+    queries per request and status codes, plus the overall throughput.
+    """
+    endpoints = {}
+    for name, rows in sorted(samples.items()):
+        latencies = [latency for latency, _, _ in rows]
+        queries = [count for _, count, _ in rows]
+        statuses = {}
+        for _, _, status in rows:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        summary = summarize(latencies, sum(latencies))
+        endpoints[name] = {
+            'requests': len(rows),
+            'p50_ms': round(summary['p50_ms'], 3),
+            'p95_ms': round(summary['p95_ms'], 3),
+            'p99_ms': round(summary['p99_ms'], 3),
+            'queries_mean': round(sum(queries) / len(queries), 2),
+            'queries_max': max(queries),
+            'statuses': statuses,
+        }
+
+    all_latencies = [latency for rows in samples.values() for latency, _, _ in rows]
+    total = summarize(all_latencies, elapsed)
+    return {
+        'config': config,
+        'total': {key: round(value, 3) for key, value in total.items()},
+        'endpoints': endpoints,
+    }
+
+
+def find_regressions(baseline, current, max_p95_increase=0.25, min_p95_delta_ms=1.0, max_query_increase=0,
+                     min_requests=20):
+    """
+    Returns a list of human readable regressions of current against baseline.
+
+    An endpoint regresses when its mean queries per request grow by more than max_query_increase,
+    or its p95 grows by more than max_p95_increase (a fraction) and by at least min_p95_delta_ms.
+    Latency is only compared for endpoints with at least min_requests samples, which keeps
+    noise on rarely called or sub-millisecond endpoints from failing the check.
+    """
+    if baseline.get('config') != current.get('config'):
+        raise ValueError(
+            f"The baseline was recorded with {baseline.get('config')}, not {current.get('config')}; "
+            f"rerun with the same seed and scale."
+        )
+
+    regressions = []
+    for name, before in sorted(baseline['endpoints'].items()):
+        after = current['endpoints'].get(name)
+        if after is None:
+            regressions.append(f"{name}: missing from the current run")
+            continue
+
+        if after['queries_mean'] > before['queries_mean'] + max_query_increase:
+            regressions.append(
+                f"{name}: {after['queries_mean']} queries per request, baseline {before['queries_mean']}"
+            )
+
+        if min(before['requests'], after['requests']) < min_requests:
+            continue
+        p95_limit = before['p95_ms'] * (1 + max_p95_increase)
+        if after['p95_ms'] > p95_limit and after['p95_ms'] - before['p95_ms'] >= min_p95_delta_ms:
+            regressions.append(f"{name}: p95 {after['p95_ms']:.2f} ms, baseline {before['p95_ms']:.2f} ms")
+
+    return regressions
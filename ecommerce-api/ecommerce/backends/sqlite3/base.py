@@ -0,0 +1,124 @@
+"""
+SQLite backend tuned for the store.
+
+Django 3.2 assumes the limits of SQLite releases older than 3.32: 999 bound
+parameters per statement and bulk inserts written as a compound
+``SELECT ... UNION ALL SELECT ...``, which is capped at 500 terms. Both make
+``bulk_create`` split large batches into several round-trips. This backend
+uses the real parameter limit and multi-row ``VALUES`` inserts instead.
+
+It also accepts a ``transaction_mode`` option (DEFERRED, IMMEDIATE or
+EXCLUSIVE) used to open transactions. SQLite fails a deferred transaction that
+read first and then tries to write while another connection holds the write
+lock, without waiting for ``timeout``; IMMEDIATE takes the write lock up front
+so concurrent writers queue instead of erroring.
+
+A ``pragmas`` option maps PRAGMA names to values set on every new connection
+(e.g. ``{'journal_mode': 'WAL', 'synchronous': 'NORMAL'}``). In WAL mode
+readers no longer block the writer nor wait for it, and with
+synchronous=NORMAL a commit appends to the WAL without an fsync (the database
+stays consistent; a power loss may drop the last commits).
+"""
+import os
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base, creation, features, operations
+from django.utils.functional import cached_property
+
+
+class DatabaseFeatures(features.DatabaseFeatures):
+
+    @cached_property
+    def max_query_params(self):
+        # SQLITE_MAX_VARIABLE_NUMBER defaults to 32766 since SQLite 3.32.0.
+        if base.Database.sqlite_version_info >= (3, 32, 0):
+            return 32766
+        return 999
+
+
+class DatabaseOperations(operations.DatabaseOperations):
+
+    def bulk_batch_size(self, fields, objs):
+        if len(fields) > 0:
+            return max(self.connection.features.max_query_params // len(fields), 1)
+        return len(objs)
+
+    def bulk_insert_sql(self, fields, placeholder_rows):
+        placeholder_rows_sql = (", ".join(row) for row in placeholder_rows)
+        values_sql = ", ".join("(%s)" % sql for sql in placeholder_rows_sql)
+        return "VALUES " + values_sql
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """
+    Also removes the write-ahead log and shared memory index of test databases in WAL mode,
+    which would otherwise be left behind, or worse, replayed into the next test database.
+    """
+
+    def _remove_wal_files(self, test_database_name):
+        if test_database_name and not self.is_in_memory_db(test_database_name):
+            for suffix in ('-wal', '-shm'):
+                if os.path.exists(f'{test_database_name}{suffix}'):
+                    os.remove(f'{test_database_name}{suffix}')
+
+    def _create_test_db(self, verbosity, autoclobber, keepdb=False):
+        if not keepdb:
+            self._remove_wal_files(self._get_test_db_name())
+        return super()._create_test_db(verbosity, autoclobber, keepdb)
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        super()._destroy_test_db(test_database_name, verbosity)
+        self._remove_wal_files(test_database_name)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+    features_class = DatabaseFeatures
+    ops_class = DatabaseOperations
+
+    transaction_modes = frozenset(['DEFERRED', 'IMMEDIATE', 'EXCLUSIVE'])
+    pragma_name = re.compile(r'^[a-z_]+$')
+    pragma_value = re.compile(r'^(?:-?\d+|[A-Za-z_]+)$')
+
+    @cached_property
+    def transaction_mode(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        if mode is None:
+            return None
+        mode = mode.upper()
+        if mode not in self.transaction_modes:
+            raise ImproperlyConfigured(
+                f"settings.DATABASES['{self.alias}']['OPTIONS']['transaction_mode'] "
+                f"must be one of {', '.join(sorted(self.transaction_modes))}."
+            )
+        return mode
+
+    @cached_property
+    def pragmas(self):
+        pragmas = self.settings_dict['OPTIONS'].get('pragmas') or {}
+        for name, value in pragmas.items():
+            # PRAGMA statements take no bound parameters, so only plain names and values are allowed
+            if not self.pragma_name.match(name) or not self.pragma_value.match(str(value)):
+                raise ImproperlyConfigured(
+                    f"Invalid PRAGMA in settings.DATABASES['{self.alias}']['OPTIONS']['pragmas']: {name} = {value!r}."
+                )
+        return pragmas
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        kwargs.pop('transaction_mode', None)
+        kwargs.pop('pragmas', None)
+        return kwargs
+
+    def init_connection_state(self):
+        super().init_connection_state()
+        # Run in autocommit: journal_mode cannot be changed inside a transaction
+        for name, value in self.pragmas.items():
+            self.connection.execute(f"PRAGMA {name} = {value}")
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute(f"BEGIN {self.transaction_mode}")
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from ecommerce.database import database_config, replica_configs
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -28,6 +31,84 @@ DEBUG = True
 ALLOWED_HOSTS = []
 
 DEFAULT_DISCOUNT_ORDER_COUNT = 5
+DEFAULT_REWARD_DISCOUNT_PERCENTAGE = 10
+
+# Catalog listing: page size used when a client pages without a limit, the
+# largest page a client may request, and the number of rows per streamed chunk.
+CATALOG_PAGE_SIZE = 100
+CATALOG_MAX_PAGE_SIZE = 1000
+CATALOG_STREAM_CHUNK_SIZE = 2000
+
+# Catalog search: results per page by default, the largest page a client may
+# request, and how many words of a query are searched for.
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+SEARCH_MAX_TERMS = 10
+
+# Most operations accepted by one batch cart request.
+CART_BATCH_MAX_OPERATIONS = 500
+
+# Bulk catalog import: rows written per transaction and the most row errors
+# reported back to the caller.
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_REPORTED_ERRORS = 1000
+
+# Order export and archival (store/archive.py): orders read per chunk by
+# export_orders, and orders moved per transaction by export_orders --archive.
+ORDER_EXPORT_CHUNK_SIZE = 2000
+ORDER_ARCHIVE_BATCH_SIZE = 1000
+
+# Abandoned carts (store/carts.py): seconds after the last change of any of its lines
+# that a cart expires, and how many pks sweep_carts covers per transaction.
+CART_TTL = 30 * 24 * 60 * 60
+CART_SWEEP_BATCH_SIZE = 1000
+
+# Purchase summary: discount codes per page by default, the largest page a client
+# may request, and the most daily buckets returned.
+STATS_DISCOUNT_CODES_PAGE_SIZE = 100
+STATS_DISCOUNT_CODES_MAX_PAGE_SIZE = 1000
+MAX_STATS_DAYS = 366
+
+# Order history: orders per page by default and the largest page a client may request.
+ORDER_HISTORY_PAGE_SIZE = 20
+ORDER_HISTORY_MAX_PAGE_SIZE = 100
+
+# Request metrics (store/metrics.py): histogram buckets for latency in seconds,
+# queries per request and response size in bytes, and how many times one SQL
+# shape may run in a single request before it is logged as an N+1 pattern.
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+METRICS_QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+METRICS_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+METRICS_N_PLUS_ONE_THRESHOLD = 10
+
+# Background jobs (store/jobs.py): attempts before a job is marked failed, the
+# retry delay in seconds (doubled after each failed attempt, up to the maximum),
+# how long a claimed job may run before another worker may reclaim it, and the
+# defaults of manage.py run_worker.
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BASE_DELAY = 1
+JOB_RETRY_MAX_DELAY = 300
+JOB_LOCK_TIMEOUT = 600
+JOB_WORKER_CONCURRENCY = 4
+JOB_POLL_INTERVAL = 1
+
+# Idempotency keys (store/idempotency.py): seconds a stored response is replayed
+# for, how long a duplicate waits for the first request to finish (polling at the
+# given interval in seconds), after how many seconds an unfinished first request is
+# presumed dead, and how many expired records purge_idempotency_keys deletes at once.
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+IDEMPOTENCY_WAIT_TIMEOUT = 10
+IDEMPOTENCY_POLL_INTERVAL = 0.05
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+IDEMPOTENCY_PURGE_BATCH_SIZE = 1000
+
+# Inventory (store/inventory.py): the number of counter rows an item's stock is split
+# over, so that as many checkouts of the item can decrement its stock at the same time.
+INVENTORY_SHARDS = 8
+
+# Cold start of an API worker (manage.py bench_startup --budget-ms): the most milliseconds
+# from starting the interpreter to answering the first request.
+COLD_START_BUDGET_MS = 1500
 
 # Application definition
 
@@ -43,6 +124,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'store.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -75,12 +157,67 @@ WSGI_APPLICATION = 'ecommerce.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
+#
+# Configured from the environment, see ecommerce/database.py: DATABASE_URL selects
+# the database (SQLite next to manage.py by default), DB_CONN_MAX_AGE keeps
+# connections open across requests, DB_CONN_HEALTH_CHECKS checks them when
+# reused after sitting idle, and DB_POOLER=pgbouncer adapts to PgBouncer's transaction pooling.
+# DATABASE_REPLICA_URLS adds read replicas, used by the read-only endpoints
+# (store/routers.py); a user's reads stay on the primary for
+# REPLICA_STICKY_SECONDS after their own writes.
 
 DATABASES = {
+    'default': database_config(os.environ, BASE_DIR),
+    **replica_configs(os.environ),
+}
+
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+REPLICA_STICKY_SECONDS = 10
+
+DATABASE_ROUTERS = ['store.routers.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+#
+# The 'catalog' cache is the shared tier of the item cache in store/cache.py. Point it
+# at memcached or Redis so that the worker processes share cached items; the default
+# keeps them per process. Either way the entries are keyed by the catalog version, a
+# database counter each process reads again every CATALOG_VERSION_CHECK_INTERVAL
+# seconds, so a catalog write reaches every process within that interval. The
+# in-process tier holds at most CATALOG_CACHE_LOCAL_SIZE items.
+#
+# With read replicas the default cache keeps the users whose reads stick to the primary
+# (store/routers.py), so it must then be shared by the worker processes and never cull
+# live entries: point it at memcached, Redis or the database cache. The store refuses
+# to start with replicas and a local-memory, dummy or file-based default cache.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'catalog',
+        'TIMEOUT': 3600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+}
+
+CATALOG_CACHE_ALIAS = 'catalog'
+CATALOG_CACHE_LOCAL_SIZE = 10000
+CATALOG_VERSION_CHECK_INTERVAL = 1
+
+# JSON responses are encoded with orjson when it is installed (see store/renderers.py).
+# Money is held as Decimal (store/money.py) and rendered as JSON numbers, as before.
+REST_FRAMEWORK = {
+    'COERCE_DECIMAL_TO_STRING': False,
+    'DEFAULT_RENDERER_CLASSES': [
+        'store.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 
@@ -0,0 +1,44 @@
+"""
+Slim settings profile for the API workers: DJANGO_SETTINGS_MODULE=ecommerce.settings_api
+
+The API only serves JSON from store.urls, so this profile leaves out what ecommerce.settings loads
+for browser use: the admin, sessions, auth, messages and static files apps, the CSRF, clickjacking
+and session middleware, the template engine and DRF's browsable API. Workers start faster (see
+manage.py bench_startup) and every request runs through fewer middleware.
+
+Everything else, the store's settings included, comes from ecommerce.settings, which the store
+modules import their settings from.
+"""
+from ecommerce.settings import *  # noqa: F401,F403
+from ecommerce.settings import REST_FRAMEWORK
+
+INSTALLED_APPS = [
+    'store',
+]
+
+MIDDLEWARE = [
+    'store.metrics.MetricsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+TEMPLATES = []
+
+AUTH_PASSWORD_VALIDATORS = []
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': [
+        'store.renderers.FastJSONRenderer',
+    ],
+    # No users: requests are not authenticated, and request.user is None
+    'DEFAULT_AUTHENTICATION_CLASSES': [],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.AllowAny',
+    ],
+    'UNAUTHENTICATED_USER': None,
+}
+
+# Without sessions or cookie authentication there is nothing to forge a request with, and JSON
+# responses are not framed: the CSRF and clickjacking middleware have nothing to protect.
+SILENCED_SYSTEM_CHECKS = ['security.W002', 'security.W003']
@@ -3,14 +3,21 @@ WSGI config for ecommerce project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
 
+DJANGO_SETTINGS_MODULE=ecommerce.settings_api selects the slim API-only profile.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/wsgi/
 """
 
 import os
+from importlib import import_module
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce.settings')
 
 application = get_wsgi_application()
+
+# Import the URLconf, and the views with it, while the worker boots rather than on its first request
+import_module(settings.ROOT_URLCONF)
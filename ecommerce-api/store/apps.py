@@ -1,6 +1,21 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class StoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'store'
+
+    def ready(self):
+        from ecommerce.database import install_health_checks
+        install_health_checks()
+
+        from .routers import check_sticky_cache
+        check_sticky_cache()
+
+        # Migrations that rebuild store_item drop the SQLite search index triggers
+        from .search import restore_search_triggers
+        post_migrate.connect(restore_search_triggers, sender=self)
+
+        # Registers the background job handlers
+        from . import tasks
@@ -0,0 +1,185 @@
+"""
+Export of the orders, with their lines, to NDJSON or CSV, and archival of old orders to cold storage.
+
+Exports stream: the orders are read with a chunked iterator() and the lines of each chunk with
+one query, so memory stays flat however many orders are exported.
+
+    ndjson  one order per line: {"order_id", "user_id", "created_at", "total_amount",
+            "discount_amount", "discount_code", "items": [{"item_id", "quantity", "price"}]}
+    csv     one row per order line (an order without lines has one row with empty line columns)
+
+Archiving moves the orders created before a cutoff out of the database, oldest first, one batch
+per transaction: each batch is appended to gzip files partitioned by month of creation
+(orders-YYYY-MM.ndjson.gz), its per-day totals are added to ArchivedOrderStats and its orders are
+deleted. The purchase summary rollups are left as they are and rebuild_stats counts the archived
+totals, so the stats stay correct. A batch is written before its transaction commits, so a crash
+in between leaves the batch both in the database and in the archive: the next run archives those
+orders again and readers of the archive keep the last copy of each order_id.
+"""
+import csv
+import gzip
+import json
+import os
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Job, Order, OrderItem
+from .stats import record_archived_orders
+from .tasks import ORDER_PLACED
+from ecommerce.settings import ORDER_ARCHIVE_BATCH_SIZE, ORDER_EXPORT_CHUNK_SIZE
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+CSV_COLUMNS = [
+    'order_id', 'user_id', 'created_at', 'total_amount', 'discount_amount', 'discount_code',
+    'item_id', 'quantity', 'price',
+]
+ORDER_COLUMNS = ('id', 'user_id', 'created_at', 'total_amount', 'discount_amount', 'discount_code__code')
+
+
+def orders_between(since=None, until=None):
+    """
+    The orders created in [since, until), oldest first, as ORDER_COLUMNS tuples.
+    """
+    orders = Order.objects.order_by('created_at', 'id')
+    if since is not None:
+        orders = orders.filter(created_at__gte=since)
+    if until is not None:
+        orders = orders.filter(created_at__lt=until)
+    return orders.values_list(*ORDER_COLUMNS)
+
+
+def with_items(rows):
+    """
+    Returns the order rows as dicts with their lines, fetched with one query.
+    """
+    items = {}
+    for order_id, item_id, quantity, price in OrderItem.objects.filter(
+        order_id__in=[row[0] for row in rows]
+    ).order_by('id').values_list('order_id', 'item_id', 'quantity', 'price'):
+        items.setdefault(order_id, []).append({'item_id': item_id, 'quantity': quantity, 'price': price})
+
+    return [
+        {
+            'order_id': order_id,
+            'user_id': user_id,
+            'created_at': created_at,
+            'total_amount': total_amount,
+            'discount_amount': discount_amount,
+            'discount_code': discount_code,
+            'items': items.get(order_id, []),
+        }
+        for order_id, user_id, created_at, total_amount, discount_amount, discount_code in rows
+    ]
+
+
+def iter_orders(since=None, until=None, chunk_size=ORDER_EXPORT_CHUNK_SIZE):
+    """
+    Yields the orders created in [since, until) with their lines, oldest first, chunk_size at a time.
+    """
+    rows = orders_between(since, until).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield from with_items(chunk)
+
+
+class OrderWriter:
+    """
+    Writes order dicts to a text stream in one of EXPORT_FORMATS.
+    """
+
+    def __init__(self, stream, fmt, header=True):
+        self.stream = stream
+        self.fmt = fmt
+        if fmt == 'csv':
+            self.csv = csv.writer(stream)
+            if header:
+                self.csv.writerow(CSV_COLUMNS)
+
+    def write(self, order):
+        if self.fmt == 'ndjson':
+            self.stream.write(json.dumps(order, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')) + '\n')
+            return
+        columns = [
+            order['order_id'], order['user_id'], order['created_at'].isoformat(), order['total_amount'],
+            order['discount_amount'], order['discount_code'] or '',
+        ]
+        for item in order['items'] or [{'item_id': '', 'quantity': '', 'price': ''}]:
+            self.csv.writerow(columns + [item['item_id'], item['quantity'], item['price']])
+
+
+def export_orders(stream, fmt, since=None, until=None, chunk_size=ORDER_EXPORT_CHUNK_SIZE):
+    """
+    Writes the orders created in [since, until) to the text stream and returns how many there were.
+    """
+    writer = OrderWriter(stream, fmt)
+    count = 0
+    for order in iter_orders(since, until, chunk_size):
+        writer.write(order)
+        count += 1
+    return count
+
+
+def archive_path(directory, fmt, created_at):
+    month = timezone.localtime(created_at)
+    return os.path.join(directory, f'orders-{month.year}-{month.month:02}.{fmt}.gz')
+
+
+def archive_orders(directory, before, fmt='ndjson', batch_size=ORDER_ARCHIVE_BATCH_SIZE):
+    """
+    Moves the orders created before the cutoff to month files in directory, batch_size orders
+    per transaction. Orders whose order_placed job has not run yet are left for a later run,
+    as the job still needs them. Returns (orders archived, paths written).
+    """
+    os.makedirs(directory, exist_ok=True)
+    archived = 0
+    paths = set()
+    after = None
+
+    while True:
+        with transaction.atomic():
+            orders = orders_between(until=before)
+            if after is not None:
+                # Past the orders left behind by the previous batches
+                orders = orders.filter(Q(created_at__gt=after[0]) | Q(created_at=after[0], id__gt=after[1]))
+            rows = list(orders[:batch_size])
+            if not rows:
+                return archived, sorted(paths)
+            after = (rows[-1][2], rows[-1][0])
+
+            waiting = set(Job.objects.filter(
+                idempotency_key__in=[f'{ORDER_PLACED}:{row[0]}' for row in rows],
+                status__in=(Job.PENDING, Job.RUNNING),
+            ).values_list('idempotency_key', flat=True))
+            rows = [row for row in rows if f'{ORDER_PLACED}:{row[0]}' not in waiting]
+            if not rows:
+                continue
+
+            daily = {}
+            by_path = {}
+            for order in with_items(rows):
+                by_path.setdefault(archive_path(directory, fmt, order['created_at']), []).append(order)
+                totals = daily.setdefault(timezone.localdate(order['created_at']), {
+                    'total_orders': 0, 'total_revenue': 0, 'total_discount': 0,
+                })
+                totals['total_orders'] += 1
+                totals['total_revenue'] += order['total_amount']
+                totals['total_discount'] += order['discount_amount']
+
+            for path, orders in by_path.items():
+                # gzip members can be appended: the month file stays one valid gzip stream
+                exists = os.path.exists(path)
+                with gzip.open(path, 'at', encoding='utf-8', newline='') as stream:
+                    writer = OrderWriter(stream, fmt, header=not exists)
+                    for order in orders:
+                        writer.write(order)
+                paths.add(path)
+
+            record_archived_orders(daily)
+            Order.objects.filter(pk__in=[row[0] for row in rows]).delete()
+            archived += len(rows)
@@ -0,0 +1,133 @@
+"""
+Native async variants of the store's read endpoints and checkout, for ASGI servers.
+
+Django 3.2's ORM is synchronous, so each view hands its database work to a worker thread
+with db_sync_to_async and awaits it. The event loop stays free to accept other requests
+while queries run, and the payloads (and rendered JSON) are the same as the DRF views'.
+
+Django 3.2's view decorators (require_GET, csrf_exempt, ...) wrap views in sync functions,
+which would turn these back into sync views, so methods are checked inline instead.
+The store's own decorators (replica_reads) keep async views async.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import HttpResponse, HttpResponseNotAllowed
+from django.utils.cache import get_conditional_response
+
+from ecommerce.database import close_unusable_connections, mark_connections_idle
+
+from .checkout import CheckoutError, place_order
+from .idempotency import claim, complete, release
+from .routers import replica_reads, stick_to_primary
+from .renderers import FastJSONRenderer
+from .views import cart_contents, catalog_etag, catalog_listing, is_true, purchase_summary
+
+
+def db_sync_to_async(func):
+    """
+    Runs func in a worker thread, closing stale or broken connections before and after like a request would.
+    Threads are not pinned to the event loop's thread, so several requests can query at once.
+    """
+    def run_with_connection(*args, **kwargs):
+        close_old_connections()
+        close_unusable_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+            mark_connections_idle()
+
+    return sync_to_async(run_with_connection, thread_sensitive=False)
+
+
+def json_response(payload, status=200):
+    """
+    Renders the payload exactly like the DRF views do.
+    """
+    return HttpResponse(FastJSONRenderer().render(payload), status=status, content_type='application/json')
+
+
+@replica_reads(sticky=False)
+async def list_items(request):
+    """
+    Async variant of store.views.list_items. Streaming (stream=1) is only served by the sync view.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET'])
+
+    def build_response():
+        etag = catalog_etag(request)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            payload, status = catalog_listing(request.GET, allow_stream=False)
+            response = json_response(payload, status)
+        response['ETag'] = etag
+        return response
+
+    return await db_sync_to_async(build_response)()
+
+
+@replica_reads
+async def view_cart(request, user_id):
+    """
+    Async variant of store.views.view_cart.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET'])
+    summary = is_true(request.GET.get('summary'))
+    return json_response(await db_sync_to_async(cart_contents)(user_id, summary))
+
+
+@replica_reads(sticky=False)
+async def view_purchase_summary(request):
+    """
+    Async variant of store.views.view_purchase_summary.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET'])
+    payload, status = await db_sync_to_async(purchase_summary)(request.GET)
+    return json_response(payload, status)
+
+
+async def checkout(request):
+    """
+    Async variant of store.views.checkout. The whole order runs in one worker thread
+    inside a single transaction, so it keeps the sync view's guarantees. Idempotency keys
+    are shared with the sync view, so a retry is answered once by either of them.
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    try:
+        data = json.loads(request.body or b'{}') if request.content_type == 'application/json' else request.POST
+    except ValueError:
+        data = None
+    if not hasattr(data, 'get'):
+        return json_response({"message": "Request body must be a JSON object."}, 400)
+
+    def place_idempotently():
+        record, response = claim(request, 'checkout')
+        if response is not None:
+            return response
+        try:
+            order = place_order(data.get('user_id'), data.get('discount_code'))
+        except CheckoutError as e:
+            response = json_response({"message": e.message}, e.status)
+        except Exception:
+            release(record)
+            raise
+        else:
+            stick_to_primary(data.get('user_id'))
+            response = json_response({
+                "message": "Order placed successfully.",
+                **order
+            })
+        return complete(record, response)
+
+    return await db_sync_to_async(place_idempotently)()
+
+
+# Like the DRF views, which are exempt from CSRF checks unless session authenticated
+checkout.csrf_exempt = True
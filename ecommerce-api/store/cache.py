@@ -0,0 +1,203 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import Item, Sequence
+from .sequences import next_value
+from ecommerce.settings import CATALOG_CACHE_ALIAS, CATALOG_CACHE_LOCAL_SIZE, CATALOG_VERSION_CHECK_INTERVAL
+
+CATALOG_SEQUENCE = 'catalog'
+
+
+class LRUCache:
+    """
+    A bounded, thread-safe, least recently used mapping.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return None
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class CatalogCache:
+    """
+    Two tier cache of catalog items.
+
+    Items are looked up by their ``item_id`` (or primary key) first in a bounded in-process LRU,
+    then in the shared Django cache configured by CATALOG_CACHE_ALIAS, and finally in the database.
+    Every entry is stored under the current catalog version, so bumping the version after a
+    catalog write invalidates both tiers in every process without deleting keys one by one.
+    The version is a Sequence row on the primary, so bumps are atomic and never evicted; each
+    process reads it again at most every CATALOG_VERSION_CHECK_INTERVAL seconds.
+
+    Cached items are shared between requests and must be treated as read-only.
+    """
+
+    def __init__(self, alias, local_size):
+        self.alias = alias
+        self.local = LRUCache(local_size)
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_read_at = 0
+        self._version_changed_at = 0
+        self.counters = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def version(self):
+        """
+        Returns the current catalog version.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._version is not None and now - self._version_read_at < CATALOG_VERSION_CHECK_INTERVAL:
+                return self._version
+        # From the primary: a lagging replica would hand out a version older than its writes
+        version = Sequence.objects.using(DEFAULT_DB_ALIAS).filter(
+            name=CATALOG_SEQUENCE
+        ).values_list('value', flat=True).first() or 0
+        with self._lock:
+            if version != self._version:
+                self._version_changed_at = now
+            self._version, self._version_read_at = version, now
+        return version
+
+    def version_age(self):
+        """
+        Seconds since this process first saw the current version. A version read for the first
+        time counts as new, as it may have just changed.
+        """
+        with self._lock:
+            return time.monotonic() - self._version_changed_at
+
+    def bump_version(self):
+        """
+        Invalidates every cached item and catalog ETag.
+        """
+        version = next_value(CATALOG_SEQUENCE)
+        now = time.monotonic()
+        with self._lock:
+            self._version, self._version_read_at, self._version_changed_at = version, now, now
+
+    def invalidate_on_commit(self):
+        """
+        Bumps the version once the current transaction commits.
+        """
+        transaction.on_commit(self.bump_version)
+
+    def get_item(self, item_id):
+        """
+        Returns the item with the given item_id, or None if it does not exist.
+        """
+        return self.get_items([item_id]).get(item_id)
+
+    def get_items(self, item_ids):
+        """
+        Returns a dict of item_id to item for the items that exist.
+        """
+        return self._get_many('item', 'item_id', item_ids)
+
+    def get_items_by_pk(self, pks):
+        """
+        Returns a dict of primary key to item for the items that exist.
+        """
+        return self._get_many('pk', 'pk', pks)
+
+    def _get_many(self, namespace, field_name, keys):
+        version = self.version()
+        found = {}
+        local_hits = shared_hits = 0
+
+        missing = []
+        for key in set(keys):
+            item = self.local.get((version, namespace, key))
+            if item is None:
+                missing.append(key)
+            else:
+                found[key] = item
+                local_hits += 1
+
+        if missing:
+            shared = self.shared.get_many([f'{namespace}:{key}' for key in missing], version=version)
+            for cache_key, item in shared.items():
+                key = getattr(item, field_name)
+                found[key] = item
+                self.local.set((version, namespace, key), item)
+                shared_hits += 1
+            missing = [key for key in missing if key not in found]
+
+        if missing:
+            items = Item.objects.in_bulk(missing, field_name=field_name)
+            self._store(version, items.values())
+            found.update(items)
+
+        with self._lock:
+            self.counters['local_hits'] += local_hits
+            self.counters['shared_hits'] += shared_hits
+            self.counters['misses'] += len(missing)
+
+        return found
+
+    def _store(self, version, items):
+        entries = {}
+        for item in items:
+            for namespace, key in (('item', item.item_id), ('pk', item.pk)):
+                self.local.set((version, namespace, key), item)
+                entries[f'{namespace}:{key}'] = item
+        if entries:
+            self.shared.set_many(entries, version=version)
+
+    def stats(self):
+        """
+        Returns the hit and miss counters of this process.
+        """
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = sum(counters.values())
+        return {
+            **counters,
+            'hit_ratio': (counters['local_hits'] + counters['shared_hits']) / lookups if lookups else 0,
+            'local_size': len(self.local),
+            'version': self.version(),
+        }
+
+    def clear(self):
+        """
+        Empties both tiers and resets the counters.
+        """
+        self.local.clear()
+        self.shared.clear()
+        with self._lock:
+            self._version = None
+            self.counters = dict.fromkeys(self.counters, 0)
+
+
+catalog_cache = CatalogCache(CATALOG_CACHE_ALIAS, CATALOG_CACHE_LOCAL_SIZE)
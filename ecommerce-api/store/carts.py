@@ -0,0 +1,178 @@
+import time
+from datetime import timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Exists, F, Max, Min, OuterRef
+from django.utils import timezone
+
+from .cache import catalog_cache
+from .models import Cart
+from ecommerce.settings import CART_SWEEP_BATCH_SIZE
+
+CART_OPERATIONS = ('add', 'set', 'remove')
+
+
+def _supports_upsert_returning():
+    if connection.vendor == 'postgresql':
+        return True
+    # RETURNING was added in SQLite 3.35
+    return connection.vendor == 'sqlite' and connection.Database.sqlite_version_info >= (3, 35, 0)
+
+
+def add_quantity(user_id, item, quantity):
+    """
+    Adds quantity of item to the user's cart and returns the line's new quantity.
+
+    Where the database supports it this is a single INSERT ... ON CONFLICT DO UPDATE ... RETURNING
+    statement, so concurrent adds to the same line never lose an update. Otherwise the line is
+    incremented with an F() expression and inserted if it does not exist yet.
+    """
+    now = timezone.now()
+    if _supports_upsert_returning():
+        table = connection.ops.quote_name(Cart._meta.db_table)
+        # Raw SQL skips the auto_now fields, so the timestamps are set here
+        now = connection.ops.adapt_datetimefield_value(now)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (user_id, item_id, quantity, created_at, updated_at) VALUES (%s, %s, %s, %s, %s) "
+                f"ON CONFLICT (user_id, item_id) DO UPDATE SET quantity = {table}.quantity + excluded.quantity, "
+                f"updated_at = excluded.updated_at "
+                f"RETURNING quantity",
+                [user_id, item.pk, quantity, now, now],
+            )
+            return cursor.fetchone()[0]
+
+    lines = Cart.objects.filter(user_id=user_id, item=item)
+    with transaction.atomic():
+        if not lines.update(quantity=F('quantity') + quantity, updated_at=now):
+            try:
+                with transaction.atomic():
+                    Cart.objects.create(user_id=user_id, item=item, quantity=quantity)
+                return quantity
+            except IntegrityError:
+                # Created concurrently, add to the winner's line instead
+                lines.update(quantity=F('quantity') + quantity, updated_at=now)
+        return lines.values_list('quantity', flat=True).get()
+
+
+def apply_operations(user_id, operations):
+    """
+    Applies a list of {item_id, quantity, op} operations to the user's cart.
+
+    "add" increments a line (creating it), "set" replaces its quantity (0 removes it) and "remove"
+    deletes it. Operations run in order, so several may target the same item. All items are
+    resolved with one lookup and the resulting changes are written in one transaction with at most
+    one insert, one update and one delete. Returns the per-operation errors; operations with an
+    error are skipped and the others still apply.
+    """
+    errors = []
+    valid = []
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            errors.append({"index": index, "item_id": None, "message": "Operation must be an object."})
+            continue
+        item_id = operation.get('item_id')
+        op = operation.get('op', 'add')
+        quantity = operation.get('quantity', 1 if op == 'add' else None)
+
+        if not isinstance(item_id, str):
+            message = "Item ID must be a string."
+        elif op not in CART_OPERATIONS:
+            message = f"Unknown op, expected one of {', '.join(CART_OPERATIONS)}."
+        elif op != 'remove' and (isinstance(quantity, bool) or not isinstance(quantity, int)):
+            message = "Quantity must be an integer."
+        elif op == 'add' and quantity < 1:
+            message = "Quantity to add must be at least 1."
+        elif op == 'set' and quantity < 0:
+            message = "Quantity cannot be negative."
+        else:
+            valid.append((index, item_id, op, quantity))
+            continue
+        errors.append({"index": index, "item_id": item_id, "message": message})
+
+    items = catalog_cache.get_items([item_id for _, item_id, _, _ in valid])
+    changes = []
+    for index, item_id, op, quantity in valid:
+        item = items.get(item_id)
+        if item is None:
+            errors.append({"index": index, "item_id": item_id, "message": "Item does not exist."})
+        else:
+            changes.append((item, op, quantity))
+
+    if changes:
+        try:
+            _write_changes(user_id, changes)
+        except IntegrityError:
+            # A concurrent add created one of the new lines, it now exists and is updated instead
+            _write_changes(user_id, changes)
+
+    errors.sort(key=lambda error: error["index"])
+    return errors
+
+
+def _write_changes(user_id, changes):
+    with transaction.atomic():
+        lines = {
+            line.item_id: line
+            for line in Cart.objects.select_for_update().filter(
+                user_id=user_id, item__in=[item.pk for item, _, _ in changes]
+            )
+        }
+
+        quantities = {item_id: line.quantity for item_id, line in lines.items()}
+        items = {}
+        for item, op, quantity in changes:
+            items[item.pk] = item
+            if op == 'add':
+                quantities[item.pk] = quantities.get(item.pk, 0) + quantity
+            elif op == 'set':
+                quantities[item.pk] = quantity
+            else:
+                quantities[item.pk] = 0
+
+        now = timezone.now()
+        to_create, to_update, to_delete = [], [], []
+        for item_pk, quantity in quantities.items():
+            line = lines.get(item_pk)
+            if quantity <= 0:
+                if line is not None:
+                    to_delete.append(line.pk)
+            elif line is None:
+                to_create.append(Cart(user_id=user_id, item=items[item_pk], quantity=quantity))
+            elif line.quantity != quantity:
+                line.quantity = quantity
+                # bulk_update does not apply auto_now
+                line.updated_at = now
+                to_update.append(line)
+
+        Cart.objects.bulk_create(to_create)
+        Cart.objects.bulk_update(to_update, ['quantity', 'updated_at'])
+        if to_delete:
+            Cart.objects.filter(pk__in=to_delete).delete()
+
+
+def sweep_expired_carts(ttl, batch_size=CART_SWEEP_BATCH_SIZE, pause=0):
+    """
+    Deletes the lines of the carts abandoned for longer than ttl seconds and returns how many.
+
+    A cart is abandoned when none of its lines changed within the ttl, so a cart someone is still
+    filling keeps its older lines. The lines are swept in pk ranges of batch_size, one short
+    transaction per range, sleeping pause seconds in between, so the sweep never holds locks for
+    long next to the cart writes. A line changed while the sweep runs is kept.
+    """
+    cutoff = timezone.now() - timedelta(seconds=ttl)
+    bounds = Cart.objects.filter(updated_at__lt=cutoff).aggregate(first=Min('pk'), last=Max('pk'))
+    if bounds['first'] is None:
+        return 0
+
+    swept = 0
+    for start in range(bounds['first'], bounds['last'] + 1, batch_size):
+        with transaction.atomic():
+            # A correlated probe per line, through the (user_id, item) index
+            active = Cart.objects.filter(user_id=OuterRef('user_id'), updated_at__gte=cutoff)
+            swept += Cart.objects.filter(
+                ~Exists(active), pk__gte=start, pk__lt=start + batch_size, updated_at__lt=cutoff
+            ).delete()[0]
+        if pause:
+            time.sleep(pause)
+    return swept
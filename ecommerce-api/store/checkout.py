@@ -0,0 +1,98 @@
+from django.db import transaction
+
+from .inventory import InsufficientStock, reserve
+from .jobs import enqueue
+from .models import Cart, DiscountCode, Order, OrderItem
+from .money import percentage_of
+from .pricing import priced_lines
+from .tasks import ORDER_PLACED
+
+
+class CheckoutError(Exception):
+    """
+    Raised when a cart cannot be checked out. Carries the message and HTTP status for the API.
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def place_order(user_id, discount_code_input=None):
+    """
+    Turns the user's cart into an order in a single transaction.
+
+    The cart is read once together with its items, the totals and order lines are built
+    in one pass, the lines are written with one bulk insert and the cart is cleared with
+    one delete, so the number of queries does not depend on the size of the cart.
+    The stock of tracked items is taken in the same transaction, so an order is only placed
+    when every item is in stock (see store/inventory.py).
+    Reward codes and stats are left to an order_placed job, enqueued in the same transaction.
+    """
+    with transaction.atomic():
+        # Fetch the cart, its items and the line totals in one query
+        cart_items = list(priced_lines(user_id).select_for_update(of=('self',)).select_related('item'))
+        if not cart_items:
+            raise CheckoutError("Cart is empty.")
+        if any(cart_item.quantity < 1 for cart_item in cart_items):
+            raise CheckoutError("Cart has lines with a quantity below 1.")
+
+        # Calculate the total and build the order lines in a single pass
+        total_amount = 0
+        order_items = []
+        for cart_item in cart_items:
+            total_amount += cart_item.line_total
+            order_items.append(OrderItem(
+                item_id=cart_item.item.item_id,
+                quantity=cart_item.quantity,
+                price=cart_item.item.price
+            ))
+
+        # Take the ordered quantities out of stock, all or nothing
+        quantities = {cart_item.item.pk: cart_item.quantity for cart_item in cart_items}
+        try:
+            reserve(quantities)
+        except InsufficientStock as e:
+            item_ids = {cart_item.item.pk: cart_item.item.item_id for cart_item in cart_items}
+            raise CheckoutError(f"Not enough stock for {', '.join(item_ids[pk] for pk in e.item_pks)}.", status=409)
+
+        discount_amount = 0
+        discount_code = None
+
+        # Validate and redeem the discount code. The conditional UPDATE only matches while the
+        # code is still valid, so of two concurrent checkouts using it exactly one succeeds.
+        if discount_code_input:
+            discount_code = DiscountCode.objects.filter(code=discount_code_input, is_valid=True).first()
+            redeemed = discount_code is not None and DiscountCode.objects.filter(
+                pk=discount_code.pk, is_valid=True
+            ).update(is_valid=False)
+            if not redeemed:
+                raise CheckoutError("Invalid or expired discount code.")
+            discount_code.is_valid = False
+            discount_amount = percentage_of(total_amount, discount_code.discount_percentage)
+
+        # Final total
+        final_amount = total_amount - discount_amount
+
+        order = Order.objects.create(
+            user_id=user_id,
+            total_amount=final_amount,
+            discount_amount=discount_amount,
+            discount_code=discount_code
+        )
+
+        for order_item in order_items:
+            order_item.order = order
+        OrderItem.objects.bulk_create(order_items)
+
+        # Clear exactly the lines that were ordered
+        Cart.objects.filter(pk__in=[cart_item.pk for cart_item in cart_items]).delete()
+
+        # Reward codes and the purchase summary rollups are handled off the request path
+        enqueue(ORDER_PLACED, {'order_id': order.id}, idempotency_key=f'{ORDER_PLACED}:{order.id}')
+
+    return {
+        "order_id": order.id,
+        "final_amount": final_amount
+    }
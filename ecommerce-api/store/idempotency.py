@@ -0,0 +1,168 @@
+"""
+Idempotency-Key support for the endpoints that change state, so clients can retry them safely.
+
+The first request with a key inserts an IdempotencyRecord before running the view and stores the
+response on it afterwards. Retries with the same key get the stored response back after a single
+lookup, without running the view again. A retry that arrives while the first request is still
+running waits for it to finish instead of running the view a second time. Keys are scoped per
+endpoint and kept for IDEMPOTENCY_KEY_TTL seconds; purge_idempotency_keys deletes expired ones.
+
+Server errors (5xx) and exceptions are not stored: the record is deleted, so a retry runs again.
+"""
+import hashlib
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyRecord
+from ecommerce.settings import (
+    IDEMPOTENCY_KEY_TTL,
+    IDEMPOTENCY_LOCK_TIMEOUT,
+    IDEMPOTENCY_POLL_INTERVAL,
+    IDEMPOTENCY_PURGE_BATCH_SIZE,
+    IDEMPOTENCY_WAIT_TIMEOUT,
+)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = IdempotencyRecord._meta.get_field('key').max_length
+
+
+def _error(message, status):
+    return JsonResponse({"message": message}, status=status)
+
+
+def _replay(record):
+    response = HttpResponse(bytes(record.body), status=record.status_code, content_type=record.content_type)
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def _try_claim(scope, key, fingerprint):
+    """
+    Makes one attempt at claiming the key. Returns (record, None) if this request should run the view,
+    (None, response) if it is answered without running it, and (None, None) if it should try again later.
+    """
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            return IdempotencyRecord.objects.create(
+                scope=scope,
+                key=key,
+                fingerprint=fingerprint,
+                created_at=now,
+                expires_at=now + timedelta(seconds=IDEMPOTENCY_KEY_TTL),
+            ), None
+    except IntegrityError:
+        pass
+
+    record = IdempotencyRecord.objects.filter(scope=scope, key=key).first()
+    if record is None:
+        # The first request failed and released the key meanwhile
+        return None, None
+
+    abandoned = record.status_code is None and record.created_at < now - timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT)
+    if record.expires_at <= now or abandoned:
+        # Only the request that sees this exact record deletes it, the others then race to claim the key
+        IdempotencyRecord.objects.filter(pk=record.pk, created_at=record.created_at).delete()
+        return None, None
+
+    if record.fingerprint != fingerprint:
+        return None, _error(f"This {IDEMPOTENCY_HEADER} was already used for a different request.", 422)
+    if record.status_code is None:
+        return None, None
+    return None, _replay(record)
+
+
+def claim(request, scope):
+    """
+    Claims the request's idempotency key within scope. Returns (record, response):
+    with a response, return it instead of running the view; otherwise run the view and pass its
+    response to complete() with the record (None if the request has no key).
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not key:
+        return None, None
+    if len(key) > MAX_KEY_LENGTH:
+        return None, _error(f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters.", 400)
+
+    fingerprint = hashlib.sha256(request.body).hexdigest()
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_TIMEOUT
+    while True:
+        record, response = _try_claim(scope, key, fingerprint)
+        if record is not None or response is not None:
+            return record, response
+        if time.monotonic() >= deadline:
+            return None, _error(f"A request with this {IDEMPOTENCY_HEADER} is still in progress.", 409)
+        time.sleep(IDEMPOTENCY_POLL_INTERVAL)
+
+
+def complete(record, response):
+    """
+    Stores the view's response on the claimed record and returns it.
+    Server errors are not stored; the key is released instead so a retry runs the view again.
+    """
+    if record is None:
+        return response
+    if response.status_code >= 500 or response.streaming:
+        release(record)
+        return response
+
+    if hasattr(response, 'render') and not response.is_rendered:
+        response.render()
+    IdempotencyRecord.objects.filter(pk=record.pk).update(
+        status_code=response.status_code,
+        content_type=response.get('Content-Type', ''),
+        body=response.content,
+    )
+    return response
+
+
+def release(record):
+    """
+    Deletes a claimed record whose request failed, so the key can be used again.
+    """
+    if record is not None:
+        IdempotencyRecord.objects.filter(pk=record.pk).delete()
+
+
+def idempotent(scope):
+    """
+    Makes the decorated view honour Idempotency-Key headers, with keys unique within scope.
+    Put it above @api_view, so it stores the rendered response.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            record, response = claim(request, scope)
+            if response is not None:
+                return response
+            try:
+                response = view(request, *args, **kwargs)
+            except Exception:
+                release(record)
+                raise
+            return complete(record, response)
+        return wrapper
+    return decorator
+
+
+def purge_expired(batch_size=IDEMPOTENCY_PURGE_BATCH_SIZE):
+    """
+    Deletes the expired records in batches of batch_size, each in its own short transaction.
+    Returns the number of records deleted.
+    """
+    now = timezone.now()
+    deleted = 0
+    while True:
+        ids = list(
+            IdempotencyRecord.objects.filter(expires_at__lte=now).order_by('expires_at', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += IdempotencyRecord.objects.filter(id__in=ids).delete()[0]
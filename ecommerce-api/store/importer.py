@@ -0,0 +1,212 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .cache import catalog_cache
+from .models import Item
+from .money import CENT
+from ecommerce.settings import IMPORT_BATCH_SIZE, IMPORT_MAX_REPORTED_ERRORS
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+UPDATE_FIELDS = ['name', 'description', 'price']
+
+# Backends that support INSERT ... ON CONFLICT DO UPDATE
+UPSERT_VENDORS = ('sqlite', 'postgresql')
+
+
+class ImportResult:
+    """
+    Running totals of a bulk import. Only the first IMPORT_MAX_REPORTED_ERRORS errors are kept.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, row, message):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "message": message})
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+def parse_rows(lines, fmt):
+    """
+    Yields (row number, raw row) for every record of a CSV (with a header line) or NDJSON stream.
+    Rows that cannot be parsed are yielded as (row number, error message string).
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for row_number, row in enumerate(reader, start=1):
+            if None in row:
+                yield row_number, "Row has more columns than the header."
+            else:
+                yield row_number, row
+    elif fmt == 'ndjson':
+        row_number = 0
+        for line in lines:
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield row_number, "Row is not valid JSON."
+                continue
+            yield row_number, row if isinstance(row, dict) else "Row is not a JSON object."
+    else:
+        raise ValueError(f"Unsupported import format '{fmt}', expected one of {', '.join(IMPORT_FORMATS)}.")
+
+
+def validate_row(row):
+    """
+    Returns (item fields, None) for a valid row or (None, error message).
+    """
+    item_id = str(row.get('item_id') or '').strip()
+    name = str(row.get('name') or '').strip()
+    description = str(row.get('description') or '')
+    price = row.get('price')
+
+    if not (item_id and name and price not in (None, '')):
+        return None, "Item ID, Name, and Price are required."
+    if len(item_id) > Item._meta.get_field('item_id').max_length:
+        return None, "Item ID is too long."
+    if len(name) > Item._meta.get_field('name').max_length:
+        return None, "Name is too long."
+    if len(description) > Item._meta.get_field('description').max_length:
+        return None, "Description is too long."
+    price, error = validate_price(price)
+    if error:
+        return None, error
+
+    return {'item_id': item_id, 'name': name, 'description': description, 'price': price}, None
+
+
+def validate_price(price):
+    """
+    Returns (price as a Decimal, None) for a valid item price or (None, error message).
+    """
+    try:
+        # Through str, so a float price from JSON keeps its shortest decimal form
+        price = Decimal(str(price).strip())
+    except InvalidOperation:
+        return None, "Price must be a number."
+    if not price.is_finite() or price < 0:
+        return None, "Price must be a non-negative number."
+    if price >= 10 ** (Item._meta.get_field('price').max_digits - 2):
+        return None, "Price is too large."
+    if price.quantize(CENT) != price:
+        return None, "Price must not have more than two decimal places."
+    return price, None
+
+
+def import_items(lines, fmt='csv', batch_size=IMPORT_BATCH_SIZE, result=None):
+    """
+    Creates or updates catalog items from a CSV or NDJSON stream.
+
+    Rows are read lazily and written in batches of batch_size, each batch in its own
+    transaction with one lookup (to count created and updated rows) and one upsert.
+    Invalid rows are reported in the result and skipped without aborting the rest of the batch.
+    Each committed batch bumps the catalog version, so a batch that fails later (or a stream
+    that cannot be read to the end) never leaves the earlier batches behind stale caches.
+    Pass result to keep the counts of the committed batches when the import raises.
+    """
+    if result is None:
+        result = ImportResult()
+    batch = {}
+
+    for row_number, row in parse_rows(lines, fmt):
+        result.rows += 1
+        if isinstance(row, str):
+            result.add_error(row_number, row)
+            continue
+
+        fields, error = validate_row(row)
+        if error:
+            result.add_error(row_number, error)
+            continue
+
+        # A later row for the same item replaces an earlier one in the same batch
+        batch[fields['item_id']] = fields
+        if len(batch) >= batch_size:
+            _upsert_batch(batch, result)
+            batch = {}
+
+    if batch:
+        _upsert_batch(batch, result)
+
+    return result
+
+
+def _upsert_batch(batch, result):
+    with transaction.atomic():
+        existing = set(Item.objects.filter(item_id__in=list(batch)).values_list('item_id', flat=True))
+        if connection.vendor in UPSERT_VENDORS:
+            _insert_on_conflict_update(list(batch.values()))
+        else:
+            _create_or_update(batch)
+        catalog_cache.invalidate_on_commit()
+
+    result.created += len(batch) - len(existing)
+    result.updated += len(existing)
+
+
+def _insert_on_conflict_update(rows):
+    """
+    Writes the rows with INSERT ... ON CONFLICT (item_id) DO UPDATE, which creates new items and
+    updates existing ones in one statement per batch and cannot race with concurrent inserts.
+    """
+    fields = [Item._meta.get_field(name) for name in ['item_id', 'created_at'] + UPDATE_FIELDS]
+    quote_name = connection.ops.quote_name
+    now = timezone.now()
+
+    columns = ", ".join(quote_name(field.column) for field in fields)
+    updates = ", ".join(f"{quote_name(field.column)} = excluded.{quote_name(field.column)}" for field in fields[2:])
+    row_placeholder = "(" + ", ".join(["%s"] * len(fields)) + ")"
+
+    batch_size = connection.ops.bulk_batch_size(fields, rows)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            chunk = rows[start:start + batch_size]
+            params = []
+            for row in chunk:
+                values = dict(row, created_at=now)
+                params.extend(field.get_db_prep_save(values[field.name], connection) for field in fields)
+            cursor.execute(
+                f"INSERT INTO {quote_name(Item._meta.db_table)} ({columns}) "
+                f"VALUES {', '.join([row_placeholder] * len(chunk))} "
+                f"ON CONFLICT ({quote_name(fields[0].column)}) DO UPDATE SET {updates}",
+                params,
+            )
+
+
+def _create_or_update(batch):
+    """
+    Fallback for backends without ON CONFLICT: one bulk insert and one bulk update.
+    """
+    existing = Item.objects.in_bulk(list(batch), field_name='item_id')
+    to_create = []
+    for item_id, fields in batch.items():
+        item = existing.get(item_id)
+        if item is None:
+            to_create.append(Item(**fields))
+        else:
+            for field in UPDATE_FIELDS:
+                setattr(item, field, fields[field])
+
+    Item.objects.bulk_create(to_create)
+    Item.objects.bulk_update(existing.values(), UPDATE_FIELDS)
@@ -0,0 +1,132 @@
+"""
+Stock of the catalog items, kept in sharded counters.
+
+An item's stock is split over INVENTORY_SHARDS StockShard rows. A checkout takes its quantity
+from one randomly chosen shard that holds enough with a conditional decrement, so concurrent
+checkouts of a hot item lock different rows instead of queueing for a single one, and a shard
+never goes below zero. Only when no single shard holds enough is the quantity gathered from
+several shards: all of the item's shards are then locked up front, in pk order, and taken from
+in that order, so checkouts always lock stock rows in a consistent order. The stock of an item
+is the sum of its shards.
+
+Items without shards are not tracked: they are always available and checkouts leave them alone.
+"""
+import random
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .models import Cart, StockShard
+from ecommerce.settings import INVENTORY_SHARDS
+
+
+class InsufficientStock(Exception):
+    """
+    Raised when the stock of some items cannot cover the quantities asked for.
+    Carries the pks of those items.
+    """
+
+    def __init__(self, item_pks):
+        super().__init__(f"Not enough stock for items {item_pks}.")
+        self.item_pks = item_pks
+
+
+def split(quantity, shards):
+    """
+    Spreads quantity over shards as evenly as possible.
+    """
+    share, remainder = divmod(quantity, shards)
+    return [share + (1 if shard < remainder else 0) for shard in range(shards)]
+
+
+def set_stock(item, quantity, shards=INVENTORY_SHARDS):
+    """
+    Sets the stock of item to quantity, spread over shards rows.
+    """
+    with transaction.atomic():
+        StockShard.objects.filter(item=item).delete()
+        StockShard.objects.bulk_create([
+            StockShard(item=item, shard=shard, quantity=share)
+            for shard, share in enumerate(split(quantity, shards))
+        ])
+
+
+def stock_levels(item_pks):
+    """
+    Returns {item pk: stock} for the tracked items among item_pks, with one aggregate query.
+    Untracked items are left out.
+    """
+    return dict(
+        StockShard.objects.filter(item__in=item_pks).values('item').annotate(stock=Sum('quantity')).values_list('item', 'stock')
+    )
+
+
+def cart_availability(user_id):
+    """
+    Returns the lines of the user's cart with the stock of their items, from one aggregate query:
+    a list of {item_id, quantity, stock, available}, where stock is None for untracked items.
+    """
+    rows = (
+        Cart.objects.filter(user_id=user_id)
+        .values_list('item__item_id', 'quantity')
+        .annotate(stock=Sum('item__stock_shards__quantity'))
+        .order_by('id')
+    )
+    return [
+        {'item_id': item_id, 'quantity': quantity, 'stock': stock, 'available': stock is None or stock >= quantity}
+        for item_id, quantity, stock in rows
+    ]
+
+
+def reserve(quantities):
+    """
+    Takes {item pk: quantity} out of the stock of the tracked items; untracked items are skipped.
+    Must run inside the transaction that uses the stock, which a failure must roll back:
+    raises InsufficientStock, naming every item short of stock, when the stock cannot cover them.
+    Raises ValueError for a quantity below 1, which would put stock back instead of taking it.
+    """
+    invalid = sorted(item_pk for item_pk, quantity in quantities.items() if quantity < 1)
+    if invalid:
+        raise ValueError(f"Quantities to reserve must be at least 1, not for items {invalid}.")
+
+    shards = {}
+    for item_pk, pk, quantity in StockShard.objects.filter(item__in=list(quantities)).values_list('item', 'pk', 'quantity'):
+        shards.setdefault(item_pk, {})[pk] = quantity
+
+    short = [item_pk for item_pk, item_shards in shards.items() if sum(item_shards.values()) < quantities[item_pk]]
+    if short:
+        raise InsufficientStock(sorted(short))
+
+    # Items in pk order, and within an item either one shard or all of them in pk order, so
+    # concurrent checkouts lock the stock rows in the same order and cannot deadlock on them
+    for item_pk in sorted(shards):
+        _take(item_pk, shards[item_pk], quantities[item_pk])
+
+
+def _take(item_pk, shards, needed):
+    # The whole quantity from one randomly chosen shard, the only row of the item this locks
+    while True:
+        full = [pk for pk, quantity in shards.items() if quantity >= needed]
+        if not full:
+            break
+        pk = random.choice(full)
+        # Only matches while the shard still holds enough, so the stock never goes negative
+        if StockShard.objects.filter(pk=pk, quantity__gte=needed).update(quantity=F('quantity') - needed):
+            return
+        # A concurrent checkout took from the shard first: read the item's shards again
+        shards = dict(StockShard.objects.filter(item=item_pk).values_list('pk', 'quantity'))
+
+    # Gathered from several shards: every shard of the item is locked first, in pk order,
+    # so the quantities read are the ones taken from
+    locked = list(
+        StockShard.objects.select_for_update().filter(item=item_pk).order_by('pk').values_list('pk', 'quantity')
+    )
+    if sum(quantity for _, quantity in locked) < needed:
+        raise InsufficientStock([item_pk])
+    for pk, quantity in locked:
+        take = min(quantity, needed)
+        if take:
+            StockShard.objects.filter(pk=pk).update(quantity=F('quantity') - take)
+            needed -= take
+        if not needed:
+            return
@@ -0,0 +1,203 @@
+"""
+A small database-backed job queue.
+
+Jobs are rows of the Job model. enqueue() inserts one in the caller's transaction, so a job
+only becomes visible to workers once the work that created it commits. Workers claim due jobs
+with SELECT ... FOR UPDATE SKIP LOCKED, so several workers never claim the same job, and run
+each handler in a transaction together with marking the job done: a job's database writes are
+committed exactly once. Failed jobs are retried with exponential backoff up to max_attempts.
+"""
+import logging
+import os
+import socket
+import threading
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+from ecommerce.settings import (
+    JOB_LOCK_TIMEOUT,
+    JOB_MAX_ATTEMPTS,
+    JOB_POLL_INTERVAL,
+    JOB_RETRY_BASE_DELAY,
+    JOB_RETRY_MAX_DELAY,
+    JOB_WORKER_CONCURRENCY,
+)
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS = {}
+
+
+def job_handler(name):
+    """
+    Registers the decorated function as the handler of the jobs with the given name.
+    It is called with the job's payload as keyword arguments.
+    """
+    def register(func):
+        JOB_HANDLERS[name] = func
+        return func
+    return register
+
+
+def enqueue(name, payload=None, idempotency_key=None, run_at=None, max_attempts=JOB_MAX_ATTEMPTS):
+    """
+    Adds a job to the queue, due at run_at (now by default).
+    With an idempotency_key the job is enqueued at most once: later calls with the same key do nothing.
+    """
+    if name not in JOB_HANDLERS:
+        raise ValueError(f"No handler registered for job '{name}'.")
+
+    job = Job(
+        name=name,
+        payload=payload or {},
+        idempotency_key=idempotency_key,
+        max_attempts=max_attempts,
+        run_at=run_at or timezone.now(),
+    )
+    if idempotency_key is None:
+        job.save()
+    else:
+        # A single INSERT ... ON CONFLICT DO NOTHING, without a savepoint around it
+        Job.objects.bulk_create([job], ignore_conflicts=True)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def retry_delay(attempts):
+    """
+    Returns how long to wait before retrying a job that failed its attempts-th attempt.
+    """
+    return timedelta(seconds=min(JOB_RETRY_MAX_DELAY, JOB_RETRY_BASE_DELAY * 2 ** (attempts - 1)))
+
+
+def claim_jobs(worker, limit):
+    """
+    Marks up to limit due jobs as running for the worker and returns them, oldest first.
+
+    Rows already locked by another worker's claim are skipped rather than waited for.
+    Running jobs whose claim is older than JOB_LOCK_TIMEOUT (their worker died) are due again.
+    """
+    now = timezone.now()
+    due = Q(status=Job.PENDING, run_at__lte=now) | Q(
+        status=Job.RUNNING, locked_at__lt=now - timedelta(seconds=JOB_LOCK_TIMEOUT)
+    )
+    with transaction.atomic():
+        ids = list(
+            Job.objects.select_for_update(skip_locked=True).filter(due).order_by('run_at', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        Job.objects.filter(id__in=ids).update(
+            status=Job.RUNNING, locked_by=worker, locked_at=now, attempts=F('attempts') + 1
+        )
+        return list(Job.objects.filter(id__in=ids).order_by('run_at', 'id'))
+
+
+def run_job(job, worker):
+    """
+    Runs a claimed job. Returns True if it succeeded (or was reclaimed by another worker meanwhile).
+    """
+    try:
+        handler = JOB_HANDLERS.get(job.name)
+        if handler is None:
+            raise LookupError(f"No handler registered for job '{job.name}'.")
+        if job.attempts > job.max_attempts:
+            raise RuntimeError(f"Gave up after {job.max_attempts} attempts.")
+
+        with transaction.atomic():
+            # Marking the job done first locks it, and only succeeds while this worker still holds
+            # the claim. A failing handler rolls the mark back together with its own writes.
+            if not Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=worker).update(
+                status=Job.DONE, finished_at=timezone.now(), last_error=''
+            ):
+                logger.warning("Job %s #%s was reclaimed by another worker, skipping it.", job.name, job.pk)
+                return True
+            handler(**job.payload)
+    except Exception:
+        failed = job.attempts >= job.max_attempts
+        if failed:
+            logger.exception("Job %s #%s failed for good after %d attempts.", job.name, job.pk, job.attempts)
+        else:
+            logger.warning("Job %s #%s failed attempt %d, retrying.", job.name, job.pk, job.attempts, exc_info=True)
+        now = timezone.now()
+        Job.objects.filter(pk=job.pk, locked_by=worker).update(
+            status=Job.FAILED if failed else Job.PENDING,
+            run_at=now if failed else now + retry_delay(job.attempts),
+            finished_at=now if failed else None,
+            last_error=traceback.format_exc(),
+        )
+        return False
+    return True
+
+
+def work_off(worker=None, batch_size=100):
+    """
+    Runs every due job in the calling thread until none is left.
+    Returns the number of jobs that succeeded and failed.
+    """
+    worker = worker or worker_name()
+    succeeded = failed = 0
+    while True:
+        jobs = claim_jobs(worker, batch_size)
+        if not jobs:
+            return succeeded, failed
+        for job in jobs:
+            if run_job(job, worker):
+                succeeded += 1
+            else:
+                failed += 1
+
+
+def _run_in_thread(job, worker):
+    close_old_connections()
+    try:
+        return run_job(job, worker)
+    finally:
+        close_old_connections()
+
+
+def run_worker(concurrency=JOB_WORKER_CONCURRENCY, poll_interval=JOB_POLL_INTERVAL, once=False, stop=None):
+    """
+    Claims jobs and runs them on a pool of concurrency threads until stop (a threading.Event)
+    is set, or with once, until no job is due. Returns the number of jobs that succeeded and failed.
+    """
+    worker = worker_name()
+    stop = stop or threading.Event()
+    running = set()
+    succeeded = failed = 0
+
+    with ThreadPoolExecutor(concurrency, thread_name_prefix='store-job') as pool:
+        while not stop.is_set():
+            free = concurrency - len(running)
+            for job in claim_jobs(worker, free) if free else []:
+                running.add(pool.submit(_run_in_thread, job, worker))
+
+            if not running:
+                if once:
+                    break
+                stop.wait(poll_interval)
+                continue
+
+            done, running = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.result():
+                    succeeded += 1
+                else:
+                    failed += 1
+
+        for future in running:
+            if future.result():
+                succeeded += 1
+            else:
+                failed += 1
+
+    return succeeded, failed
@@ -0,0 +1,182 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ecommerce.settings import COLD_START_BUDGET_MS
+
+SERVERS = ('wsgi', 'asgi')
+
+PHASES = ('interpreter', 'import', 'setup', 'first_request')
+
+# Run in a fresh interpreter for every measurement, as a newly started worker: imports Django and
+# the settings, then ecommerce.wsgi or ecommerce.asgi (django.setup(), the handler and the URLconf),
+# and serves two GET requests. Prints the timings in milliseconds as JSON.
+PROBE = """
+import time
+started = time.time()
+clock = time.perf_counter()
+
+import asyncio
+import json
+import sys
+from importlib import import_module
+from wsgiref.util import setup_testing_defaults
+
+server, path, query, database = json.loads(sys.argv[1])
+timings = {}
+
+def lap(phase):
+    global clock
+    now = time.perf_counter()
+    timings[phase] = (now - clock) * 1000
+    clock = now
+
+import django
+from django.conf import settings
+if database:
+    settings.DATABASES['default']['NAME'] = database
+host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+lap('import')
+
+application = import_module(f'ecommerce.{server}').application
+lap('setup')
+
+def wsgi_get():
+    environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'HTTP_HOST': host}
+    setup_testing_defaults(environ)
+    status = []
+    response = application(environ, lambda line, headers, exc_info=None: status.append(line))
+    b''.join(response)
+    response.close()
+    return int(status[0].split()[0])
+
+async def asgi_get():
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', host.encode())], 'client': ('127.0.0.1', 0), 'server': (host, 80),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+    return messages[0]['status']
+
+async def asgi_requests():
+    status = await asgi_get()
+    lap('first_request')
+    await asgi_get()
+    lap('next_request')
+    return status
+
+if server == 'wsgi':
+    status = wsgi_get()
+    lap('first_request')
+    wsgi_get()
+    lap('next_request')
+else:
+    status = asyncio.run(asgi_requests())
+
+print(json.dumps({'started': started, 'status': status, **timings}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the cold start of API workers: interpreter start, import of Django and the settings, "
+        "django.setup() with ecommerce.wsgi/ecommerce.asgi, and the first request, each run in a fresh process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile',
+            default=settings.SETTINGS_MODULE,
+            help="Settings module the workers run with, e.g. ecommerce.settings_api (default: the current one).",
+        )
+        parser.add_argument(
+            '--servers',
+            default=','.join(SERVERS),
+            help="Comma separated entry points to measure: wsgi, asgi.",
+        )
+        parser.add_argument(
+            '--path',
+            default='/api/items/?limit=1',
+            help="URL of the requests, with its query string.",
+        )
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=5,
+            help="Processes started per entry point; the medians are reported.",
+        )
+        parser.add_argument(
+            '--database',
+            help="SQLite database file the requests read instead of the configured one.",
+        )
+        parser.add_argument(
+            '--budget-ms',
+            type=float,
+            nargs='?',
+            const=COLD_START_BUDGET_MS,
+            help=f"Fail when the median cold start exceeds this many milliseconds ({COLD_START_BUDGET_MS} if no value is given).",
+        )
+
+    def handle(self, *args, **options):
+        servers = [server.strip() for server in options['servers'].split(',') if server.strip()]
+        unknown = set(servers) - set(SERVERS)
+        if unknown or not servers:
+            raise CommandError(f"--servers takes {', '.join(SERVERS)}.")
+        if options['runs'] < 1:
+            raise CommandError("--runs must be at least 1.")
+
+        path, _, query = options['path'].partition('?')
+        self.stdout.write(f"{options['profile']}, GET {options['path']}, median of {options['runs']} runs (ms)")
+
+        over_budget = []
+        for server in servers:
+            runs = [
+                self.probe(options['profile'], server, path, query, options['database'])
+                for _ in range(options['runs'])
+            ]
+            median = {phase: statistics.median(run[phase] for run in runs) for phase in runs[0]}
+            self.stdout.write(
+                f"{server}  interpreter {median['interpreter']:6.0f}  import {median['import']:6.0f}  "
+                f"setup {median['setup']:6.0f}  first request {median['first_request']:6.0f}  "
+                f"cold start {median['cold_start']:6.0f}  next request {median['next_request']:6.1f}"
+            )
+            if options['budget_ms'] is not None and median['cold_start'] > options['budget_ms']:
+                over_budget.append(f"{server} {median['cold_start']:.0f} ms")
+
+        if over_budget:
+            raise CommandError(f"Cold start over the budget of {options['budget_ms']:.0f} ms: {', '.join(over_budget)}.")
+
+    def probe(self, profile, server, path, query, database):
+        environ = {**os.environ, 'DJANGO_SETTINGS_MODULE': profile}
+        spawned = time.time()
+        result = subprocess.run(
+            [sys.executable, '-c', PROBE, json.dumps([server, path, query, database])],
+            cwd=settings.BASE_DIR,
+            env=environ,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"The {server} worker failed to start:\n{result.stderr.strip()}")
+
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        if timings.pop('status') != 200:
+            raise CommandError(f"The {server} worker did not answer GET {path} with 200.")
+        timings['interpreter'] = (timings.pop('started') - spawned) * 1000
+        timings['cold_start'] = sum(timings[phase] for phase in PHASES)
+        return timings
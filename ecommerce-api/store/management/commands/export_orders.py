@@ -0,0 +1,107 @@
+import gzip
+import io
+import sys
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from store.archive import EXPORT_FORMATS, archive_orders, export_orders
+from ecommerce.settings import ORDER_ARCHIVE_BATCH_SIZE, ORDER_EXPORT_CHUNK_SIZE
+
+
+def parse_moment(value):
+    """
+    Parses a --since/--until value: a date (midnight) or a datetime, in the current time zone unless given.
+    """
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            date = parse_date(value)
+            moment = date and datetime.combine(date, datetime.min.time())
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise CommandError(f"Invalid date or datetime: {value}.")
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams the orders, with their lines, to gzip compressed NDJSON or CSV. "
+        "With --archive, moves the orders created before --until to monthly archive files instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', '-o',
+            default='-',
+            help="File to write, or - for standard output. Compressed when the name ends with .gz.",
+        )
+        parser.add_argument(
+            '--format',
+            choices=EXPORT_FORMATS,
+            help="Output format. Defaults to the file extension, or ndjson.",
+        )
+        parser.add_argument('--gzip', action='store_true', help="Compress standard output too.")
+        parser.add_argument('--since', help="Only orders created at or after this date or datetime.")
+        parser.add_argument('--until', help="Only orders created before this date or datetime.")
+        parser.add_argument('--chunk-size', type=int, default=ORDER_EXPORT_CHUNK_SIZE, help="Orders read per query.")
+        parser.add_argument(
+            '--archive',
+            metavar='DIRECTORY',
+            help="Move the orders created before --until to orders-YYYY-MM.<format>.gz files in DIRECTORY.",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=ORDER_ARCHIVE_BATCH_SIZE,
+            help="Orders archived per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        since = options['since'] and parse_moment(options['since'])
+        until = options['until'] and parse_moment(options['until'])
+        path = options['output']
+        fmt = options['format']
+        if fmt is None:
+            name = path[:-3] if path.endswith('.gz') else path
+            fmt = 'csv' if name.endswith('.csv') else 'ndjson'
+        if options['chunk_size'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--chunk-size and --batch-size must be at least 1.")
+
+        started = time.perf_counter()
+        if options['archive']:
+            if until is None or since is not None:
+                raise CommandError("--archive takes the cutoff as --until, and no --since.")
+            archived, paths = archive_orders(options['archive'], until, fmt, options['batch_size'])
+            for archive_path in paths:
+                self.stdout.write(f"Wrote {archive_path}")
+            self.stdout.write(self.style.SUCCESS(
+                f"Archived {archived} orders created before {until.isoformat()} in {time.perf_counter() - started:.2f}s."
+            ))
+            return
+
+        compress = options['gzip'] or path.endswith('.gz')
+        try:
+            if path == '-':
+                if compress:
+                    with gzip.GzipFile(fileobj=sys.stdout.buffer, mode='wb') as raw:
+                        with io.TextIOWrapper(raw, encoding='utf-8', newline='') as stream:
+                            count = export_orders(stream, fmt, since, until, options['chunk_size'])
+                else:
+                    count = export_orders(sys.stdout, fmt, since, until, options['chunk_size'])
+            else:
+                opener = gzip.open if compress else open
+                with opener(path, 'wt', encoding='utf-8', newline='') as stream:
+                    count = export_orders(stream, fmt, since, until, options['chunk_size'])
+        except OSError as e:
+            raise CommandError(f"Cannot write {path}: {e}")
+        elapsed = time.perf_counter() - started
+
+        # Progress goes to stderr, so it does not mix with an export written to standard output
+        self.stderr.write(self.style.SUCCESS(
+            f"Exported {count} orders in {elapsed:.2f}s, {count / elapsed if elapsed else 0:.0f} orders/s."
+        ))
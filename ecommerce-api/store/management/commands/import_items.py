@@ -0,0 +1,55 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.importer import IMPORT_FORMATS, import_items
+from ecommerce.settings import IMPORT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Creates or updates catalog items from a CSV (with a header line) or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or - to read standard input.")
+        parser.add_argument(
+            '--format',
+            choices=IMPORT_FORMATS,
+            help="Input format. Defaults to the file extension (.csv or .ndjson/.jsonl).",
+        )
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format']
+        if fmt is None:
+            if path.endswith('.csv'):
+                fmt = 'csv'
+            elif path.endswith(('.ndjson', '.jsonl')):
+                fmt = 'ndjson'
+            else:
+                raise CommandError("Cannot tell the input format from the file name, pass --format.")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        started = time.perf_counter()
+        if path == '-':
+            result = import_items(sys.stdin, fmt, options['batch_size'])
+        else:
+            try:
+                with open(path, newline='', encoding='utf-8') as lines:
+                    result = import_items(lines, fmt, options['batch_size'])
+            except OSError as e:
+                raise CommandError(f"Cannot read {path}: {e}")
+        elapsed = time.perf_counter() - started
+
+        for error in result.errors:
+            self.stderr.write(f"Row {error['row']}: {error['message']}")
+        if result.failed > len(result.errors):
+            self.stderr.write(f"... and {result.failed - len(result.errors)} more errors.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.rows - result.failed} of {result.rows} rows "
+            f"({result.created} created, {result.updated} updated, {result.failed} failed) "
+            f"in {elapsed:.2f}s, {result.rows / elapsed if elapsed else 0:.0f} rows/s."
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from store.idempotency import purge_expired
+from ecommerce.settings import IDEMPOTENCY_PURGE_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Deletes the stored responses of expired idempotency keys. Meant to run periodically, e.g. from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IDEMPOTENCY_PURGE_BATCH_SIZE,
+            help="Records deleted per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        deleted = purge_expired(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} expired idempotency keys."))
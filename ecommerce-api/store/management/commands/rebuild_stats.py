@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from store.stats import rebuild_stats, verify_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the purchase summary rollups from the raw orders, or checks them for drift with --verify."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help="Only compare the rollups with the raw data and fail if they differ.",
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            differences = verify_stats()
+            if differences:
+                for difference in differences:
+                    self.stderr.write(difference)
+                raise CommandError(f"Purchase summary rollups have drifted ({len(differences)} differences).")
+            self.stdout.write(self.style.SUCCESS("Purchase summary rollups match the raw data."))
+            return
+
+        totals, daily = rebuild_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt purchase summary from {totals['total_orders']} orders over {len(daily)} days."
+        ))
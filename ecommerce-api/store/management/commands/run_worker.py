@@ -0,0 +1,44 @@
+import threading
+
+from django.core.management.base import BaseCommand
+
+from store.jobs import run_worker
+from ecommerce.settings import JOB_POLL_INTERVAL, JOB_WORKER_CONCURRENCY
+
+
+class Command(BaseCommand):
+    help = "Runs background jobs (reward codes, stats rollups, ...) until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=JOB_WORKER_CONCURRENCY,
+            help="Jobs run at the same time, each on its own thread and database connection.",
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=JOB_POLL_INTERVAL,
+            help="Seconds to wait before looking for new jobs when the queue is empty.",
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Exit once no job is due instead of waiting for new ones.",
+        )
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        try:
+            succeeded, failed = run_worker(
+                concurrency=options['concurrency'],
+                poll_interval=options['poll_interval'],
+                once=options['once'],
+                stop=stop,
+            )
+        except KeyboardInterrupt:
+            stop.set()
+            self.stdout.write("Interrupted once the jobs in progress finished.")
+            return
+        self.stdout.write(self.style.SUCCESS(f"Ran {succeeded + failed} jobs, {failed} failed."))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.carts import sweep_expired_carts
+from ecommerce.settings import CART_SWEEP_BATCH_SIZE, CART_TTL
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes the lines of the carts that have not changed for --ttl seconds, in batches. "
+        "Meant to run periodically, e.g. from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ttl', type=int, default=CART_TTL, help="Seconds after its last change that a cart expires.")
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=CART_SWEEP_BATCH_SIZE,
+            help="Cart line pks covered per transaction.",
+        )
+        parser.add_argument('--pause', type=float, default=0, help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        if options['ttl'] < 0 or options['batch_size'] < 1 or options['pause'] < 0:
+            raise CommandError("--ttl and --pause cannot be negative and --batch-size must be at least 1.")
+
+        started = time.perf_counter()
+        swept = sweep_expired_carts(options['ttl'], options['batch_size'], options['pause'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Swept {swept} expired cart lines in {elapsed:.2f}s, {swept / elapsed if elapsed else 0:.0f} rows/s."
+        ))
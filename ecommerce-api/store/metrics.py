@@ -0,0 +1,266 @@
+"""
+Per-request metrics: latency, database queries and time, and response size per URL name,
+exported in the Prometheus text format by the /metrics endpoint.
+
+Queries are observed by an execute wrapper installed once on every database connection.
+It only does work while a request is being measured, which is tracked in a context variable
+so that queries run by the async views' worker threads are counted against their request.
+Metrics are kept per process; scrape every worker.
+"""
+import asyncio
+import bisect
+import contextvars
+import logging
+import re
+import threading
+import time
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from ecommerce.settings import (
+    METRICS_LATENCY_BUCKETS, METRICS_N_PLUS_ONE_THRESHOLD, METRICS_QUERY_BUCKETS, METRICS_SIZE_BUCKETS
+)
+
+logger = logging.getLogger(__name__)
+
+# Placeholder lists of any length, e.g. IN (%s, %s, %s) or multi-row VALUES, share one shape
+PLACEHOLDER_LIST = re.compile(r'\((?:%s, )*%s\)(?:, \((?:%s, )*%s\))*')
+
+_current_request = contextvars.ContextVar('store_metrics_request', default=None)
+
+
+class QueryRecorder:
+    """
+    Query count, time and SQL shapes of one request.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = {}
+
+    def record(self, sql, duration):
+        self.count += 1
+        self.duration += duration
+        self.shapes[sql] = self.shapes.get(sql, 0) + 1
+
+    def repeated(self, threshold):
+        """
+        Returns (shape, count) for the SQL shapes run more than threshold times.
+        """
+        counts = {}
+        for sql, count in self.shapes.items():
+            shape = PLACEHOLDER_LIST.sub('(...)', sql)
+            counts[shape] = counts.get(shape, 0) + count
+        return [(shape, count) for shape, count in counts.items() if count > threshold]
+
+
+def record_queries(execute, sql, params, many, context):
+    """
+    Execute wrapper timing each statement for the request being measured, if any.
+    """
+    recorder = _current_request.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.record(sql, time.perf_counter() - started)
+
+
+def _attach(connection):
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_queries)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    _attach(connection)
+
+
+def install_query_hook():
+    """
+    Installs record_queries on the open connections of this thread and on every new connection.
+    """
+    for connection in connections.all():
+        _attach(connection)
+    connection_created.connect(_on_connection_created, dispatch_uid='store.metrics')
+
+
+class Histogram:
+    """
+    A Prometheus histogram with one series per label tuple.
+    """
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = {'buckets': [0] * (len(self.buckets) + 1), 'sum': 0, 'count': 0}
+        series['buckets'][bisect.bisect_left(self.buckets, value)] += 1
+        series['sum'] += value
+        series['count'] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series['buckets']):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_labels(self.label_names, labels, le=bound)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, labels)} {series["sum"]}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, labels)} {series["count"]}')
+        return lines
+
+
+class Counter:
+    """
+    A Prometheus counter with one series per label tuple.
+    """
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.series = {}
+
+    def inc(self, labels, amount=1):
+        self.series[labels] = self.series.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self.series.items()):
+            lines.append(f'{self.name}{_labels(self.label_names, labels)} {value}')
+        return lines
+
+
+def _labels(names, values, **extra):
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+class MetricsRegistry:
+    """
+    The metrics of every request handled by this process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = Counter('store_http_requests_total', "Requests handled.", ('view', 'method', 'status'))
+            self.latency = Histogram(
+                'store_http_request_duration_seconds', "Time to build the response.", ('view',), METRICS_LATENCY_BUCKETS
+            )
+            self.queries = Histogram(
+                'store_db_queries_per_request', "Database queries run by one request.", ('view',), METRICS_QUERY_BUCKETS
+            )
+            self.query_time = Counter(
+                'store_db_query_duration_seconds_total', "Time spent in database queries.", ('view',)
+            )
+            self.response_size = Histogram(
+                'store_http_response_size_bytes', "Size of non-streaming response bodies.", ('view',), METRICS_SIZE_BUCKETS
+            )
+            self.n_plus_one = Counter(
+                'store_db_repeated_queries_total', "Requests that repeated one SQL shape too often.", ('view',)
+            )
+
+    def observe_request(self, view, method, status, duration, recorder, size=None, repeated=0):
+        with self._lock:
+            self.requests.inc((view, method, str(status)))
+            self.latency.observe((view,), duration)
+            self.queries.observe((view,), recorder.count)
+            self.query_time.inc((view,), recorder.duration)
+            if size is not None:
+                self.response_size.observe((view,), size)
+            if repeated:
+                self.n_plus_one.inc((view,))
+
+    def render(self):
+        """
+        Returns every metric in the Prometheus text exposition format.
+        """
+        with self._lock:
+            lines = []
+            for metric in (self.requests, self.latency, self.queries, self.query_time, self.response_size, self.n_plus_one):
+                lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """
+    Records every request in the metrics registry under its URL name and logs a warning
+    when one SQL shape runs more than METRICS_N_PLUS_ONE_THRESHOLD times in a request.
+
+    Supports both sync and async handlers, so under ASGI the async views are awaited
+    directly instead of every request queueing for the one thread sync middleware runs in.
+    Queries run while a streaming response is consumed happen after the middleware returns
+    and are not counted.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Marks the instance as a coroutine function, as django.utils.deprecation.MiddlewareMixin does
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        install_query_hook()
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        token = _current_request.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        self.record(request, response, time.perf_counter() - started, recorder)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        token = _current_request.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        self.record(request, response, time.perf_counter() - started, recorder)
+        return response
+
+    def record(self, request, response, duration, recorder):
+        match = request.resolver_match
+        view = match.url_name if match and match.url_name else 'unmatched'
+        repeated = recorder.repeated(METRICS_N_PLUS_ONE_THRESHOLD)
+        for shape, count in repeated:
+            logger.warning("Possible N+1 query in %s: %d executions of %s", view, count, shape)
+
+        registry.observe_request(
+            view,
+            request.method,
+            response.status_code,
+            duration,
+            recorder,
+            size=None if response.streaming else len(response.content),
+            repeated=len(repeated),
+        )
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.7 on 2026-10-18 18:55
+
+from django.db import migrations, models
+
+
+def seed_order_sequence(apps, schema_editor):
+    # Continue from the number of orders already placed so the
+    # "every nth order earns a discount code" cycle is not reset.
+    Order = apps.get_model('store', 'Order')
+    Sequence = apps.get_model('store', 'Sequence')
+    Sequence.objects.create(name='order', value=Order.objects.count())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0002_item_created_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_order_sequence, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 3.2.7 on 2026-10-18 18:56
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_stats(apps, schema_editor):
+    # Start the rollups from the orders and codes that already exist.
+    # Later drift can be checked with `manage.py rebuild_stats --verify`.
+    Order = apps.get_model('store', 'Order')
+    DiscountCode = apps.get_model('store', 'DiscountCode')
+    StoreStats = apps.get_model('store', 'StoreStats')
+    DailyStats = apps.get_model('store', 'DailyStats')
+
+    totals = Order.objects.aggregate(
+        total_orders=Count('id'), total_revenue=Sum('total_amount'), total_discount=Sum('discount_amount')
+    )
+    StoreStats.objects.create(
+        pk=1,
+        total_orders=totals['total_orders'],
+        total_revenue=totals['total_revenue'] or 0,
+        total_discount=totals['total_discount'] or 0,
+        total_discount_codes=DiscountCode.objects.count(),
+    )
+
+    daily = {}
+    for row in Order.objects.annotate(date=TruncDate('created_at')).values('date').annotate(
+        total_orders=Count('id'), total_revenue=Sum('total_amount'), total_discount=Sum('discount_amount')
+    ).order_by():
+        date = row.pop('date')
+        daily[date] = DailyStats(**row)
+    for row in DiscountCode.objects.annotate(date=TruncDate('created_at')).values('date').annotate(
+        total_discount_codes=Count('id')
+    ).order_by():
+        daily.setdefault(row['date'], DailyStats()).total_discount_codes = row['total_discount_codes']
+    for date, bucket in daily.items():
+        bucket.date = date
+    DailyStats.objects.bulk_create(daily.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0003_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('total_orders', models.BigIntegerField(default=0)),
+                ('total_revenue', models.FloatField(default=0)),
+                ('total_discount', models.FloatField(default=0)),
+                ('total_discount_codes', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StoreStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_orders', models.BigIntegerField(default=0)),
+                ('total_revenue', models.FloatField(default=0)),
+                ('total_discount', models.FloatField(default=0)),
+                ('total_discount_codes', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
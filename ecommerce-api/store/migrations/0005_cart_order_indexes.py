@@ -0,0 +1,45 @@
+# Generated by Django 3.2.7 on 2026-10-18 19:01
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_cart_lines(apps, schema_editor):
+    # Concurrent adds could create several lines for the same user and item.
+    # Keep the oldest line with the combined quantity before making the pair unique.
+    Cart = apps.get_model('store', 'Cart')
+    duplicates = Cart.objects.values('user_id', 'item_id').annotate(
+        lines=Count('id'), keep_id=Min('id'), total_quantity=Sum('quantity')
+    ).filter(lines__gt=1).order_by()
+    for duplicate in duplicates:
+        Cart.objects.filter(pk=duplicate['keep_id']).update(quantity=duplicate['total_quantity'])
+        Cart.objects.filter(user_id=duplicate['user_id'], item_id=duplicate['item_id']).exclude(
+            pk=duplicate['keep_id']
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0004_store_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user_id', 'created_at', 'id'], name='store_order_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at', 'id'], name='store_order_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['item_id'], name='store_orderitem_item_id_idx'),
+        ),
+        migrations.RunPython(merge_duplicate_cart_lines, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cart',
+            constraint=models.UniqueConstraint(fields=('user_id', 'item'), name='store_cart_user_item_uniq'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 3.2.7 on 2026-10-18 19:14
+
+from django.db import migrations
+from django.db.models import F
+from django.db.models.functions import Round
+import store.money
+
+MONEY_FIELDS = {
+    'Item': ['price'],
+    'Order': ['total_amount', 'discount_amount'],
+    'OrderItem': ['price'],
+    'StoreStats': ['total_revenue', 'total_discount'],
+    'DailyStats': ['total_revenue', 'total_discount'],
+}
+
+
+def amounts_to_cents(apps, schema_editor):
+    # Scale the float amounts to whole cents while the columns are still floating point,
+    # so the type change below only drops the fractional part of exact whole numbers.
+    # Rollups summed as floats may be a cent off afterwards; manage.py rebuild_stats recomputes them exactly.
+    for model_name, fields in MONEY_FIELDS.items():
+        model = apps.get_model('store', model_name)
+        model.objects.update(**{field: Round(F(field) * 100) for field in fields})
+
+
+def cents_to_amounts(apps, schema_editor):
+    for model_name, fields in MONEY_FIELDS.items():
+        model = apps.get_model('store', model_name)
+        model.objects.update(**{field: F(field) / 100.0 for field in fields})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0005_cart_order_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(amounts_to_cents, cents_to_amounts),
+        migrations.AlterField(
+            model_name='dailystats',
+            name='total_discount',
+            field=store.money.MoneyField(decimal_places=2, default=0, max_digits=15),
+        ),
+        migrations.AlterField(
+            model_name='dailystats',
+            name='total_revenue',
+            field=store.money.MoneyField(decimal_places=2, default=0, max_digits=15),
+        ),
+        migrations.AlterField(
+            model_name='item',
+            name='price',
+            field=store.money.MoneyField(decimal_places=2, max_digits=15),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='discount_amount',
+            field=store.money.MoneyField(decimal_places=2, default=0, max_digits=15),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='total_amount',
+            field=store.money.MoneyField(decimal_places=2, max_digits=15),
+        ),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='price',
+            field=store.money.MoneyField(decimal_places=2, max_digits=15),
+        ),
+        migrations.AlterField(
+            model_name='storestats',
+            name='total_discount',
+            field=store.money.MoneyField(decimal_places=2, default=0, max_digits=15),
+        ),
+        migrations.AlterField(
+            model_name='storestats',
+            name='total_revenue',
+            field=store.money.MoneyField(decimal_places=2, default=0, max_digits=15),
+        ),
+    ]
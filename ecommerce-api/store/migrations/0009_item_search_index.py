@@ -0,0 +1,82 @@
+from django.db import migrations
+
+# The full-text index of the catalog (see store/search.py), maintained by the database itself
+# so every write path (add_item, bulk imports, updates, deletes) keeps it in sync.
+# On SQLite, a later migration that alters store_item rebuilds the table, which drops these
+# triggers: store.search.restore_search_triggers creates any missing ones again after migrate.
+
+# The triggers that keep the SQLite index in sync, by name
+SQLITE_SEARCH_TRIGGERS = {
+    'store_item_fts_insert': """
+        CREATE TRIGGER store_item_fts_insert AFTER INSERT ON store_item BEGIN
+            INSERT INTO store_item_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+        END
+        """,
+    'store_item_fts_delete': """
+        CREATE TRIGGER store_item_fts_delete AFTER DELETE ON store_item BEGIN
+            INSERT INTO store_item_fts(store_item_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        END
+        """,
+    'store_item_fts_update': """
+        CREATE TRIGGER store_item_fts_update AFTER UPDATE OF name, description ON store_item BEGIN
+            INSERT INTO store_item_fts(store_item_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO store_item_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+        END
+        """,
+}
+
+SEARCH_INDEX_SQL = {
+    'sqlite': [
+        # An external content FTS5 table: the index only, the text stays in store_item.
+        # prefix='2 3' adds prefix indexes so autocomplete queries are index lookups too.
+        """
+        CREATE VIRTUAL TABLE store_item_fts USING fts5(
+            name, description, content='store_item', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        """,
+        *SQLITE_SEARCH_TRIGGERS.values(),
+        "INSERT INTO store_item_fts(store_item_fts) VALUES ('rebuild')",
+    ],
+    'postgresql': [
+        # The 'simple' configuration does not stem, matching the SQLite tokenizer.
+        """
+        ALTER TABLE store_item ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(name, '')), 'A')
+            || setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+        ) STORED
+        """,
+        "CREATE INDEX store_item_search_idx ON store_item USING GIN (search_vector)",
+    ],
+}
+
+DROP_SEARCH_INDEX_SQL = {
+    'sqlite': [
+        *(f"DROP TRIGGER {name}" for name in SQLITE_SEARCH_TRIGGERS),
+        "DROP TABLE store_item_fts",
+    ],
+    'postgresql': [
+        "ALTER TABLE store_item DROP COLUMN search_vector",
+    ],
+}
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        # Other backends have no index and search with a LIKE scan
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0008_idempotency_records'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_for_vendor(SEARCH_INDEX_SQL), run_for_vendor(DROP_SEARCH_INDEX_SQL)),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.7 on 2026-10-18 19:48
+
+from django.db import migrations, models
+import store.money
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0010_stock_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrderStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('total_orders', models.BigIntegerField(default=0)),
+                ('total_revenue', store.money.MoneyField(decimal_places=2, default=0, max_digits=15)),
+                ('total_discount', store.money.MoneyField(decimal_places=2, default=0, max_digits=15)),
+            ],
+        ),
+    ]
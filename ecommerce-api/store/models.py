@@ -1,5 +1,7 @@
 from django.db import models
 
+from .money import MoneyField
+
 class Item(models.Model):
     """
     This models has the catalog of items for sale.
@@ -7,13 +9,41 @@ class Item(models.Model):
     item_id  = models.CharField(max_length=50, unique=True, auto_created=True)
     name = models.CharField(max_length=100)
     description = models.TextField(max_length=200)
-    price = models.FloatField(max_length=10)
+    price = MoneyField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the catalog walks (created_at, id).
+            models.Index(fields=['created_at', 'id'], name='store_item_created_id_idx'),
+        ]
+
     def __str__(self):
         return f"Item: {self.name} - Price: {self.price}"
 
 
+class StockShard(models.Model):
+    """
+    This model holds the stock of an item, split over a few rows (shards) so that concurrent
+    checkouts of the same item decrement different rows instead of queueing for one (see
+    store/inventory.py). The stock of an item is the sum of its shards; items without shards
+    are not tracked and never run out.
+    """
+    item = models.ForeignKey(Item, related_name='stock_shards', on_delete=models.CASCADE)
+    shard = models.PositiveSmallIntegerField()
+    quantity = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also serves the lookups of an item's shards.
+            models.UniqueConstraint(fields=['item', 'shard'], name='store_stockshard_item_shard_uniq'),
+            models.CheckConstraint(check=models.Q(quantity__gte=0), name='store_stockshard_quantity_gte_0'),
+        ]
+
+    def __str__(self):
+        return f"Stock - Item: {self.item_id}, Shard: {self.shard}, Quantity: {self.quantity}"
+
+
 class Cart(models.Model):
     """
     This models is used to store the items added to the cart by the user.
@@ -21,6 +51,19 @@ class Cart(models.Model):
     user_id = models.CharField(max_length=50)
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
     quantity = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Set on every change of the line, including the raw upsert of store.carts.add_quantity
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # One line per user and item; also serves lookups of a user's cart.
+            models.UniqueConstraint(fields=['user_id', 'item'], name='store_cart_user_item_uniq'),
+        ]
+        indexes = [
+            # sweep_carts looks up the carts changed since the expiry cutoff.
+            models.Index(fields=['updated_at', 'user_id'], name='store_cart_updated_at_idx'),
+        ]
     
     def __str__(self):
         return f"Cart - User: {self.user_id}, Item: {self.item.name}, Quantity: {self.quantity}"
@@ -34,6 +77,10 @@ class DiscountCode(models.Model):
     discount_percentage = models.FloatField()
     is_valid = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # The order whose checkout earned this code, for reward codes
+    issued_for_order = models.ForeignKey(
+        'Order', null=True, blank=True, related_name='reward_codes', on_delete=models.SET_NULL
+    )
 
     def __str__(self):
         return f"Code: {self.code} - Valid: {self.is_valid}"
@@ -44,13 +91,21 @@ class Order(models.Model):
     This model stores the orders received by the store.
     """
     user_id = models.CharField(max_length=50)
-    total_amount = models.FloatField()
-    discount_amount = models.FloatField(default=0)
+    total_amount = MoneyField()
+    discount_amount = MoneyField(default=0)
     discount_code = models.ForeignKey(
         DiscountCode, on_delete=models.SET_NULL, null=True, blank=True
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Per-user order history, newest first.
+            models.Index(fields=['user_id', 'created_at', 'id'], name='store_order_user_created_idx'),
+            # Date range scans for stats, exports and archival.
+            models.Index(fields=['created_at', 'id'], name='store_order_created_id_idx'),
+        ]
+
     def __str__(self):
         return f"Order #{self.id} - User: {self.user_id}, Total: {self.total_amount}"
 
@@ -63,7 +118,132 @@ class OrderItem(models.Model):
     order = models.ForeignKey(Order, related_name="items", on_delete=models.CASCADE)
     item_id = models.CharField(max_length=50)
     quantity = models.IntegerField()
-    price = models.FloatField()
+    price = MoneyField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['item_id'], name='store_orderitem_item_id_idx'),
+        ]
 
     def __str__(self):
         return f"OrderItem - Order: {self.order.id}, Item: {self.item_id}, Quantity: {self.quantity}"
+
+
+class Sequence(models.Model):
+    """
+    This model stores named monotonic counters, e.g. the running number of orders placed.
+    Incremented in the database so concurrent transactions never read the same value.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Sequence: {self.name} - Value: {self.value}"
+
+
+class StoreStats(models.Model):
+    """
+    This model holds the running purchase summary of the store in a single row.
+    Updated by each order's order_placed job and with each discount code generation,
+    so the stats endpoint reads one row instead of aggregating every order.
+    """
+    total_orders = models.BigIntegerField(default=0)
+    total_revenue = MoneyField(default=0)
+    total_discount = MoneyField(default=0)
+    total_discount_codes = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats - Orders: {self.total_orders}, Revenue: {self.total_revenue}"
+
+
+class DailyStats(models.Model):
+    """
+    This model holds the purchase summary of a single day.
+    """
+    date = models.DateField(unique=True)
+    total_orders = models.BigIntegerField(default=0)
+    total_revenue = MoneyField(default=0)
+    total_discount = MoneyField(default=0)
+    total_discount_codes = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Stats {self.date} - Orders: {self.total_orders}, Revenue: {self.total_revenue}"
+
+
+class ArchivedOrderStats(models.Model):
+    """
+    This model keeps the per-day totals of the orders moved to cold storage by
+    export_orders --archive (see store/archive.py). The rollups are recomputed from the
+    remaining orders plus these totals, so archiving leaves the purchase summary unchanged.
+    """
+    date = models.DateField(unique=True)
+    total_orders = models.BigIntegerField(default=0)
+    total_revenue = MoneyField(default=0)
+    total_discount = MoneyField(default=0)
+
+    def __str__(self):
+        return f"Archived {self.date} - Orders: {self.total_orders}, Revenue: {self.total_revenue}"
+
+
+class Job(models.Model):
+    """
+    This model is the queue of background jobs run by the run_worker command (see store/jobs.py).
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    # Enqueueing a job with a key that already exists is a no-op
+    idempotency_key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField()
+    run_at = models.DateTimeField()
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest due jobs of a status.
+            models.Index(fields=['status', 'run_at', 'id'], name='store_job_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.name} #{self.id} - {self.status}"
+
+
+class IdempotencyRecord(models.Model):
+    """
+    This model stores the response to each request sent with an Idempotency-Key header,
+    so retries of the request get the same response back (see store/idempotency.py).
+    """
+    scope = models.CharField(max_length=50)
+    key = models.CharField(max_length=255)
+    # SHA-256 of the request body, to reject a key reused for a different request
+    fingerprint = models.CharField(max_length=64)
+    # Null while the first request with the key is still running
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    body = models.BinaryField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='store_idempotency_scope_key_uniq'),
+        ]
+        indexes = [
+            # The purge command deletes expired records in order.
+            models.Index(fields=['expires_at', 'id'], name='store_idempotency_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"Idempotency key {self.scope}:{self.key} - Status: {self.status_code}"
@@ -0,0 +1,56 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import models
+
+CENT = Decimal('0.01')
+
+
+def to_cents(amount):
+    """
+    Converts an amount (Decimal, int or str) to a whole number of cents, rounding half up.
+    """
+    return int((Decimal(amount) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents):
+    """
+    Converts a whole number of cents back to a Decimal amount with two decimal places.
+    """
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def percentage_of(amount, percentage):
+    """
+    Returns percentage percent of amount, rounded half up to the cent.
+    Float percentages are read through their shortest repr, so 12.5 is exactly 12.5.
+    """
+    return (Decimal(amount) * Decimal(str(percentage)) / 100).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class MoneyField(models.DecimalField):
+    """
+    An amount of money with two decimal places, stored as a whole number of cents.
+
+    Python code sees Decimals, while the column is a bigint, so sums and products computed
+    by the database are exact integers on every backend (SQLite stores DECIMAL columns as
+    floating point). Amounts with more than two decimal places are rounded half up on save.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('max_digits', 15)
+        kwargs.setdefault('decimal_places', 2)
+        super().__init__(*args, **kwargs)
+
+    def get_internal_type(self):
+        return 'BigIntegerField'
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if not prepared:
+            value = self.get_prep_value(value)
+        return None if value is None else to_cents(value)
+
+    def get_db_prep_save(self, value, connection):
+        return self.get_db_prep_value(value, connection)
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else from_cents(value)
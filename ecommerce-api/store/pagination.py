@@ -0,0 +1,84 @@
+import base64
+import json
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """
+    Raised when a pagination cursor cannot be decoded.
+    """
+
+
+def encode_cursor(values):
+    """
+    Encodes the ordering values of the last row of a page into an opaque cursor.
+    """
+    payload = json.dumps([value.isoformat() if hasattr(value, "isoformat") else value for value in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_values(token, count):
+    """
+    Decodes a cursor produced by encode_cursor back into its count raw JSON values.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor.") from e
+
+    if not isinstance(values, list) or len(values) != count:
+        raise InvalidCursor("Invalid cursor.")
+    return values
+
+
+def decode_cursor(model, ordering, token):
+    """
+    Decodes a cursor produced by encode_cursor back into typed ordering values.
+    """
+    values = decode_values(token, len(ordering))
+
+    try:
+        return [model._meta.get_field(name).to_python(value) for name, value in zip(ordering, values)]
+    except Exception as e:
+        raise InvalidCursor("Invalid cursor.") from e
+
+
+def keyset_filter(queryset, ordering, cursor, descending=False):
+    """
+    Orders the queryset by the given fields and restricts it to the rows after the cursor.
+    """
+    lookup = "lt" if descending else "gt"
+    queryset = queryset.order_by(*[f"-{name}" if descending else name for name in ordering])
+
+    if cursor is None:
+        return queryset
+
+    values = decode_cursor(queryset.model, ordering, cursor)
+
+    # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+    condition = Q()
+    for position, name in enumerate(ordering):
+        equal = {ordering[i]: values[i] for i in range(position)}
+        condition |= Q(**equal, **{f"{name}__{lookup}": values[position]})
+
+    return queryset.filter(condition)
+
+
+def keyset_page(queryset, ordering, cursor=None, limit=100, descending=False):
+    """
+    Returns one page of rows (model instances or ``values()`` dicts) and the cursor of the next page.
+    The ordering fields must be included in the selected columns.
+    """
+    rows = list(keyset_filter(queryset, ordering, cursor, descending)[:limit + 1])
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if isinstance(last, dict):
+            next_cursor = encode_cursor([last[name] for name in ordering])
+        else:
+            next_cursor = encode_cursor([getattr(last, name) for name in ordering])
+
+    return rows, next_cursor
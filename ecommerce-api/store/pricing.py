@@ -0,0 +1,31 @@
+from django.db.models import Count, ExpressionWrapper, F, Sum
+
+from .models import Cart
+from .money import MoneyField
+
+# Price of one cart line in cents, computed exactly by the database through the join to the item
+LINE_TOTAL = ExpressionWrapper(F('quantity') * F('item__price'), output_field=MoneyField())
+
+
+def priced_lines(user_id):
+    """
+    Returns the user's cart lines in the order they were added, each annotated with its line_total.
+    """
+    return Cart.objects.filter(user_id=user_id).annotate(line_total=LINE_TOTAL).order_by('id')
+
+
+def cart_totals(user_id):
+    """
+    Returns the number of lines, the number of items and the total amount of the user's cart,
+    computed in a single aggregate query without loading the lines.
+    """
+    totals = Cart.objects.filter(user_id=user_id).aggregate(
+        line_count=Count('id'),
+        item_count=Sum('quantity'),
+        total_amount=Sum(LINE_TOTAL),
+    )
+    return {
+        'line_count': totals['line_count'],
+        'item_count': totals['item_count'] or 0,
+        'total_amount': totals['total_amount'] or 0,
+    }
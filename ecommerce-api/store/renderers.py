@@ -0,0 +1,35 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed, and with the standard
+    library otherwise (or for indented output).
+
+    The bytes are the same as JSONRenderer's: compact separators, UTF-8 without escaping,
+    U+2028/U+2029 escaped, and datetimes, times and decimals encoded by DRF's encoder.
+    Only floats outside [1e-4, 1e16) differ in how the exponent is spelled (1e16, not 1e+16),
+    and NaN and infinity render as null instead of raising; the API produces neither.
+    Payloads orjson cannot encode (e.g. integers beyond 64 bits) fall back to JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None or orjson is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Like JSONRenderer, escape the two characters JSON allows but JavaScript does not
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,128 @@
+"""
+Routes the reads of the read-only endpoints to the replica databases.
+
+Views decorated with replica_reads send their reads to one of REPLICA_DATABASES; everything else,
+and every write, goes to the primary ('default'). A replica lags behind the primary, so users
+read their own writes: views that change a user's data call stick_to_primary(user_id), and for
+the next REPLICA_STICKY_SECONDS that user's reads stay on the primary. Sticky views take the user
+from their user_id URL argument; views whose data is not any one user's pass sticky=False.
+Within a request, reads also stay on the primary once it wrote or opened a transaction.
+
+The sticky users are kept in the default cache, which must be shared by the server processes:
+check_sticky_cache() refuses a process-local or file-based one when replicas are configured.
+"""
+import asyncio
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from ecommerce.settings import REPLICA_DATABASES, REPLICA_STICKY_SECONDS
+
+# Set while a replica_reads view runs: a dict with 'pinned' once the request must read the primary
+_replica_reads = ContextVar('store_replica_reads', default=None)
+
+
+def _sticky_key(user_id):
+    return f'replica-sticky:{user_id}'
+
+
+def check_sticky_cache():
+    """
+    Raises ImproperlyConfigured when replicas are configured but the default cache is not shared
+    by the server processes, so a write in one process would not keep reads on the primary in another,
+    or is file-based, whose culling drops live entries and lists its whole directory on every write.
+    """
+    backend = caches[DEFAULT_CACHE_ALIAS]
+    if REPLICA_DATABASES and isinstance(backend, (LocMemCache, DummyCache, FileBasedCache)):
+        raise ImproperlyConfigured(
+            f"Read replicas need a default cache shared by every server process, not {type(backend).__name__}."
+        )
+
+
+def stick_to_primary(user_id):
+    """
+    Keeps the user's reads on the primary for REPLICA_STICKY_SECONDS, so they see their own write.
+    """
+    if REPLICA_DATABASES and user_id is not None:
+        cache.set(_sticky_key(user_id), True, timeout=REPLICA_STICKY_SECONDS)
+
+
+def read_from_primary():
+    """
+    Keeps the remaining reads of the running replica_reads view on the primary.
+    """
+    state = _replica_reads.get()
+    if state is not None:
+        state['pinned'] = True
+
+
+def _state_for(kwargs, sticky):
+    if not REPLICA_DATABASES:
+        return None
+    user_id = kwargs.get('user_id') if sticky else None
+    return {'pinned': user_id is not None and cache.get(_sticky_key(user_id)) is not None}
+
+
+def replica_reads(view=None, sticky=True):
+    """
+    Sends the reads of the decorated view to a replica, unless the user it reads for (its user_id
+    URL argument) wrote recently. With sticky=False the view always reads a replica.
+    Works on sync and async views; put it above @api_view.
+    """
+    if view is None:
+        return lambda view: replica_reads(view, sticky=sticky)
+
+    if asyncio.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            token = _replica_reads.set(_state_for(kwargs, sticky))
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        token = _replica_reads.set(_state_for(kwargs, sticky))
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    """
+    Database router of the store, see the module docstring.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _replica_reads.get()
+        if state is None or state['pinned']:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # A transaction on the primary must see its own reads
+            state['pinned'] = True
+            return DEFAULT_DB_ALIAS
+        return random.choice(REPLICA_DATABASES)
+
+    def db_for_write(self, model, **hints):
+        state = _replica_reads.get()
+        if state is not None:
+            state['pinned'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
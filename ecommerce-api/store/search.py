@@ -0,0 +1,161 @@
+"""
+Full-text search of the catalog.
+
+The index is created by migration 0009 and kept in sync with store_item by the database: an FTS5
+table on SQLite, a tsvector column with a GIN index on PostgreSQL. Other backends fall back to a
+LIKE scan of the whole catalog. On SQLite the index is kept by triggers on store_item, which are
+dropped whenever a migration rebuilds the table; they are restored after every migrate.
+
+Matches of every search term are ranked with name matches weighing more than description matches,
+and the last term also matches as a prefix ("cam" finds "camera") for autocomplete. Pages are
+keyset paged on (score, id), where a lower score ranks higher.
+"""
+import re
+from importlib import import_module
+
+from django.db import connections, router
+from django.db.models import FloatField, Q, Value
+
+from .models import Item
+from .money import from_cents, to_cents
+from .pagination import InvalidCursor, decode_values, encode_cursor
+from ecommerce.settings import SEARCH_MAX_TERMS
+
+TERM = re.compile(r'\w+')
+
+# Weights of the name and description matches in the ranking
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+# Columns of a result row: the ItemSerializer fields, then the score and id the pages are ordered by
+RESULT_COLUMNS = 'i.item_id, i.name, i.price, i.description, m.score, i.id'
+
+SQLITE_MATCHES = f"""
+    SELECT rowid AS id, bm25(store_item_fts, {NAME_WEIGHT}, {DESCRIPTION_WEIGHT}) AS score
+    FROM store_item_fts WHERE store_item_fts MATCH %s
+"""
+
+# ts_rank is higher for better matches; negated so that, as with bm25, lower ranks higher
+POSTGRESQL_MATCHES = """
+    SELECT id, -ts_rank(search_vector, query, 1) AS score
+    FROM store_item, to_tsquery('simple', %s) AS query WHERE search_vector @@ query
+"""
+
+
+def search_terms(query):
+    """
+    Splits a search query into lowercase words, dropping punctuation and operators.
+    """
+    return TERM.findall(query.lower())[:SEARCH_MAX_TERMS]
+
+
+def match_expression(vendor, terms):
+    """
+    Returns the backend's full-text query for the terms: all of them must match, the last one as a prefix.
+    Terms are \\w+ words, so they cannot carry query syntax.
+    """
+    if vendor == 'sqlite':
+        return ' '.join(f'"{term}"' for term in terms) + '*'
+    return ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+
+
+def search_catalog(query, min_price=None, max_price=None, cursor=None, limit=20):
+    """
+    Returns one page of the items matching query, best matches first, as ItemSerializer-shaped
+    dicts, and the cursor of the next page. Prices are inclusive bounds.
+    Raises InvalidCursor for a cursor that was not returned by a previous page.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return [], None
+    after = None if cursor is None else decode_values(cursor, 2)
+    if after is not None and not all(isinstance(value, (int, float)) for value in after):
+        raise InvalidCursor("Invalid cursor.")
+
+    connection = connections[router.db_for_read(Item)]
+    if connection.vendor in ('sqlite', 'postgresql'):
+        rows = _indexed_search(connection, terms, min_price, max_price, after, limit + 1)
+    else:
+        rows = _scan_search(connection.alias, terms, min_price, max_price, after, limit + 1)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][4:])
+
+    return [
+        {'item_id': item_id, 'name': name, 'price': from_cents(price), 'description': description}
+        for item_id, name, price, description, score, pk in rows
+    ], next_cursor
+
+
+def _indexed_search(connection, terms, min_price, max_price, after, limit):
+    matches = SQLITE_MATCHES if connection.vendor == 'sqlite' else POSTGRESQL_MATCHES
+    params = [match_expression(connection.vendor, terms)]
+
+    conditions = []
+    if min_price is not None:
+        conditions.append('i.price >= %s')
+        params.append(to_cents(min_price))
+    if max_price is not None:
+        conditions.append('i.price <= %s')
+        params.append(to_cents(max_price))
+    if after is not None:
+        conditions.append('(m.score > %s OR (m.score = %s AND i.id > %s))')
+        params += [after[0], after[0], after[1]]
+    params.append(limit)
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    sql = (
+        f"SELECT {RESULT_COLUMNS} FROM ({matches}) AS m JOIN store_item AS i ON i.id = m.id "
+        f"{where} ORDER BY m.score, i.id LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _scan_search(alias, terms, min_price, max_price, after, limit):
+    items = Item.objects.using(alias)
+    for term in terms:
+        items = items.filter(Q(name__icontains=term) | Q(description__icontains=term))
+    if min_price is not None:
+        items = items.filter(price__gte=min_price)
+    if max_price is not None:
+        items = items.filter(price__lte=max_price)
+    if after is not None:
+        items = items.filter(id__gt=after[1])
+    # Unranked: every match scores 0 and pages follow the ids
+    rows = items.annotate(score=Value(0.0, output_field=FloatField())).order_by('id').values_list(
+        'item_id', 'name', 'price', 'description', 'score', 'id'
+    )[:limit]
+    return [(item_id, name, to_cents(price), description, score, pk) for item_id, name, price, description, score, pk in rows]
+
+
+def restore_search_triggers(using, **kwargs):
+    """
+    Creates the SQLite search index triggers of migration 0009 that are missing, e.g. after a later
+    migration rebuilt store_item, and rebuilds the index from the catalog. Connected to post_migrate.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    triggers = import_module('store.migrations.0009_item_search_index').SQLITE_SEARCH_TRIGGERS
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT type, name FROM sqlite_master WHERE (type = 'table' AND name = 'store_item_fts') "
+            f"OR (type = 'trigger' AND name IN ({', '.join(['%s'] * len(triggers))}))",
+            list(triggers),
+        )
+        found = cursor.fetchall()
+        # Not migrated that far yet
+        if ('table', 'store_item_fts') not in found:
+            return
+        missing = set(triggers) - {name for kind, name in found if kind == 'trigger'}
+        if not missing:
+            return
+        for name in sorted(missing):
+            cursor.execute(triggers[name])
+        # Writes made while the triggers were missing are not in the index
+        cursor.execute("INSERT INTO store_item_fts(store_item_fts) VALUES ('rebuild')")
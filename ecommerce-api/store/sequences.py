@@ -0,0 +1,27 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Sequence
+
+ORDER_SEQUENCE = 'order'
+
+
+def next_value(name):
+    """
+    Increments the named sequence and returns its new value.
+
+    The increment is a single ``UPDATE ... SET value = value + 1`` which holds the row's write
+    lock until the surrounding transaction ends, so two transactions can never get the same
+    value. A missing sequence is created starting at 1.
+    """
+    with transaction.atomic(savepoint=False):
+        if not Sequence.objects.filter(name=name).update(value=F('value') + 1):
+            try:
+                with transaction.atomic():
+                    Sequence.objects.create(name=name, value=1)
+                return 1
+            except IntegrityError:
+                # Created concurrently, increment the winner's row instead
+                Sequence.objects.filter(name=name).update(value=F('value') + 1)
+
+        return Sequence.objects.values_list('value', flat=True).get(name=name)
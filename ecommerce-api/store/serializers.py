@@ -14,20 +14,69 @@ class CartSerializer(serializers.ModelSerializer):
         fields = ['user_id', 'item', 'quantity']
 
 class OrderItemSerializer(serializers.ModelSerializer):
-    item = ItemSerializer()
+    # Order lines only keep the item_id; the item is looked up in the "items" context dict
+    # (item_id to Item, see store.views.order_dicts), so a page of orders needs one item lookup.
+    # Lines of items removed from the catalog have no item.
+    item = serializers.SerializerMethodField()
 
     class Meta:
         model = OrderItem
-        fields = ['item', 'quantity', 'price']
+        fields = ['item_id', 'item', 'quantity', 'price']
+
+    def get_item(self, order_item):
+        item = self.context.get('items', {}).get(order_item.item_id)
+        return None if item is None else ItemSerializer(item).data
 
 class OrderSerializer(serializers.ModelSerializer):
-    order_items = OrderItemSerializer(many=True)
+    discount_code = serializers.SlugRelatedField(slug_field='code', read_only=True)
+    items = OrderItemSerializer(many=True, read_only=True)
+    # The codes the order earned, issued by its order_placed job after checkout
+    reward_codes = serializers.SlugRelatedField(slug_field='code', many=True, read_only=True)
     
     class Meta:
         model = Order
-        fields = ['id', 'user_id', 'total_amount', 'discount_amount', 'discount_code', 'order_items']
+        fields = [
+            'id', 'user_id', 'total_amount', 'discount_amount', 'discount_code', 'created_at', 'items', 'reward_codes'
+        ]
 
 class DiscountCodeSerializer(serializers.ModelSerializer):
     class Meta:
         model = DiscountCode
         fields = ['code', 'is_valid', 'discount_percentage']
+
+
+# Read-only fast paths for the hot JSON endpoints. They build the same dicts as the serializers
+# above (same keys, same order, same values) straight from .values_list() tuples, skipping the
+# per-field machinery of ModelSerializer, which costs more than the query for large results.
+
+ITEM_FIELDS = ItemSerializer.Meta.fields
+DISCOUNT_CODE_FIELDS = DiscountCodeSerializer.Meta.fields
+
+# Columns selected for a cart line: its own fields, then the item's through the join
+CART_LINE_COLUMNS = ['user_id', 'quantity'] + [f'item__{field}' for field in ITEM_FIELDS]
+
+
+def item_dicts(rows, fields=ITEM_FIELDS):
+    """
+    Returns an ItemSerializer-shaped dict per values_list(*fields) row.
+    """
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def cart_line_dicts(rows):
+    """
+    Returns a CartSerializer-shaped dict per values_list(*CART_LINE_COLUMNS) row.
+    Columns selected after CART_LINE_COLUMNS are ignored.
+    """
+    item_end = 2 + len(ITEM_FIELDS)
+    return [
+        {'user_id': row[0], 'item': dict(zip(ITEM_FIELDS, row[2:item_end])), 'quantity': row[1]}
+        for row in rows
+    ]
+
+
+def discount_code_dicts(rows):
+    """
+    Returns a DiscountCodeSerializer-shaped dict per values(*DISCOUNT_CODE_FIELDS) row.
+    """
+    return [{field: row[field] for field in DISCOUNT_CODE_FIELDS} for row in rows]
@@ -0,0 +1,148 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ArchivedOrderStats, DailyStats, DiscountCode, Order, StoreStats
+
+STORE_STATS_PK = 1
+ROLLUP_FIELDS = ('total_orders', 'total_revenue', 'total_discount', 'total_discount_codes')
+
+
+def _increment(model, lookup, **amounts):
+    """
+    Adds the amounts to the row matching lookup with a single UPDATE, creating the row if needed.
+    """
+    # Typed values, so money amounts are sent in cents like the column holds them
+    updates = {
+        field: F(field) + Value(amount, output_field=model._meta.get_field(field)) for field, amount in amounts.items()
+    }
+    if model.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **amounts)
+    except IntegrityError:
+        # Created concurrently, add to the winner's row instead
+        model.objects.filter(**lookup).update(**updates)
+
+
+def record_order(order, discount_codes_issued=0):
+    """
+    Adds a new order (and any reward codes issued with it) to the rollups.
+    Must be called inside the transaction that created the order.
+    """
+    amounts = {
+        'total_orders': 1,
+        'total_revenue': order.total_amount,
+        'total_discount': order.discount_amount,
+        'total_discount_codes': discount_codes_issued,
+    }
+    _increment(StoreStats, {'pk': STORE_STATS_PK}, **amounts)
+    _increment(DailyStats, {'date': timezone.localdate(order.created_at)}, **amounts)
+
+
+def record_discount_codes(count=1):
+    """
+    Adds generated discount codes to the rollups.
+    Must be called inside the transaction that created the codes.
+    """
+    _increment(StoreStats, {'pk': STORE_STATS_PK}, total_discount_codes=count)
+    _increment(DailyStats, {'date': timezone.localdate()}, total_discount_codes=count)
+
+
+def record_archived_orders(daily):
+    """
+    Adds {date: {total_orders, total_revenue, total_discount}} of orders being archived to the
+    archived totals. Must be called inside the transaction that deletes the orders.
+    """
+    for date, amounts in daily.items():
+        _increment(ArchivedOrderStats, {'date': date}, **amounts)
+
+
+def get_store_stats():
+    """
+    Returns the running totals as a dict, reading a single row.
+    """
+    totals = StoreStats.objects.filter(pk=STORE_STATS_PK).values(*ROLLUP_FIELDS).first()
+    return totals or {field: 0 for field in ROLLUP_FIELDS}
+
+
+def compute_rollups():
+    """
+    Recomputes the totals and the per-day buckets from the raw orders and discount codes,
+    and the totals of the archived orders.
+    """
+    order_totals = Order.objects.aggregate(
+        total_orders=Count('id'),
+        total_revenue=Sum('total_amount'),
+        total_discount=Sum('discount_amount')
+    )
+    totals = {
+        'total_orders': order_totals['total_orders'],
+        'total_revenue': order_totals['total_revenue'] or 0,
+        'total_discount': order_totals['total_discount'] or 0,
+        'total_discount_codes': DiscountCode.objects.count(),
+    }
+
+    daily = {}
+    order_days = Order.objects.annotate(date=TruncDate('created_at')).values('date').annotate(
+        total_orders=Count('id'),
+        total_revenue=Sum('total_amount'),
+        total_discount=Sum('discount_amount')
+    ).order_by()
+    for row in order_days:
+        date = row.pop('date')
+        daily[date] = dict(row, total_discount_codes=0)
+
+    for row in ArchivedOrderStats.objects.values('date', 'total_orders', 'total_revenue', 'total_discount'):
+        date = row.pop('date')
+        bucket = daily.setdefault(date, {'total_orders': 0, 'total_revenue': 0, 'total_discount': 0, 'total_discount_codes': 0})
+        for field, amount in row.items():
+            bucket[field] = (bucket[field] or 0) + amount
+            totals[field] += amount
+
+    code_days = DiscountCode.objects.annotate(date=TruncDate('created_at')).values('date').annotate(
+        total_discount_codes=Count('id')
+    ).order_by()
+    for row in code_days:
+        bucket = daily.setdefault(row['date'], {'total_orders': 0, 'total_revenue': 0, 'total_discount': 0})
+        bucket['total_discount_codes'] = row['total_discount_codes']
+
+    return totals, daily
+
+
+def rebuild_stats():
+    """
+    Replaces the rollups with values recomputed from the raw data.
+    """
+    with transaction.atomic():
+        totals, daily = compute_rollups()
+        StoreStats.objects.update_or_create(pk=STORE_STATS_PK, defaults=totals)
+        DailyStats.objects.all().delete()
+        DailyStats.objects.bulk_create([DailyStats(date=date, **values) for date, values in daily.items()])
+    return totals, daily
+
+
+def verify_stats():
+    """
+    Compares the rollups with the raw data and returns a list of human readable differences.
+    """
+    totals, daily = compute_rollups()
+    differences = _compare('totals', get_store_stats(), totals)
+
+    stored_daily = {row.pop('date'): row for row in DailyStats.objects.values('date', *ROLLUP_FIELDS)}
+    empty = {field: 0 for field in ROLLUP_FIELDS}
+    for date in sorted(set(daily) | set(stored_daily)):
+        differences += _compare(str(date), stored_daily.get(date, empty), daily.get(date, empty))
+
+    return differences
+
+
+def _compare(label, stored, expected):
+    differences = []
+    for field in ROLLUP_FIELDS:
+        # Amounts are whole cents, so the rollups must match exactly
+        if (stored[field] or 0) != (expected[field] or 0):
+            differences.append(f"{label}: {field} is {stored[field]}, expected {expected[field]}")
+    return differences
@@ -0,0 +1,28 @@
+import uuid
+
+from .jobs import job_handler
+from .models import DiscountCode, Order
+from .sequences import ORDER_SEQUENCE, next_value
+from .stats import record_order
+from ecommerce.settings import DEFAULT_DISCOUNT_ORDER_COUNT, DEFAULT_REWARD_DISCOUNT_PERCENTAGE
+
+ORDER_PLACED = 'order_placed'
+
+
+@job_handler(ORDER_PLACED)
+def order_placed(order_id):
+    """
+    Post-checkout work of an order: issues a reward discount code for every nth order
+    and adds the order to the purchase summary rollups.
+    """
+    order = Order.objects.get(pk=order_id)
+
+    reward_code = None
+    if next_value(ORDER_SEQUENCE) % DEFAULT_DISCOUNT_ORDER_COUNT == 0:
+        reward_code = DiscountCode.objects.create(
+            code=str(uuid.uuid4())[:8].upper(),
+            discount_percentage=DEFAULT_REWARD_DISCOUNT_PERCENTAGE,
+            issued_for_order=order
+        )
+
+    record_order(order, discount_codes_issued=1 if reward_code else 0)
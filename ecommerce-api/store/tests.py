@@ -1,7 +1,63 @@
+import json
+
+import asyncio
+import csv
+import gzip
+import os
+import random
+import re
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection, connections
+from django.db.models import Exists, OuterRef, Sum
 from django.urls import reverse
-from django.test import TestCase
-from .models import Item, Cart, Order, OrderItem, DiscountCode
+from django.utils import timezone
+from django.http import HttpResponse
+from django.test import AsyncClient, Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase
+from benchmarks.workload import ENDPOINT_WEIGHTS, Workload, find_regressions, load_postman_templates, replay, report
+from . import urls as store_urls
+from .cache import CatalogCache, catalog_cache
+from .carts import add_quantity, sweep_expired_carts
+from .checkout import CheckoutError, place_order
+from .idempotency import REPLAYED_HEADER
+from .importer import ImportResult, import_items
+from .inventory import InsufficientStock, _take, reserve, set_stock, stock_levels
+from .jobs import JOB_HANDLERS, claim_jobs, enqueue, job_handler, run_job, work_off
+from .metrics import MetricsMiddleware, registry
+from .money import from_cents, percentage_of, to_cents
+from .pricing import cart_totals
+from .renderers import FastJSONRenderer
+from .routers import check_sticky_cache
+from .stats import get_store_stats, rebuild_stats, verify_stats
+from .tasks import ORDER_PLACED
+from .serializers import (
+    CART_LINE_COLUMNS, DISCOUNT_CODE_FIELDS, ITEM_FIELDS, CartSerializer, DiscountCodeSerializer, ItemSerializer,
+    cart_line_dicts, discount_code_dicts, item_dicts
+)
+from .pagination import encode_cursor, keyset_filter
+from .models import ArchivedOrderStats, Item, Cart, DailyStats, Order, OrderItem, DiscountCode, IdempotencyRecord, Job, StockShard, StoreStats
+from ecommerce.database import HEALTH_CHECK_IDLE_SECONDS, close_unusable_connections, database_config, mark_connections_idle
+from ecommerce.settings import (
+    BASE_DIR, CATALOG_CACHE_ALIAS, CATALOG_VERSION_CHECK_INTERVAL, COLD_START_BUDGET_MS, DEFAULT_DISCOUNT_ORDER_COUNT, IDEMPOTENCY_LOCK_TIMEOUT, INVENTORY_SHARDS,
+    JOB_LOCK_TIMEOUT, JOB_RETRY_BASE_DELAY, METRICS_N_PLUS_ONE_THRESHOLD, REPLICA_STICKY_SECONDS,
+    STATS_DISCOUNT_CODES_MAX_PAGE_SIZE
+)
 
 class BaseTestCase(TestCase):
     """Base test class for shared setup logic."""
@@ -10,6 +66,35 @@ class BaseTestCase(TestCase):
     def setUpTestData(cls):
         cls.client = APIClient()
 
+    def setUp(self):
+        # Cached items would outlive the rolled back rows of the previous test
+        catalog_cache.clear()
+
+
+def run_concurrently(func, args_list):
+    """
+    Runs func once per args tuple, each in its own thread with its own database connection,
+    released together by a barrier. Returns the results (or raised exceptions) in order.
+    """
+    barrier = threading.Barrier(len(args_list))
+    results = [None] * len(args_list)
+
+    def worker(index, args):
+        try:
+            barrier.wait()
+            results[index] = func(*args)
+        except Exception as e:
+            results[index] = e
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(i, args)) for i, args in enumerate(args_list)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
 
 class ItemTests(BaseTestCase):
     """Test cases for item-related endpoints."""
@@ -36,6 +121,25 @@ class ItemTests(BaseTestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.data['message'], "Item ID, Name, and Price are required.")
 
+    def test_add_item_rejects_invalid_prices(self):
+        """Test that add_item accepts and rejects the same prices as the bulk importer."""
+        url = reverse('add_item')
+        for price, message in [
+            (19.999, "Price must not have more than two decimal places."),
+            ('abc', "Price must be a number."),
+            (-1, "Price must be a non-negative number."),
+            ('1e999999', "Price is too large."),
+        ]:
+            with self.subTest(price=price):
+                response = self.client.post(url, {'item_id': 'ITEM1', 'name': 'Pen', 'price': price}, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data['message'], message)
+        self.assertFalse(Item.objects.exists())
+
+        response = self.client.post(url, {'item_id': 'ITEM1', 'name': 'Pen', 'price': 19.99}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Item.objects.get(item_id='ITEM1').price, Decimal('19.99'))
+
     def test_list_items(self):
         """Test listing all items in the catalog."""
         Item.objects.create(item_id='ITEM123', name='Phone', price=600.0, description='A smartphone')
@@ -45,6 +149,56 @@ class ItemTests(BaseTestCase):
         self.assertEqual(len(response.data), 1)
         self.assertEqual(response.data[0]['name'], 'Phone')
 
+    def test_list_items_cursor_pagination(self):
+        """Test walking the catalog page by page with the keyset cursor."""
+        for i in range(5):
+            Item.objects.create(item_id=f'ITEM{i}', name=f'Item {i}', price=10.0 + i, description='')
+        url = reverse('list_items')
+
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 2}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen.extend(row['item_id'] for row in response.data['results'])
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, [f'ITEM{i}' for i in range(5)])
+
+    def test_list_items_field_projection(self):
+        """Test that only the requested fields are returned."""
+        Item.objects.create(item_id='ITEM123', name='Phone', price=600.0, description='A smartphone')
+        url = reverse('list_items')
+        response = self.client.get(url, {'fields': 'item_id,price'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [{'item_id': 'ITEM123', 'price': 600.0}])
+
+        response = self.client.get(url, {'fields': 'item_id,secret'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_items_invalid_cursor(self):
+        """Test that a malformed cursor is rejected."""
+        response = self.client.get(reverse('list_items'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_items_stream(self):
+        """Test streaming the catalog as NDJSON."""
+        for i in range(3):
+            Item.objects.create(item_id=f'ITEM{i}', name=f'Item {i}', price=10.0, description='')
+        response = self.client.get(reverse('list_items'), {'stream': '1', 'fields': 'item_id,name'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [
+            {'item_id': f'ITEM{i}', 'name': f'Item {i}'} for i in range(3)
+        ])
+
 
 class CartTests(BaseTestCase):
     """Test cases for cart-related endpoints."""
@@ -62,6 +216,25 @@ class CartTests(BaseTestCase):
         self.assertContains(response, "Added 2 of 'Tablet' to the cart.")
         self.assertTrue(Cart.objects.filter(user_id='user1', item=self.item).exists())
 
+    def test_add_to_cart_increments_existing_line(self):
+        """Test that adding an item again increments the same line in one query."""
+        url = reverse('add_to_cart')
+        data = {'user_id': 'user1', 'item_id': self.item.item_id, 'quantity': 2}
+        self.client.post(url, data, format='json')
+
+        # The item now comes from the catalog cache, leaving only the upsert
+        with self.assertNumQueries(1):
+            response = self.client.post(url, dict(data, quantity=3), format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['cart']['quantity'], 5)
+        self.assertEqual(Cart.objects.get(user_id='user1', item=self.item).quantity, 5)
+
+    def test_add_to_cart_unknown_item(self):
+        """Test adding an item that does not exist."""
+        data = {'user_id': 'user1', 'item_id': 'MISSING', 'quantity': 1}
+        response = self.client.post(reverse('add_to_cart'), data, format='json')
+        self.assertEqual(response.status_code, 404)
+
     def test_view_empty_cart(self):
         """Test viewing an empty cart."""
         url = reverse('view_cart', args=['user1'])
@@ -78,6 +251,450 @@ class CartTests(BaseTestCase):
         self.assertContains(response, "Your cart has 1 items.")
         self.assertContains(response, f"Tablet")
 
+    def test_view_cart_is_one_query(self):
+        """Test that the lines, their items and the totals are read in one query."""
+        other = Item.objects.create(item_id='ITEM456', name='Pen', price=2.0)
+        Cart.objects.create(user_id='user1', item=self.item, quantity=1)
+        Cart.objects.create(user_id='user1', item=other, quantity=3)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('view_cart', args=['user1']))
+        self.assertEqual(response.data['total_amount'], 306.0)
+        self.assertEqual(response.data['cart'][1]['item']['name'], 'Pen')
+
+    def test_view_cart_summary(self):
+        """Test that ?summary=1 returns the totals from one aggregate query without the lines."""
+        other = Item.objects.create(item_id='ITEM456', name='Pen', price=2.0)
+        Cart.objects.create(user_id='user1', item=self.item, quantity=1)
+        Cart.objects.create(user_id='user1', item=other, quantity=3)
+        url = reverse('view_cart', args=['user1'])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'summary': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {
+            'message': "Your cart has 2 items.", 'line_count': 2, 'item_count': 4, 'total_amount': 306.0
+        })
+        self.assertEqual(response.data['total_amount'], self.client.get(url).data['total_amount'])
+
+        response = self.client.get(reverse('view_cart', args=['user2']), {'summary': '1'})
+        self.assertEqual(response.data, {
+            'message': "Your cart is empty.", 'line_count': 0, 'item_count': 0, 'total_amount': 0
+        })
+
+
+class BatchCartTests(BaseTestCase):
+    """Test cases for the batch cart endpoint."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Item.objects.bulk_create([Item(item_id=f'ITEM{i}', name=f'Item {i}', price=10.0) for i in range(40)])
+
+    def test_batch_operations(self):
+        """Test adding, setting and removing lines with per-line errors."""
+        items = Item.objects.in_bulk(['ITEM0', 'ITEM1', 'ITEM2'], field_name='item_id')
+        Cart.objects.create(user_id='user1', item=items['ITEM1'], quantity=5)
+        Cart.objects.create(user_id='user1', item=items['ITEM2'], quantity=1)
+
+        data = {'user_id': 'user1', 'operations': [
+            {'item_id': 'ITEM0', 'quantity': 2, 'op': 'add'},
+            {'item_id': 'ITEM0', 'quantity': 1},
+            {'item_id': 'ITEM1', 'quantity': 3, 'op': 'set'},
+            {'item_id': 'ITEM2', 'op': 'remove'},
+            {'item_id': 'MISSING', 'quantity': 1, 'op': 'add'},
+            {'item_id': 'ITEM3', 'quantity': 1, 'op': 'replace'},
+            {'item_id': 5, 'quantity': 1, 'op': 'add'},
+        ]}
+        response = self.client.post(reverse('batch_update_cart'), data, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['applied'], 4)
+        self.assertEqual([(error['index'], error['item_id']) for error in response.data['errors']], [
+            (4, 'MISSING'), (5, 'ITEM3'), (6, 5)
+        ])
+        self.assertEqual(response.data['errors'][2]['message'], "Item ID must be a string.")
+        quantities = {line['item']['item_id']: line['quantity'] for line in response.data['cart']}
+        self.assertEqual(quantities, {'ITEM0': 3, 'ITEM1': 3})
+        self.assertEqual(response.data['total_amount'], 60.0)
+
+    def test_batch_query_count_is_constant(self):
+        """Test that restoring a cart costs the same queries for 5 or 40 lines."""
+        for size in (5, 40):
+            with self.subTest(lines=size):
+                catalog_cache.clear()
+                # The catalog version is read once per CATALOG_VERSION_CHECK_INTERVAL, not per request
+                catalog_cache.version()
+                data = {'user_id': f'user-{size}', 'operations': [
+                    {'item_id': f'ITEM{i}', 'quantity': 1, 'op': 'add'} for i in range(size)
+                ]}
+                # items, savepoint, lines, insert, release, resulting cart
+                with self.assertNumQueries(6):
+                    response = self.client.post(reverse('batch_update_cart'), data, content_type='application/json')
+                self.assertEqual(len(response.data['cart']), size)
+
+    def test_batch_requires_operations(self):
+        """Test that a request without an operations list is rejected."""
+        response = self.client.post(reverse('batch_update_cart'), {'user_id': 'user1'}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class CartExpiryTests(BaseTestCase):
+    """Test cases for the cart timestamps and the sweep of abandoned carts."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Item.objects.bulk_create([Item(item_id=f'ITEM{i}', name=f'Item {i}', price=10.0) for i in range(3)])
+        cls.items = list(Item.objects.order_by('item_id'))
+
+    def age(self, user_id, seconds):
+        Cart.objects.filter(user_id=user_id).update(updated_at=timezone.now() - timedelta(seconds=seconds))
+
+    def test_changes_set_updated_at(self):
+        """Test that the upsert and the batch endpoint both move updated_at."""
+        url = reverse('add_to_cart')
+        self.client.post(url, {'user_id': 'user1', 'item_id': 'ITEM0'}, format='json')
+        line = Cart.objects.get(user_id='user1')
+        self.assertIsNotNone(line.created_at)
+        self.assertEqual(line.created_at, line.updated_at)
+
+        self.age('user1', 3600)
+        self.client.post(url, {'user_id': 'user1', 'item_id': 'ITEM0'}, format='json')
+        line = Cart.objects.get(user_id='user1')
+        self.assertGreater(line.updated_at, timezone.now() - timedelta(seconds=60))
+        self.assertLess(line.created_at, line.updated_at)
+
+        self.age('user1', 3600)
+        data = {'user_id': 'user1', 'operations': [{'item_id': 'ITEM0', 'quantity': 5, 'op': 'set'}]}
+        self.client.post(reverse('batch_update_cart'), data, content_type='application/json')
+        self.assertGreater(Cart.objects.get(user_id='user1').updated_at, timezone.now() - timedelta(seconds=60))
+
+    def test_sweep_deletes_only_abandoned_carts(self):
+        """Test that a cart expires as a whole, only once none of its lines changed within the ttl."""
+        for user_id in ('old', 'mixed', 'fresh'):
+            for item in self.items:
+                add_quantity(user_id, item, 1)
+        self.age('old', 7200)
+        self.age('mixed', 7200)
+        Cart.objects.filter(user_id='mixed', item=self.items[0]).update(updated_at=timezone.now())
+
+        self.assertEqual(sweep_expired_carts(3600, batch_size=2), 3)
+        self.assertEqual(
+            sorted(Cart.objects.values_list('user_id', flat=True).distinct()), ['fresh', 'mixed']
+        )
+        self.assertEqual(Cart.objects.filter(user_id='mixed').count(), 3)
+        self.assertEqual(sweep_expired_carts(3600), 0)
+
+    def test_sweep_runs_one_transaction_per_batch(self):
+        """Test that the lines are swept in pk ranges of batch_size."""
+        for index in range(5):
+            add_quantity(f'user{index}', self.items[0], 1)
+        Cart.objects.update(updated_at=timezone.now() - timedelta(seconds=7200))
+
+        # bounds, then savepoint, delete, release for each range of two pks
+        with self.assertNumQueries(1 + 3 * 3):
+            self.assertEqual(sweep_expired_carts(3600, batch_size=2), 5)
+        self.assertFalse(Cart.objects.exists())
+
+    def test_sweep_carts_command(self):
+        """Test that sweep_carts reports the rows swept and their rate."""
+        add_quantity('old', self.items[0], 1)
+        add_quantity('fresh', self.items[0], 1)
+        self.age('old', 7200)
+
+        out = StringIO()
+        call_command('sweep_carts', '--ttl', '3600', '--batch-size', '10', stdout=out)
+        self.assertRegex(out.getvalue(), r"Swept 1 expired cart lines in \d+\.\d\ds, \d+ rows/s\.")
+        self.assertEqual(list(Cart.objects.values_list('user_id', flat=True)), ['fresh'])
+
+        with self.assertRaises(CommandError):
+            call_command('sweep_carts', '--batch-size', '0', stdout=StringIO())
+
+
+class BulkImportTests(BaseTestCase):
+    """Test cases for the bulk catalog import endpoint and command."""
+
+    def test_bulk_import_csv(self):
+        """Test creating and updating items from CSV with per-row errors."""
+        Item.objects.create(item_id='ITEM1', name='Old name', price=1.0, description='')
+        body = (
+            "item_id,name,description,price\n"
+            "ITEM1,Keyboard,Mechanical,49.5\n"
+            "ITEM2,Mouse,,19\n"
+            ",Nameless,,5\n"
+            "ITEM3,Cable,,free\n"
+            "ITEM4,Pen,,1.999\n"
+        )
+        response = self.client.post(reverse('bulk_import_items'), body, content_type='text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(response.data['failed'], 3)
+        self.assertEqual([error['row'] for error in response.data['errors']], [3, 4, 5])
+        self.assertEqual(response.data['errors'][2]['message'], "Price must not have more than two decimal places.")
+        self.assertEqual(Item.objects.get(item_id='ITEM1').name, 'Keyboard')
+        self.assertEqual(Item.objects.get(item_id='ITEM2').price, 19.0)
+        self.assertFalse(Item.objects.filter(item_id='ITEM3').exists())
+
+    def test_bulk_import_ndjson(self):
+        """Test importing NDJSON with a malformed line."""
+        body = "\n".join(json.dumps({'item_id': f'ITEM{i}', 'name': f'Item {i}', 'price': i}) for i in range(25))
+        body += "\nnot json\n"
+        response = self.client.post(reverse('bulk_import_items'), body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 25)
+        self.assertEqual(response.data['errors'], [{'row': 26, 'message': 'Row is not valid JSON.'}])
+        self.assertEqual(Item.objects.count(), 25)
+
+    def test_bulk_import_batch_query_count(self):
+        """Test that a batch costs the same number of queries whatever its size."""
+        for size in (10, 200):
+            with self.subTest(rows=size):
+                lines = ["item_id,name,price"] + [f"B{size}-{i},Item,1" for i in range(size)]
+                # lookup + upsert, inside a savepoint (the version bump waits for the commit)
+                with self.assertNumQueries(4):
+                    result = import_items(lines, 'csv', batch_size=size)
+                self.assertEqual(result.created, size)
+
+    def test_committed_batches_bump_the_catalog_version(self):
+        """Test that the batches committed before an import fails still invalidate the catalog."""
+        def lines():
+            yield "item_id,name,price"
+            yield "ITEM1,Lamp,1"
+            yield "ITEM2,Desk,2"
+            raise UnicodeDecodeError('utf-8', b'\xff', 0, 1, 'invalid start byte')
+
+        version = catalog_cache.version()
+        result = ImportResult()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(UnicodeDecodeError):
+                import_items(lines(), 'csv', batch_size=1, result=result)
+        self.assertEqual(len(callbacks), 2)
+        self.assertEqual(result.created, 2)
+        self.assertGreater(catalog_cache.version(), version)
+
+    def test_bulk_import_unsupported_content_type(self):
+        """Test that only CSV and NDJSON bodies are accepted."""
+        response = self.client.post(reverse('bulk_import_items'), {'item_id': 'ITEM1'}, format='json')
+        self.assertEqual(response.status_code, 415)
+
+    def test_import_items_command(self):
+        """Test importing a file with the management command."""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write("item_id,name,price\nITEM1,Lamp,12.5\nITEM2,,3\n")
+        self.addCleanup(os.remove, f.name)
+
+        out, err = StringIO(), StringIO()
+        call_command('import_items', f.name, stdout=out, stderr=err)
+        self.assertIn("1 created", out.getvalue())
+        self.assertIn("Row 2", err.getvalue())
+        self.assertEqual(Item.objects.get(item_id='ITEM1').price, 12.5)
+
+
+class SearchTests(BaseTestCase):
+    """Test cases for the catalog search endpoint and its full-text index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Item.objects.bulk_create([
+            Item(item_id='CAM1', name='Mirrorless camera', price=900, description='Full frame body'),
+            Item(item_id='CAM2', name='Compact camera', price=300, description='Pocket sized'),
+            Item(item_id='BAG1', name='Shoulder bag', price=80, description='Fits a camera and two lenses'),
+            Item(item_id='LENS1', name='Portrait lens', price=450, description='Fast prime lens'),
+        ])
+
+    def search(self, **params):
+        return self.client.get(reverse('search_items'), params, HTTP_ACCEPT='application/json')
+
+    def found(self, **params):
+        response = self.search(**params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [item['item_id'] for item in response.json()['results']]
+
+    def test_ranked_prefix_search(self):
+        """Test that name matches rank above description matches and the last word matches as a prefix."""
+        self.assertEqual(self.found(q='camera')[-1], 'BAG1')
+        self.assertEqual(sorted(self.found(q='camera')[:2]), ['CAM1', 'CAM2'])
+        self.assertEqual(sorted(self.found(q='CAM')), ['BAG1', 'CAM1', 'CAM2'])
+        self.assertEqual(self.found(q='compact cam'), ['CAM2'])
+        self.assertEqual(self.found(q='camera', min_price=100, max_price='300.00'), ['CAM2'])
+        self.assertEqual(self.found(q='tripod'), [])
+        # Query syntax is searched for as plain words
+        self.assertEqual(self.found(q='"camera" OR NEAR(*'), [])
+        self.assertEqual(self.found(q='***'), [])
+
+        response = self.search(q='camera')
+        results = {item['item_id']: item for item in response.json()['results']}
+        self.assertEqual(
+            results['CAM2'], {'item_id': 'CAM2', 'name': 'Compact camera', 'price': 300, 'description': 'Pocket sized'}
+        )
+        self.assertIn('ETag', response)
+
+    def test_search_pages(self):
+        """Test that search results are paged without gaps or repeats."""
+        seen, cursor = [], None
+        while True:
+            params = {'q': 'camera', 'limit': 1, **({'cursor': cursor} if cursor else {})}
+            response = self.search(**params)
+            seen += [item['item_id'] for item in response.json()['results']]
+            cursor = response.json()['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, self.found(q='camera'))
+
+        for params in [{}, {'q': ' '}, {'q': 'camera', 'limit': 0}, {'q': 'camera', 'min_price': 'cheap'},
+                       {'q': 'camera', 'max_price': '-1'}, {'q': 'camera', 'min_price': '1e999999'},
+                       {'q': 'camera', 'cursor': encode_cursor(['a', 'b'])}]:
+            with self.subTest(params=params):
+                self.assertEqual(self.search(**params).status_code, 400)
+
+    def test_index_follows_catalog_writes(self):
+        """Test that items added, imported, renamed and deleted are found accordingly."""
+        self.client.post(reverse('add_item'), {'item_id': 'TRI1', 'name': 'Travel tripod', 'price': 120}, format='json')
+        self.assertEqual(self.found(q='tripod'), ['TRI1'])
+
+        body = "item_id,name,description,price\nLENS1,Zoom lens,Weather sealed,650\nSTRAP1,Camera strap,,25\n"
+        self.client.post(reverse('bulk_import_items'), body, content_type='text/csv')
+        self.assertEqual(self.found(q='portrait'), [])
+        self.assertEqual(self.found(q='weather zoom'), ['LENS1'])
+        self.assertIn('STRAP1', self.found(q='camera'))
+
+        Item.objects.filter(item_id='CAM1').delete()
+        self.assertNotIn('CAM1', self.found(q='camera'))
+
+    def test_triggers_are_restored_after_migrate(self):
+        """Test that search index triggers dropped by a table rebuild are created again after migrate."""
+        if connection.vendor != 'sqlite':
+            self.skipTest("SQLite only.")
+
+        def triggers():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'store_item'")
+                return sorted(name for name, in cursor.fetchall())
+
+        expected = ['store_item_fts_delete', 'store_item_fts_insert', 'store_item_fts_update']
+        self.assertEqual(triggers(), expected)
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER store_item_fts_insert")
+        Item.objects.create(item_id='TRI1', name='Travel tripod', price=120)
+        self.assertEqual(self.found(q='tripod'), [])
+
+        emit_post_migrate_signal(0, False, connection.alias)
+        self.assertEqual(triggers(), expected)
+        # Items written without the triggers are indexed too
+        self.assertEqual(self.found(q='tripod'), ['TRI1'])
+
+
+class CatalogCacheTests(BaseTestCase):
+    """Test cases for the catalog cache and catalog ETags."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.item = Item.objects.create(item_id='ITEM123', name='Tablet', price=300.0)
+
+    def test_add_to_cart_uses_cached_item(self):
+        """Test that repeated adds resolve the item from the cache."""
+        url = reverse('add_to_cart')
+        data = {'user_id': 'user1', 'item_id': self.item.item_id, 'quantity': 1}
+        self.client.post(url, data, format='json')
+        self.assertEqual(catalog_cache.stats()['misses'], 1)
+
+        for _ in range(3):
+            response = self.client.post(url, data, format='json')
+            self.assertEqual(response.status_code, 200)
+        stats = catalog_cache.stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['local_hits'], 3)
+        self.assertEqual(Cart.objects.get(user_id='user1').quantity, 4)
+
+    def test_shared_tier_serves_other_processes(self):
+        """Test that a cold in-process tier is refilled from the shared tier."""
+        catalog_cache.get_item('ITEM123')
+        catalog_cache.local.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(catalog_cache.get_item('ITEM123').name, 'Tablet')
+        self.assertEqual(catalog_cache.stats()['shared_hits'], 1)
+
+    def test_version_is_shared_between_processes(self):
+        """Test that a catalog write in another worker process changes this process's ETag."""
+        etag = self.client.get(reverse('list_items'))['ETag']
+        # Another process: its own cache object, sharing only the database
+        CatalogCache(CATALOG_CACHE_ALIAS, 10).bump_version()
+        self.assertEqual(self.client.get(reverse('list_items'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with mock.patch('store.cache.time.monotonic', return_value=time.monotonic() + CATALOG_VERSION_CHECK_INTERVAL):
+            response = self.client.get(reverse('list_items'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_concurrent_bumps_are_not_lost(self):
+        """Test that every bump moves the version, as the increments happen in the database."""
+        version = catalog_cache.version()
+        others = [CatalogCache(CATALOG_CACHE_ALIAS, 10) for _ in range(3)]
+        for other in others:
+            other.version()
+            other.bump_version()
+        self.assertEqual(CatalogCache(CATALOG_CACHE_ALIAS, 10).version(), version + 3)
+
+    def test_add_item_invalidates_cache(self):
+        """Test that adding an item bumps the catalog version."""
+        version = catalog_cache.version()
+        catalog_cache.get_item('ITEM123')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('add_item'), {'item_id': 'ITEM999', 'name': 'Mouse', 'price': 20.0}, format='json')
+        self.assertNotEqual(catalog_cache.version(), version)
+        catalog_cache.get_item('ITEM123')
+        self.assertEqual(catalog_cache.stats()['misses'], 2)
+
+    def test_list_items_not_modified(self):
+        """Test that polling clients get a 304 until the catalog changes."""
+        url = reverse('list_items')
+        response = self.client.get(url)
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('add_item'), {'item_id': 'ITEM999', 'name': 'Mouse', 'price': 20.0}, format='json')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 2)
+
+    def test_cache_stats_endpoint(self):
+        """Test that the counters are exposed on the admin endpoint."""
+        catalog_cache.get_item('ITEM123')
+        response = self.client.get(reverse('view_cache_stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['misses'], 1)
+
+
+class ConcurrentCartTests(TransactionTestCase):
+    """Stress tests adding to the same cart line from parallel threads."""
+
+    def setUp(self):
+        catalog_cache.clear()
+        self.item = Item.objects.create(item_id='ITEM123', name='Tablet', price=300.0)
+
+    def test_parallel_adds_are_not_lost(self):
+        """Test that the final quantity is the sum of every concurrent add."""
+        quantities = [i % 4 + 1 for i in range(16)]
+
+        def add(quantity):
+            data = {'user_id': 'user1', 'item_id': 'ITEM123', 'quantity': quantity}
+            return Client().post(reverse('add_to_cart'), data, content_type='application/json').status_code
+
+        results = run_concurrently(add, [(quantity,) for quantity in quantities])
+
+        self.assertEqual(results, [200] * len(quantities))
+        self.assertEqual(Cart.objects.filter(user_id='user1').count(), 1)
+        self.assertEqual(Cart.objects.get(user_id='user1').quantity, sum(quantities))
+
+    def test_fallback_without_upsert(self):
+        """Test the F() expression fallback used by backends without ON CONFLICT ... RETURNING."""
+        with mock.patch('store.carts._supports_upsert_returning', return_value=False):
+            results = run_concurrently(add_quantity, [('user1', self.item, 2)] * 8)
+        self.assertEqual(sorted(results), list(range(2, 17, 2)))
+        self.assertEqual(Cart.objects.get(user_id='user1').quantity, 16)
+
 
 class CheckoutTests(BaseTestCase):
     """Test cases for checkout functionality."""
@@ -116,6 +733,1093 @@ class CheckoutTests(BaseTestCase):
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.data['message'], "Invalid or expired discount code.")
+        # The failed checkout must not touch the cart
+        self.assertEqual(Cart.objects.filter(user_id='user1').count(), 1)
+
+    def test_checkout_query_count_is_constant(self):
+        """Test that checkout runs the same number of queries regardless of cart size."""
+        Item.objects.bulk_create([
+            Item(item_id=f'BULK{i}', name=f'Bulk {i}', price=1.5, description='') for i in range(500)
+        ])
+        items = list(Item.objects.filter(item_id__startswith='BULK'))
+        url = reverse('checkout')
+
+        for size in (1, 50, 500):
+            with self.subTest(lines=size):
+                user_id = f'user-{size}'
+                Cart.objects.bulk_create([Cart(user_id=user_id, item=item, quantity=2) for item in items[:size]])
+                # cart, stock, order, lines, cart delete and the order_placed job, inside a savepoint
+                with self.assertNumQueries(8):
+                    response = self.client.post(url, {'user_id': user_id}, format='json')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data['final_amount'], size * 2 * 1.5)
+                self.assertEqual(OrderItem.objects.filter(order_id=response.data['order_id']).count(), size)
+                self.assertFalse(Cart.objects.filter(user_id=user_id).exists())
+
+
+class InventoryTests(BaseTestCase):
+    """Test cases for stock tracking, taken at checkout."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.item = Item.objects.create(item_id='ITEM123', name='Camera', price=500.0)
+        cls.untracked = Item.objects.create(item_id='ITEM456', name='Lens', price=100.0)
+
+    def test_checkout_takes_stock(self):
+        set_stock(self.item, 40, shards=4)
+        Cart.objects.create(user_id='user1', item=self.item, quantity=3)
+        Cart.objects.create(user_id='user1', item=self.untracked, quantity=1)
+
+        response = self.client.post(reverse('checkout'), {'user_id': 'user1'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(stock_levels([self.item.pk, self.untracked.pk]), {self.item.pk: 37})
+        # Taken from a single shard
+        self.assertEqual(sorted(StockShard.objects.values_list('quantity', flat=True)), [7, 10, 10, 10])
+
+    def test_quantity_is_gathered_from_several_shards(self):
+        set_stock(self.item, 10, shards=5)
+        Cart.objects.create(user_id='user1', item=self.item, quantity=7)
+
+        response = self.client.post(reverse('checkout'), {'user_id': 'user1'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(stock_levels([self.item.pk]), {self.item.pk: 3})
+        self.assertEqual(StockShard.objects.filter(quantity__lt=0).count(), 0)
+
+    def test_negative_quantities_never_add_stock(self):
+        set_stock(self.item, 10, shards=2)
+        for quantity in (-5, 0, 'x'):
+            with self.subTest(quantity=quantity):
+                data = {'user_id': 'user1', 'item_id': 'ITEM123', 'quantity': quantity}
+                self.assertEqual(self.client.post(reverse('add_to_cart'), data, format='json').status_code, 400)
+        data = {'user_id': 'user1', 'operations': [{'item_id': 'ITEM123', 'quantity': -5, 'op': 'add'}]}
+        response = self.client.post(reverse('batch_update_cart'), data, content_type='application/json')
+        self.assertEqual(response.data['errors'][0]['message'], "Quantity to add must be at least 1.")
+        self.assertFalse(Cart.objects.exists())
+
+        with self.assertRaises(ValueError):
+            reserve({self.item.pk: -5})
+        # A line written around the API is refused at checkout rather than restocking the item
+        Cart.objects.create(user_id='user1', item=self.item, quantity=-5)
+        response = self.client.post(reverse('checkout'), {'user_id': 'user1'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(stock_levels([self.item.pk]), {self.item.pk: 10})
+        self.assertFalse(Order.objects.exists())
+
+    def test_lost_race_still_finds_the_stock(self):
+        """Test that after a stale read the quantity is still taken while the item holds enough."""
+        set_stock(self.item, 6, shards=3)
+        first, second, third = StockShard.objects.filter(item=self.item).order_by('pk')
+
+        def quantities():
+            return list(StockShard.objects.filter(item=self.item).order_by('pk').values_list('quantity', flat=True))
+
+        # The third shard looked full but was emptied: the read again finds the first one
+        StockShard.objects.filter(pk=first.pk).update(quantity=3)
+        StockShard.objects.filter(pk=second.pk).update(quantity=2)
+        StockShard.objects.filter(pk=third.pk).update(quantity=0)
+        _take(self.item.pk, {first.pk: 0, second.pk: 0, third.pk: 3}, 3)
+        self.assertEqual(quantities(), [0, 2, 0])
+
+        # No single shard holds enough: gathered from the locked shards in pk order
+        StockShard.objects.filter(pk=first.pk).update(quantity=1)
+        _take(self.item.pk, {first.pk: 0, second.pk: 2, third.pk: 2}, 3)
+        self.assertEqual(quantities(), [0, 0, 0])
+
+        with self.assertRaises(InsufficientStock):
+            _take(self.item.pk, {first.pk: 1, second.pk: 0, third.pk: 0}, 1)
+
+    def test_checkout_refused_when_out_of_stock(self):
+        set_stock(self.item, 2)
+        Cart.objects.create(user_id='user1', item=self.item, quantity=3)
+        Cart.objects.create(user_id='user1', item=self.untracked, quantity=1)
+
+        response = self.client.post(reverse('checkout'), {'user_id': 'user1'}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['message'], "Not enough stock for ITEM123.")
+        self.assertEqual(stock_levels([self.item.pk]), {self.item.pk: 2})
+        self.assertEqual(Cart.objects.filter(user_id='user1').count(), 2)
+        self.assertFalse(Order.objects.exists())
+
+    def test_cart_availability(self):
+        set_stock(self.item, 1)
+        Cart.objects.create(user_id='user1', item=self.item, quantity=2)
+        Cart.objects.create(user_id='user1', item=self.untracked, quantity=5)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('view_cart_availability', args=['user1']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'available': False,
+            'items': [
+                {'item_id': 'ITEM123', 'quantity': 2, 'stock': 1, 'available': False},
+                {'item_id': 'ITEM456', 'quantity': 5, 'stock': None, 'available': True},
+            ]
+        })
+
+        set_stock(self.item, 2)
+        self.assertTrue(self.client.get(reverse('view_cart_availability', args=['user1'])).json()['available'])
+
+    def test_set_item_stock(self):
+        url = reverse('set_item_stock')
+        response = self.client.post(url, {'item_id': 'ITEM123', 'quantity': 10, 'shards': 3}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['stock'], 10)
+        self.assertEqual(list(StockShard.objects.order_by('shard').values_list('quantity', flat=True)), [4, 3, 3])
+
+        # Setting it again replaces the shards
+        self.client.post(url, {'item_id': 'ITEM123', 'quantity': 5}, format='json')
+        self.assertEqual(StockShard.objects.count(), INVENTORY_SHARDS)
+        self.assertEqual(stock_levels([self.item.pk]), {self.item.pk: 5})
+
+        self.assertEqual(self.client.post(url, {'item_id': 'ITEM123', 'quantity': -1}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(url, {'item_id': 'ITEM123', 'quantity': 'x'}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(url, {'item_id': 'NOPE', 'quantity': 1}, format='json').status_code, 404)
+
+
+class IdempotencyTests(BaseTestCase):
+    """Test cases for Idempotency-Key support on checkout and add_to_cart."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.item = Item.objects.create(item_id='ITEM123', name='Camera', price=500.0)
+
+    def post(self, name, data, key):
+        return self.client.post(reverse(name), data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_checkout_retry_is_replayed(self):
+        """Test that a retried checkout returns the first response after a single lookup."""
+        Cart.objects.create(user_id='user1', item=self.item, quantity=2)
+        first = self.post('checkout', {'user_id': 'user1'}, 'key-1')
+        self.assertEqual(first.status_code, 200)
+        self.assertNotIn(REPLAYED_HEADER, first)
+
+        # The failed insert of the key inside a savepoint, then the lookup
+        with self.assertNumQueries(5):
+            retry = self.post('checkout', {'user_id': 'user1'}, 'key-1')
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry[REPLAYED_HEADER], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+
+        # Without a key the checkout runs again and finds the cart empty
+        self.assertEqual(self.client.post(reverse('checkout'), {'user_id': 'user1'}, format='json').status_code, 400)
+
+    def test_add_to_cart_retry_is_replayed(self):
+        """Test that a retried add_to_cart adds the quantity once, and client errors are replayed too."""
+        data = {'user_id': 'user1', 'item_id': 'ITEM123', 'quantity': 2}
+        for _ in range(3):
+            response = self.post('add_to_cart', data, 'add-1')
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(Cart.objects.get(user_id='user1').quantity, 2)
+
+        missing = {'user_id': 'user1', 'item_id': 'MISSING'}
+        self.assertEqual(self.post('add_to_cart', missing, 'add-2').status_code, 404)
+        Item.objects.create(item_id='MISSING', name='Lens', price=100)
+        self.assertEqual(self.post('add_to_cart', missing, 'add-2').status_code, 404)
+
+        # Keys are scoped per endpoint
+        Cart.objects.create(user_id='user2', item=self.item, quantity=1)
+        self.assertEqual(self.post('checkout', {'user_id': 'user2'}, 'add-1').status_code, 200)
+
+    def test_key_reused_for_another_request(self):
+        """Test that a key sent again with a different body is rejected."""
+        self.post('add_to_cart', {'user_id': 'user1', 'item_id': 'ITEM123'}, 'add-1')
+        response = self.post('add_to_cart', {'user_id': 'user2', 'item_id': 'ITEM123'}, 'add-1')
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(Cart.objects.filter(user_id='user2').exists())
+
+        response = self.post('add_to_cart', {'user_id': 'user1', 'item_id': 'ITEM123'}, 'k' * 256)
+        self.assertEqual(response.status_code, 400)
+
+    def test_in_progress_and_abandoned_keys(self):
+        """Test that a duplicate waits for the first request, and takes over once that is presumed dead."""
+        data = {'user_id': 'user1', 'item_id': 'ITEM123'}
+        self.post('add_to_cart', data, 'add-1')
+        # As if the first request were still running
+        IdempotencyRecord.objects.update(status_code=None, body=None)
+
+        with mock.patch('store.idempotency.IDEMPOTENCY_WAIT_TIMEOUT', 0.1):
+            response = self.post('add_to_cart', data, 'add-1')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Cart.objects.get(user_id='user1').quantity, 1)
+
+        IdempotencyRecord.objects.update(created_at=timezone.now() - timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT + 1))
+        self.assertEqual(self.post('add_to_cart', data, 'add-1').status_code, 200)
+        self.assertEqual(Cart.objects.get(user_id='user1').quantity, 2)
+        self.assertEqual(self.post('add_to_cart', data, 'add-1')[REPLAYED_HEADER], 'true')
+
+    def test_expired_keys_are_purged(self):
+        """Test that expired keys run the request again and are deleted by purge_idempotency_keys."""
+        data = {'user_id': 'user1', 'item_id': 'ITEM123'}
+        self.post('add_to_cart', data, 'add-1')
+        self.post('add_to_cart', data, 'add-2')
+        IdempotencyRecord.objects.filter(key='add-1').update(expires_at=timezone.now())
+
+        self.post('add_to_cart', data, 'add-1')
+        self.assertEqual(Cart.objects.get(user_id='user1').quantity, 3)
+
+        IdempotencyRecord.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.post('add_to_cart', data, 'add-3')
+        out = StringIO()
+        call_command('purge_idempotency_keys', '--batch-size', '1', stdout=out)
+        self.assertIn("Purged 2 expired idempotency keys.", out.getvalue())
+        self.assertEqual(list(IdempotencyRecord.objects.values_list('key', flat=True)), ['add-3'])
+
+
+class OrderHistoryTests(BaseTestCase):
+    """Test cases for the order history endpoints."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.items = Item.objects.bulk_create([
+            Item(item_id=f'ITEM{i}', name=f'Item {i}', price=10 + i, description='') for i in range(5)
+        ])
+        cls.discount_code = DiscountCode.objects.create(code='DISCOUNT10', discount_percentage=10, is_valid=False)
+        cls.orders = []
+        for i in range(30):
+            order = Order.objects.create(
+                user_id='user1', total_amount=100, discount_code=cls.discount_code if i == 0 else None
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, item_id=item.item_id, quantity=i + 1, price=item.price) for item in cls.items[:3]
+            ])
+            cls.orders.append(order)
+        Order.objects.create(user_id='user2', total_amount=50)
+
+    def test_list_orders_pages_newest_first(self):
+        """Test that the order history is paged by keyset, newest first, without gaps or repeats."""
+        url = reverse('list_orders', args=['user1'])
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 7, **({'cursor': cursor} if cursor else {})}
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            seen += [order['id'] for order in response.data['results']]
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, [order.id for order in reversed(self.orders)])
+
+        self.assertEqual(self.client.get(url, {'limit': 0}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'cursor': 'garbage'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('list_orders', args=['nobody'])).data['results'], [])
+
+    def test_list_orders_query_count_is_constant(self):
+        """Test that a page of orders takes the same queries regardless of its size."""
+        url = reverse('list_orders', args=['user1'])
+        for limit in (1, 10, 30):
+            with self.subTest(limit=limit):
+                catalog_cache.clear()
+                catalog_cache.version()
+                # orders with their discount codes, their lines, their reward codes, and their items
+                with self.assertNumQueries(4):
+                    response = self.client.get(url, {'limit': limit})
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_view_order(self):
+        """Test that an order is returned with its lines and their current item details."""
+        order = self.orders[0]
+        Item.objects.filter(item_id='ITEM2').delete()
+        response = self.client.get(reverse('view_order', args=[order.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['discount_code'], 'DISCOUNT10')
+        self.assertEqual(
+            [(line['item_id'], line['item'] and line['item']['name'], line['quantity']) for line in response.data['items']],
+            [('ITEM0', 'Item 0', 1), ('ITEM1', 'Item 1', 1), ('ITEM2', None, 1)]
+        )
+        self.assertEqual(response.data['items'][1]['price'], 11)
+
+        response = self.client.get(reverse('view_order', args=[order.id + 1000]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_orders_show_their_reward_codes(self):
+        """Test that the reward codes issued by the order_placed job are listed with their order."""
+        Cart.objects.create(user_id='user3', item=Item.objects.get(item_id='ITEM0'), quantity=1)
+        with mock.patch('store.tasks.DEFAULT_DISCOUNT_ORDER_COUNT', 1):
+            with self.captureOnCommitCallbacks(execute=True):
+                order_id = self.client.post(reverse('checkout'), {'user_id': 'user3'}, format='json').data['order_id']
+            work_off()
+
+        code = DiscountCode.objects.get(issued_for_order=order_id).code
+        self.assertEqual(self.client.get(reverse('view_order', args=[order_id])).data['reward_codes'], [code])
+        self.assertEqual(self.client.get(reverse('list_orders', args=['user3'])).data['results'][0]['reward_codes'], [code])
+        self.assertEqual(self.client.get(reverse('view_order', args=[self.orders[0].id])).data['reward_codes'], [])
+
+
+class OrderExportTests(BaseTestCase):
+    """Test cases for the export_orders command and order archival."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.discount_code = DiscountCode.objects.create(code='DISCOUNT10', discount_percentage=10, is_valid=False)
+        cls.orders = {}
+        for label, created_at in (
+            ('jan', datetime(2024, 1, 15, 12, tzinfo=timezone.utc)),
+            ('jan_late', datetime(2024, 1, 31, 23, tzinfo=timezone.utc)),
+            ('feb', datetime(2024, 2, 10, 8, tzinfo=timezone.utc)),
+            ('recent', timezone.now()),
+        ):
+            order = Order.objects.create(
+                user_id=f'user-{label}', total_amount=90, discount_amount=10,
+                discount_code=cls.discount_code if label == 'jan' else None
+            )
+            Order.objects.filter(pk=order.pk).update(created_at=created_at)
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, item_id='ITEM1', quantity=2, price=25),
+                OrderItem(order=order, item_id='ITEM2', quantity=1, price=50),
+            ])
+            cls.orders[label] = order
+        # An order without lines
+        cls.orders['empty'] = Order.objects.create(user_id='user-empty', total_amount=0)
+
+    def export(self, *args, suffix='.ndjson.gz'):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, f'orders{suffix}')
+            call_command('export_orders', '--output', path, *args, stdout=StringIO(), stderr=StringIO())
+            opener = gzip.open if suffix.endswith('.gz') else open
+            with opener(path, 'rt', encoding='utf-8', newline='') as f:
+                return f.read()
+
+    def test_export_ndjson(self):
+        lines = [json.loads(line) for line in self.export('--chunk-size', '2').splitlines()]
+        self.assertEqual([line['order_id'] for line in lines], [
+            self.orders[label].id for label in ('jan', 'jan_late', 'feb', 'recent', 'empty')
+        ])
+        self.assertEqual(lines[0], {
+            'order_id': self.orders['jan'].id,
+            'user_id': 'user-jan',
+            'created_at': '2024-01-15T12:00:00Z',
+            'total_amount': 90.0,
+            'discount_amount': 10.0,
+            'discount_code': 'DISCOUNT10',
+            'items': [
+                {'item_id': 'ITEM1', 'quantity': 2, 'price': 25.0},
+                {'item_id': 'ITEM2', 'quantity': 1, 'price': 50.0},
+            ],
+        })
+        self.assertEqual(lines[-1]['items'], [])
+
+    def test_export_csv_date_range(self):
+        rows = list(csv.DictReader(self.export('--since', '2024-01-31', '--until', '2024-02-11', suffix='.csv').splitlines()))
+        self.assertEqual([(row['user_id'], row['item_id'], row['price']) for row in rows], [
+            ('user-jan_late', 'ITEM1', '25.00'),
+            ('user-jan_late', 'ITEM2', '50.00'),
+            ('user-feb', 'ITEM1', '25.00'),
+            ('user-feb', 'ITEM2', '50.00'),
+        ])
+
+    def test_export_reads_lines_per_chunk(self):
+        """Test that the lines are fetched with one query per chunk of orders, not per order."""
+        # The order iterator, then the lines of each of the 3 chunks
+        with self.assertNumQueries(4):
+            self.export('--chunk-size', '2')
+
+    def test_archive_moves_old_orders_and_keeps_stats(self):
+        rebuild_stats()
+        stats = get_store_stats()
+        self.assertEqual(verify_stats(), [])
+
+        with tempfile.TemporaryDirectory() as directory:
+            out = StringIO()
+            call_command(
+                'export_orders', '--archive', directory, '--until', '2024-03-01', '--batch-size', '2', stdout=out
+            )
+            self.assertIn('Archived 3 orders', out.getvalue())
+            self.assertEqual(sorted(os.listdir(directory)), ['orders-2024-01.ndjson.gz', 'orders-2024-02.ndjson.gz'])
+            with gzip.open(os.path.join(directory, 'orders-2024-01.ndjson.gz'), 'rt') as f:
+                archived = [json.loads(line) for line in f]
+            self.assertEqual([order['user_id'] for order in archived], ['user-jan', 'user-jan_late'])
+            self.assertEqual(len(archived[0]['items']), 2)
+
+        self.assertEqual(set(Order.objects.values_list('user_id', flat=True)), {'user-recent', 'user-empty'})
+        self.assertEqual(OrderItem.objects.count(), 2)
+        self.assertEqual(ArchivedOrderStats.objects.get(date='2024-01-15').total_orders, 1)
+        # The stats still count the archived orders, and rebuilding them from the raw data agrees
+        self.assertEqual(get_store_stats(), stats)
+        self.assertEqual(verify_stats(), [])
+        rebuild_stats()
+        self.assertEqual(get_store_stats(), stats)
+
+    def test_archive_skips_orders_with_pending_jobs(self):
+        enqueue(ORDER_PLACED, {'order_id': self.orders['feb'].id}, idempotency_key=f"{ORDER_PLACED}:{self.orders['feb'].id}")
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('export_orders', '--archive', directory, '--until', '2024-03-01', '--batch-size', '1', stdout=StringIO())
+        self.assertTrue(Order.objects.filter(pk=self.orders['feb'].pk).exists())
+        self.assertFalse(Order.objects.filter(pk=self.orders['jan'].pk).exists())
+
+    def test_invalid_options(self):
+        with self.assertRaises(CommandError):
+            call_command('export_orders', '--since', 'yesterday', stdout=StringIO(), stderr=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('export_orders', '--archive', '/tmp/unused', stdout=StringIO())
+
+
+class MoneyTests(BaseTestCase):
+    """Seeded randomized checks that money is stored and summed in exact cents."""
+
+    SEED = 20240601
+
+    def random_amount(self, rng, upper_cents=10 ** 8):
+        return from_cents(rng.randrange(upper_cents))
+
+    def test_cents_round_trip(self):
+        """Test that every two-place amount survives to_cents and from_cents unchanged."""
+        rng = random.Random(self.SEED)
+        for _ in range(2000):
+            amount = self.random_amount(rng, 10 ** 13)
+            self.assertEqual(from_cents(to_cents(amount)), amount)
+
+    def test_to_cents_rounds_half_up(self):
+        """Test that fractions of a cent round half up and anything less rounds down."""
+        rng = random.Random(self.SEED)
+        for _ in range(2000):
+            cents = rng.randrange(10 ** 9)
+            mills = rng.randrange(10)
+            amount = Decimal(cents * 10 + mills).scaleb(-3)
+            self.assertEqual(to_cents(amount), cents + (1 if mills >= 5 else 0))
+
+    def test_field_round_trip(self):
+        """Test that prices are read back from the database exactly as saved."""
+        rng = random.Random(self.SEED)
+        prices = [self.random_amount(rng) for _ in range(200)]
+        Item.objects.bulk_create([
+            Item(item_id=f'ITEM{i}', name='Item', price=price) for i, price in enumerate(prices)
+        ])
+        self.assertEqual(list(Item.objects.order_by('id').values_list('price', flat=True)), prices)
+        # Floats are read through their shortest repr, not their binary expansion
+        item = Item.objects.create(item_id='FLOAT', name='Item', price=0.1)
+        self.assertEqual(Item.objects.get(pk=item.pk).price, Decimal('0.10'))
+
+    def test_percentage_of(self):
+        """Test that a discount is rounded half up to the cent and never exceeds the amount."""
+        rng = random.Random(self.SEED)
+        for _ in range(2000):
+            amount = self.random_amount(rng)
+            percentage = rng.choice([rng.randrange(101), rng.randrange(200) / 2])
+            discount = percentage_of(amount, percentage)
+            exact = amount * Decimal(str(percentage)) / 100
+            self.assertEqual(discount.as_tuple().exponent, -2)
+            self.assertLessEqual(abs(discount - exact), Decimal('0.005'))
+            self.assertTrue(0 <= discount <= amount)
+
+    def test_checkout_totals_are_exact(self):
+        """Test that order totals and rollups equal the exact sum of the lines."""
+        rng = random.Random(self.SEED)
+        for order_number in range(5):
+            user_id = f'user{order_number}'
+            expected = Decimal(0)
+            for line in range(rng.randrange(1, 30)):
+                price = self.random_amount(rng, 10 ** 5)
+                quantity = rng.randrange(1, 5)
+                item = Item.objects.create(item_id=f'ITEM{order_number}-{line}', name='Item', price=price)
+                Cart.objects.create(user_id=user_id, item=item, quantity=quantity)
+                expected += price * quantity
+
+            self.assertEqual(cart_totals(user_id)['total_amount'], expected)
+            result = place_order(user_id)
+            self.assertEqual(result['final_amount'], expected)
+            self.assertEqual(Order.objects.get(pk=result['order_id']).total_amount, expected)
+
+        work_off()
+        self.assertEqual(get_store_stats()['total_revenue'], sum(Order.objects.values_list('total_amount', flat=True)))
+        self.assertEqual(verify_stats(), [])
+
+    def test_many_small_amounts_sum_exactly(self):
+        """Test that a thousand lines of 0.10 total exactly 100.00, which floats do not."""
+        Item.objects.bulk_create([Item(item_id=f'ITEM{i}', name='Item', price=Decimal('0.10')) for i in range(1000)])
+        pks = Item.objects.values_list('pk', flat=True)
+        Cart.objects.bulk_create([Cart(user_id='user1', item_id=pk, quantity=1) for pk in pks])
+        self.assertNotEqual(sum([0.1] * 1000), 100.0)
+        self.assertEqual(cart_totals('user1')['total_amount'], Decimal('100.00'))
+        self.assertEqual(place_order('user1')['final_amount'], Decimal('100.00'))
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """Stress tests running checkouts in parallel threads against the file-backed test database."""
+
+    def setUp(self):
+        self.item = Item.objects.create(item_id='ITEM123', name='Camera', price=500.0)
+
+    def test_discount_code_is_redeemed_once(self):
+        """Test that a discount code used by concurrent checkouts is only redeemed once."""
+        DiscountCode.objects.create(code='RACE10', discount_percentage=10, is_valid=True)
+        users = [f'user{i}' for i in range(8)]
+        Cart.objects.bulk_create([Cart(user_id=user_id, item=self.item, quantity=1) for user_id in users])
+
+        results = run_concurrently(place_order, [(user_id, 'RACE10') for user_id in users])
+
+        placed = [result for result in results if isinstance(result, dict)]
+        rejected = [result for result in results if isinstance(result, CheckoutError)]
+        self.assertEqual(len(placed), 1, results)
+        self.assertEqual(len(rejected), len(users) - 1, results)
+        self.assertEqual(Order.objects.filter(discount_code__code='RACE10').count(), 1)
+        # Rejected checkouts roll back completely and keep their carts
+        self.assertEqual(Cart.objects.count(), len(users) - 1)
+
+    def test_stock_is_never_oversold(self):
+        """Test that concurrent checkouts of a hot item take exactly its stock and no more."""
+        for quantity, stock, shards, expected_orders in ((1, 10, 4, 10), (2, 9, 4, 4)):
+            with self.subTest(quantity=quantity, shards=shards):
+                Order.objects.all().delete()
+                set_stock(self.item, stock, shards)
+                users = [f'user{i}' for i in range(16)]
+                Cart.objects.bulk_create([Cart(user_id=user_id, item=self.item, quantity=quantity) for user_id in users])
+
+                results = run_concurrently(place_order, [(user_id,) for user_id in users])
+
+                placed = [result for result in results if isinstance(result, dict)]
+                refused = [result for result in results if isinstance(result, CheckoutError)]
+                self.assertEqual(len(placed), expected_orders, results)
+                self.assertEqual(len(refused), len(users) - expected_orders, results)
+                self.assertTrue(all(error.status == 409 for error in refused))
+                self.assertEqual(stock_levels([self.item.pk]), {self.item.pk: stock - expected_orders * quantity})
+                self.assertFalse(StockShard.objects.filter(quantity__lt=0).exists())
+                self.assertEqual(OrderItem.objects.aggregate(sold=Sum('quantity'))['sold'], expected_orders * quantity)
+                Cart.objects.all().delete()
+
+    def test_one_reward_code_per_n_orders(self):
+        """Test that concurrent checkouts issue exactly one reward code per N orders."""
+        order_count = DEFAULT_DISCOUNT_ORDER_COUNT * 4
+        users = [f'user{i}' for i in range(order_count)]
+        Cart.objects.bulk_create([Cart(user_id=user_id, item=self.item, quantity=1) for user_id in users])
+
+        results = run_concurrently(place_order, [(user_id,) for user_id in users])
+        self.assertTrue(all(isinstance(result, dict) for result in results), results)
+
+        # Several workers drain the order_placed jobs at once
+        results = run_concurrently(work_off, [(f'worker{i}', 2) for i in range(4)])
+        self.assertEqual(sum(succeeded for succeeded, failed in results), order_count, results)
+        self.assertEqual(DiscountCode.objects.filter(issued_for_order__isnull=False).count(), 4)
+        self.assertEqual(Order.objects.count(), order_count)
+        self.assertEqual(get_store_stats()['total_orders'], order_count)
+
+
+class JobTests(BaseTestCase):
+    """Test cases for the background job queue."""
+
+    def register(self, name, func):
+        job_handler(name)(func)
+        self.addCleanup(JOB_HANDLERS.pop, name)
+
+    def test_idempotency_key(self):
+        """Test that a job is enqueued once per idempotency key."""
+        self.register('test_noop', lambda: None)
+        for _ in range(3):
+            enqueue('test_noop', idempotency_key='once')
+        enqueue('test_noop')
+        self.assertEqual(Job.objects.filter(idempotency_key='once').count(), 1)
+        self.assertEqual(Job.objects.count(), 2)
+
+        with self.assertRaises(ValueError):
+            enqueue('test_unknown')
+
+    def test_retry_with_backoff_then_fail(self):
+        """Test that a failing job is retried with a growing delay and rolled back every time."""
+        def fail(code):
+            DiscountCode.objects.create(code=code, discount_percentage=5)
+            raise RuntimeError("boom")
+
+        self.register('test_fail', fail)
+        enqueue('test_fail', {'code': 'PARTIAL'}, max_attempts=3)
+
+        for attempt, delay in [(1, JOB_RETRY_BASE_DELAY), (2, JOB_RETRY_BASE_DELAY * 2)]:
+            before = timezone.now()
+            with self.assertLogs('store.jobs', 'WARNING'):
+                self.assertEqual(work_off(), (0, 1))
+            job = Job.objects.get()
+            self.assertEqual((job.status, job.attempts), (Job.PENDING, attempt))
+            self.assertGreaterEqual(job.run_at, before + timedelta(seconds=delay))
+            # Not due yet
+            self.assertEqual(work_off(), (0, 0))
+            Job.objects.update(run_at=timezone.now())
+
+        with self.assertLogs('store.jobs', 'ERROR'):
+            self.assertEqual(work_off(), (0, 1))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 3))
+        self.assertIn("boom", job.last_error)
+        self.assertFalse(DiscountCode.objects.exists())
+
+    def test_stale_claim_is_reclaimed(self):
+        """Test that a job whose worker died is claimed again, and the dead worker cannot finish it."""
+        calls = []
+        self.register('test_count', lambda: calls.append(1))
+        enqueue('test_count')
+
+        [stale] = claim_jobs('dead-worker', 10)
+        self.assertEqual(claim_jobs('live-worker', 10), [])
+        Job.objects.update(locked_at=timezone.now() - timedelta(seconds=JOB_LOCK_TIMEOUT + 1))
+
+        [job] = claim_jobs('live-worker', 10)
+        self.assertEqual(job.attempts, 2)
+        self.assertTrue(run_job(job, 'live-worker'))
+        with self.assertLogs('store.jobs', 'WARNING'):
+            self.assertTrue(run_job(stale, 'dead-worker'))
+        self.assertEqual(calls, [1])
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+
+
+class JobWorkerTests(TransactionTestCase):
+    """Test cases for the run_worker command. Its threads use their own connections, so the data must be committed."""
+
+    def test_run_worker_once(self):
+        """Test that the worker runs the order_placed jobs of checkouts on its thread pool."""
+        item = Item.objects.create(item_id='ITEM123', name='Camera', price=500.0, description='')
+        for i in range(DEFAULT_DISCOUNT_ORDER_COUNT):
+            Cart.objects.create(user_id=f'user{i}', item=item, quantity=1)
+            place_order(f'user{i}')
+
+        out = StringIO()
+        call_command('run_worker', '--once', '--concurrency', '3', stdout=out)
+        self.assertIn(f"Ran {DEFAULT_DISCOUNT_ORDER_COUNT} jobs, 0 failed.", out.getvalue())
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), DEFAULT_DISCOUNT_ORDER_COUNT)
+        self.assertEqual(get_store_stats()['total_orders'], DEFAULT_DISCOUNT_ORDER_COUNT)
+        self.assertEqual(DiscountCode.objects.filter(issued_for_order__isnull=False).count(), 1)
+
+
+class AsyncViewTests(TransactionTestCase):
+    """Test cases for the native async endpoints. Their queries run in worker threads with their
+    own connections, so the data must be committed."""
+
+    def setUp(self):
+        catalog_cache.clear()
+        self.item = Item.objects.create(item_id='ITEM123', name='Camera', price=500.0, description='')
+        Cart.objects.create(user_id='user1', item=self.item, quantity=2)
+
+    def async_get(self, url, **headers):
+        # Django 3.2's AsyncClient sends extra keyword arguments as raw header names
+        async def get():
+            return await AsyncClient().get(url, **headers)
+        return async_to_sync(get)()
+
+    def test_read_endpoints_match_sync_views(self):
+        """Test that the async read endpoints return the same bytes as the DRF views."""
+        for sync_url, async_url in [
+            (reverse('list_items'), reverse('async_list_items')),
+            (reverse('view_cart', args=['user1']), reverse('async_view_cart', args=['user1'])),
+            (reverse('view_purchase_summary'), reverse('async_view_purchase_summary')),
+        ]:
+            with self.subTest(url=async_url):
+                expected = self.client.get(sync_url, HTTP_ACCEPT='application/json')
+                response = self.async_get(async_url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, expected.content)
+
+    def test_list_items_not_modified(self):
+        """Test that the async catalog honours If-None-Match."""
+        etag = self.async_get(reverse('async_list_items'))['ETag']
+        response = self.async_get(reverse('async_list_items'), **{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_worker_thread_queries_are_measured(self):
+        """Test that queries run in worker threads are counted against the async request."""
+        registry.reset()
+        self.async_get(reverse('async_view_cart', args=['user1']))
+        self.assertIn('store_db_queries_per_request_sum{view="async_view_cart"} 1', registry.render())
+
+    def test_concurrent_requests_overlap(self):
+        """Test that the middleware stack lets concurrent async requests wait on their data together."""
+        def slow_cart_contents(user_id, summary):
+            time.sleep(0.2)
+            return {'message': "Your cart is empty."}
+
+        async def view_all():
+            async_client = AsyncClient()
+            return await asyncio.gather(*[
+                async_client.get(reverse('async_view_cart', args=[f'user{i}'])) for i in range(10)
+            ])
+
+        registry.reset()
+        with mock.patch('store.async_views.cart_contents', slow_cart_contents):
+            started = time.perf_counter()
+            responses = async_to_sync(view_all)()
+            elapsed = time.perf_counter() - started
+        self.assertEqual([response.status_code for response in responses], [200] * 10)
+        # Run one at a time, the ten requests would take two seconds
+        self.assertLess(elapsed, 1.0)
+        self.assertIn('store_http_requests_total{view="async_view_cart",method="GET",status="200"} 10', registry.render())
+
+    def test_concurrent_checkouts(self):
+        """Test that overlapping async checkouts each place exactly one order."""
+        users = [f'user{i}' for i in range(2, 8)]
+        Cart.objects.bulk_create([Cart(user_id=user_id, item=self.item, quantity=1) for user_id in users])
+
+        async def checkout_all():
+            async_client = AsyncClient()
+            return await asyncio.gather(*[
+                async_client.post(reverse('async_checkout'), {'user_id': user_id}, content_type='application/json')
+                for user_id in users + ['user1', 'user1']
+            ])
+
+        responses = async_to_sync(checkout_all)()
+        statuses = sorted(response.status_code for response in responses)
+        # user1 checks out twice, the second attempt finds the cart empty
+        self.assertEqual(statuses, [200] * (len(users) + 1) + [400])
+        self.assertEqual(Order.objects.count(), len(users) + 1)
+        self.assertFalse(Cart.objects.exists())
+
+
+    def test_idempotent_checkout_duplicates(self):
+        """Test that concurrent duplicates of a checkout wait for the first one, on either endpoint."""
+        async def checkout_twice():
+            async_client = AsyncClient()
+            return await asyncio.gather(*[
+                async_client.post(
+                    reverse('async_checkout'), {'user_id': 'user1'}, content_type='application/json',
+                    **{'Idempotency-Key': 'key-1'}
+                )
+                for _ in range(2)
+            ])
+
+        first, second = async_to_sync(checkout_twice)()
+        self.assertEqual((first.status_code, second.status_code), (200, 200))
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(Order.objects.count(), 1)
+
+        retry = self.client.post(
+            reverse('checkout'), '{"user_id": "user1"}', content_type='application/json', HTTP_IDEMPOTENCY_KEY='key-1'
+        )
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry[REPLAYED_HEADER], 'true')
+
+class LoadWorkloadTests(TransactionTestCase):
+    """Test cases for the benchmark workload, so it keeps covering every endpoint. The async
+    endpoints query from worker threads, so the seeded data must be committed."""
+
+    def setUp(self):
+        catalog_cache.clear()
+
+    def make_workload(self):
+        return Workload(seed=7, items=30, users=5, discount_codes=10, templates=load_postman_templates())
+
+    def test_weights_cover_every_endpoint(self):
+        """Test that the workload has a request builder for every URL of the store."""
+        url_names = {pattern.name for pattern in store_urls.urlpatterns}
+        self.assertEqual(set(ENDPOINT_WEIGHTS), url_names)
+
+    def test_requests_are_reproducible(self):
+        """Test that the same seed generates the same requests."""
+        first = list(self.make_workload().requests(50))
+        self.assertEqual(first, list(self.make_workload().requests(50)))
+
+    def test_replay(self):
+        """Test that a small replay succeeds and reports queries for every endpoint it hit."""
+        workload = self.make_workload()
+        workload.populate()
+        catalog_cache.version()
+        # The catalog version is read again once a second, which a slow replay could run into
+        with mock.patch('store.cache.CATALOG_VERSION_CHECK_INTERVAL', 3600):
+            samples, elapsed = replay(workload, 200)
+        result = report(samples, elapsed, workload.config())
+
+        self.assertEqual(result['total']['requests'], 200)
+        self.assertEqual(result['endpoints']['list_items']['queries_max'], 1)
+        self.assertEqual(result['endpoints']['async_list_items']['queries_max'], 1)
+        self.assertEqual(find_regressions(result, result), [])
+
+    def test_find_regressions(self):
+        """Test that more queries or a slower p95 than the baseline are reported."""
+        endpoint = {'requests': 100, 'p95_ms': 10.0, 'queries_mean': 2.0}
+        baseline = {'config': {'seed': 0}, 'endpoints': {'view_cart': endpoint}}
+
+        more_queries = {'config': {'seed': 0}, 'endpoints': {'view_cart': dict(endpoint, queries_mean=3.0)}}
+        self.assertEqual(len(find_regressions(baseline, more_queries)), 1)
+
+        slower = {'config': {'seed': 0}, 'endpoints': {'view_cart': dict(endpoint, p95_ms=20.0)}}
+        self.assertEqual(len(find_regressions(baseline, slower)), 1)
+        self.assertEqual(find_regressions(baseline, slower, max_p95_increase=1.5), [])
+
+        with self.assertRaises(ValueError):
+            find_regressions(baseline, {'config': {'seed': 1}, 'endpoints': {}})
+
+
+class DatabaseProfileTests(TransactionTestCase):
+    """Test cases for the environment-driven database settings and the SQLite connection tuning."""
+
+    def test_config_from_environment(self):
+        """Test the database settings built from the environment variables."""
+        config = database_config({}, BASE_DIR)
+        self.assertEqual(config['ENGINE'], 'ecommerce.backends.sqlite3')
+        self.assertEqual(config['CONN_MAX_AGE'], 60)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertEqual(config['OPTIONS']['pragmas']['journal_mode'], 'WAL')
+
+        config = database_config({'DB_CONN_MAX_AGE': '0', 'DB_CONN_HEALTH_CHECKS': '0', 'DB_POOLER': 'PgBouncer'}, BASE_DIR)
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertFalse(config['CONN_HEALTH_CHECKS'])
+        self.assertTrue(config['DISABLE_SERVER_SIDE_CURSORS'])
+
+        with self.assertRaises(ImproperlyConfigured):
+            database_config({'DB_POOLER': 'pgpool'}, BASE_DIR)
+        # dj-database-url is only needed, and imported, when DATABASE_URL is set
+        with mock.patch.dict(sys.modules, {'dj_database_url': None}), self.assertRaises(ImproperlyConfigured):
+            database_config({'DATABASE_URL': 'postgres://store@db:5432/store'}, BASE_DIR)
+
+    def test_sqlite_pragmas(self):
+        """Test that new connections are set up with the configured PRAGMAs, and that only plain ones are accepted."""
+        if connection.vendor != 'sqlite':
+            self.skipTest("SQLite only.")
+        with connection.cursor() as cursor:
+            for name, expected in [('journal_mode', 'wal'), ('synchronous', 1), ('busy_timeout', 20000)]:
+                with self.subTest(pragma=name):
+                    cursor.execute(f'PRAGMA {name}')
+                    self.assertEqual(cursor.fetchone()[0], expected)
+
+        settings_dict = {**connection.settings_dict, 'OPTIONS': {'pragmas': {'journal_mode': 'WAL; DROP TABLE store_item'}}}
+        with self.assertRaises(ImproperlyConfigured):
+            type(connections['default'])(settings_dict).pragmas
+
+    def test_development_database_is_in_wal_mode(self):
+        """Test that the committed database is already in WAL mode, so connecting does not rewrite it."""
+        with open(BASE_DIR / 'db.sqlite3', 'rb') as f:
+            header = f.read(20)
+        # Bytes 18 and 19 are the file format write and read versions, 2 for WAL
+        self.assertEqual(header[18:20], b'\x02\x02')
+
+    def test_unusable_connection_is_closed(self):
+        """Test that the request health check closes a persistent connection the server dropped."""
+        connection.ensure_connection()
+        with mock.patch.dict(connection.settings_dict, {'CONN_HEALTH_CHECKS': True}):
+            with mock.patch.object(connection, 'is_usable', return_value=False) as is_usable:
+                # Connections that were not idle for long are reused without a check
+                mark_connections_idle()
+                close_unusable_connections()
+                self.assertFalse(is_usable.called)
+
+                with mock.patch('ecommerce.database.time.monotonic', return_value=time.monotonic() + HEALTH_CHECK_IDLE_SECONDS):
+                    close_unusable_connections()
+                    self.assertIsNone(connection.connection)
+                    # Checked once per idle period
+                    close_unusable_connections()
+                self.assertEqual(is_usable.call_count, 1)
+        # The next query reconnects
+        self.assertFalse(Item.objects.exists())
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """Test cases for the read replica router, with a second SQLite file standing in for the replica.
+    Nothing replicates to it, so rows written to only one side show which database served a read."""
+
+    # Resolved when the class is set up, after the replica alias is added
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        name = os.path.join(cls.replica_dir.name, 'replica.sqlite3')
+        connections.settings['replica'] = {**connections.settings['default'], 'NAME': name, 'TEST': {'NAME': name}}
+        super().setUpClass()
+        # The replica starts as a snapshot of the (empty, migrated) test primary
+        connections['default'].ensure_connection()
+        replica = sqlite3.connect(name)
+        connections['default'].connection.backup(replica)
+        replica.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        cls.replica_dir.cleanup()
+
+    def setUp(self):
+        catalog_cache.clear()
+        cache.clear()
+        patcher = mock.patch('store.routers.REPLICA_DATABASES', ['replica'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # The catalog version counts as new when first read; see test_catalog_reads_primary_after_a_change
+        patcher = mock.patch('store.views.REPLICA_STICKY_SECONDS', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.item = Item.objects.create(item_id='ITEM1', name='On the primary', price=10, description='')
+        replica_item = Item.objects.using('replica').create(item_id='ITEM2', name='On the replica', price=20, description='')
+        for user_id in ('user1', 'user2'):
+            Cart.objects.using('replica').create(user_id=user_id, item=replica_item, quantity=1)
+        StoreStats.objects.using('replica').update_or_create(pk=1, defaults={'total_orders': 7})
+
+    def test_process_local_cache_is_refused(self):
+        """Test that replicas with a cache other processes cannot see fail at startup."""
+        for backend in ('locmem.LocMemCache', 'dummy.DummyCache', 'filebased.FileBasedCache'):
+            with self.subTest(backend=backend):
+                with self.settings(CACHES={'default': {'BACKEND': f'django.core.cache.backends.{backend}', 'LOCATION': 'x'}}):
+                    with self.assertRaises(ImproperlyConfigured):
+                        check_sticky_cache()
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'x'}}):
+            check_sticky_cache()
+        with mock.patch('store.routers.REPLICA_DATABASES', []):
+            check_sticky_cache()
+
+    def cart_item_ids(self, user_id, name='view_cart'):
+        response = self.client.get(reverse(name, args=[user_id]), HTTP_ACCEPT='application/json')
+        return [line['item']['item_id'] for line in response.json()['cart']]
+
+    def test_read_endpoints_read_the_replica(self):
+        """Test that the read-only endpoints are served by the replica, and other reads by the primary."""
+        response = self.client.get(reverse('list_items'), HTTP_ACCEPT='application/json')
+        self.assertEqual([item['name'] for item in response.json()], ['On the replica'])
+        self.assertEqual(self.cart_item_ids('user1'), ['ITEM2'])
+        response = self.client.get(reverse('view_purchase_summary'), HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json()['total_orders'], 7)
+        self.assertEqual(
+            self.client.get(reverse('async_view_cart', args=['user1'])).json()['cart'][0]['item']['item_id'], 'ITEM2'
+        )
+
+        with mock.patch('store.routers.REPLICA_DATABASES', []):
+            self.assertEqual(self.client.get(reverse('view_cart', args=['user1'])).json()['cart'], [])
+
+    def test_catalog_reads_primary_after_a_change(self):
+        """Test that a new catalog version is served from the primary until replicas had time to catch up."""
+        def names(url, **extra):
+            return [item['name'] for item in self.client.get(url, HTTP_ACCEPT='application/json', **extra).json()]
+
+        with mock.patch('store.views.REPLICA_STICKY_SECONDS', REPLICA_STICKY_SECONDS):
+            catalog_cache.bump_version()
+            response = self.client.get(reverse('list_items'), HTTP_ACCEPT='application/json')
+            # The new ETag comes with the primary's listing, never with the replica's older one
+            self.assertEqual([item['name'] for item in response.json()], ['On the primary'])
+            self.assertEqual(names(reverse('async_list_items')), ['On the primary'])
+
+            later = time.monotonic() + REPLICA_STICKY_SECONDS
+            with mock.patch('store.cache.time.monotonic', return_value=later):
+                self.assertEqual(names(reverse('list_items')), ['On the replica'])
+                self.assertEqual(
+                    self.client.get(reverse('list_items'), HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304
+                )
+
+    def test_users_read_their_own_writes(self):
+        """Test that a user's reads stick to the primary after their write, while other users keep the replica."""
+        response = self.client.post(
+            reverse('add_to_cart'), {'user_id': 'user1', 'item_id': 'ITEM1'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.cart_item_ids('user1'), ['ITEM1'])
+        self.assertEqual(self.cart_item_ids('user1', 'async_view_cart'), ['ITEM1'])
+        self.assertEqual(self.cart_item_ids('user2'), ['ITEM2'])
+        # Catalog and stats are nobody's own data and keep reading the replica
+        response = self.client.get(reverse('list_items'), HTTP_ACCEPT='application/json')
+        self.assertEqual([item['name'] for item in response.json()], ['On the replica'])
+
+        # As if REPLICA_STICKY_SECONDS had passed
+        cache.clear()
+        self.assertEqual(self.cart_item_ids('user1'), ['ITEM2'])
+
+
+class StartupTests(SimpleTestCase):
+    """
+    Cold starts of fresh worker processes with the slim profile, serving from the test database.
+    The timed budget check only runs with BENCH_STARTUP=1 set, as wall-clock times vary with the load
+    of the machine; the unit suite checks what a slim worker imports instead.
+    """
+    # The workers read the test database, so it has to exist
+    databases = {'default'}
+
+    # Apps left out of the slim profile, and modules that are only imported on use
+    SLIM_PROFILE_SKIPPED_MODULES = [
+        'django.contrib.auth.models',
+        'django.contrib.sessions',
+        'django.contrib.staticfiles',
+        'store.archive',
+        'store.importer',
+    ]
+
+    def bench_startup(self, **options):
+        out = StringIO()
+        call_command(
+            'bench_startup', profile='ecommerce.settings_api', runs=1,
+            database=str(connections['default'].settings_dict['NAME']), stdout=out, **options
+        )
+        return out.getvalue()
+
+    def loaded_modules(self, profile, server):
+        probe = (
+            f"import json, sys\nimport ecommerce.{server}\n"
+            f"print(json.dumps([name for name in {self.SLIM_PROFILE_SKIPPED_MODULES!r} if name in sys.modules]))"
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', probe], cwd=BASE_DIR, capture_output=True, text=True, check=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': profile},
+        )
+        return json.loads(result.stdout)
+
+    def test_slim_profile_skips_unused_modules(self):
+        for server in ('wsgi', 'asgi'):
+            with self.subTest(server=server):
+                self.assertEqual(self.loaded_modules('ecommerce.settings_api', server), [])
+        self.assertIn('django.contrib.sessions', self.loaded_modules('ecommerce.settings', 'wsgi'))
+
+    @skipUnless(os.environ.get('BENCH_STARTUP'), "Timed benchmark, set BENCH_STARTUP=1 to run it.")
+    def test_slim_profile_within_cold_start_budget(self):
+        output = self.bench_startup(budget_ms=COLD_START_BUDGET_MS)
+        self.assertIn('ecommerce.settings_api', output)
+        self.assertRegex(output, r'wsgi .* cold start +\d+')
+        self.assertRegex(output, r'asgi .* cold start +\d+')
+
+    def test_budget_is_enforced(self):
+        with self.assertRaisesMessage(CommandError, 'Cold start over the budget of 1 ms: wsgi'):
+            self.bench_startup(servers='wsgi', budget_ms=1)
+
+
+class QueryPlanTests(BaseTestCase):
+    """Runs EXPLAIN on the hot queries and fails if any of them scans a whole table."""
+
+    # SQLite reports "SCAN <table>" for full scans and "SCAN <table> USING INDEX" for index walks
+    SQLITE_FULL_SCAN = re.compile(r'\bSCAN (?:TABLE )?(\w+)(?! USING (?:COVERING )?INDEX)(?!\w)')
+
+    def hot_queries(self):
+        created_at = timezone.now()
+        return {
+            'view_cart': Cart.objects.filter(user_id='user1'),
+            'add_to_cart': Cart.objects.filter(user_id='user1', item_id=1),
+            'cart_sweep': Cart.objects.filter(
+                ~Exists(Cart.objects.filter(user_id=OuterRef('user_id'), updated_at__gte=created_at)),
+                pk__gte=1, pk__lt=1000, updated_at__lt=created_at,
+            ),
+            'checkout_cart': Cart.objects.filter(user_id='user1').select_related('item'),
+            'checkout_discount': DiscountCode.objects.filter(code='CODE', is_valid=True),
+            'checkout_stock': StockShard.objects.filter(item__in=[1, 2, 3]),
+            'cart_availability': Cart.objects.filter(user_id='user1').values_list('item__item_id', 'quantity').annotate(
+                stock=Sum('item__stock_shards__quantity')
+            ),
+            'catalog_item': Item.objects.filter(item_id='ITEM1'),
+            'catalog_page': keyset_filter(Item.objects.all(), ('created_at', 'id'), encode_cursor([created_at, 1]))[:100],
+            'user_orders': Order.objects.filter(user_id='user1').order_by('-created_at', '-id')[:100],
+            'user_orders_page': keyset_filter(
+                Order.objects.filter(user_id='user1'), ('created_at', 'id'), encode_cursor([created_at, 1]), descending=True
+            )[:20],
+            'orders_by_date': Order.objects.filter(created_at__gte=created_at, created_at__lt=created_at),
+            'order_items_of_item': OrderItem.objects.filter(item_id='ITEM1'),
+            'order_lines': OrderItem.objects.filter(order_id__in=[1, 2, 3]),
+            'daily_stats': DailyStats.objects.filter(date=created_at.date()),
+        }
+
+    def full_scans(self, queryset):
+        vendor = connection.vendor
+        if vendor == 'sqlite':
+            return self.SQLITE_FULL_SCAN.findall(queryset.explain())
+        if vendor == 'postgresql':
+            # Tiny test tables make a sequential scan the cheapest plan, so forbid it
+            # and check the planner still has an index it can use
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            return re.findall(r'Seq Scan on (\w+)', queryset.explain())
+        self.skipTest(f"No query plan check for {vendor}.")
+
+    def test_hot_queries_use_indexes(self):
+        """Test that none of the hot queries falls back to a full table scan."""
+        for name, queryset in self.hot_queries().items():
+            with self.subTest(query=name):
+                self.assertEqual(self.full_scans(queryset), [], queryset.explain())
+
+    def test_plan_check_detects_full_scans(self):
+        """Test that the check itself notices an unindexed lookup."""
+        self.assertEqual(self.full_scans(Item.objects.filter(name='Phone')), ['store_item'])
 
 
 class AdminTests(BaseTestCase):
@@ -143,6 +1847,150 @@ class AdminTests(BaseTestCase):
         self.assertContains(response, "total_revenue")
         self.assertContains(response, "total_discount")
 
+    def test_purchase_summary_uses_rollups(self):
+        """Test that checkouts and generated codes are reflected in the summary rollups."""
+        item = Item.objects.create(item_id='ITEM123', name='Speaker', price=150.0)
+        Cart.objects.create(user_id='user1', item=item, quantity=2)
+        self.client.post(reverse('checkout'), {'user_id': 'user1'}, format='json')
+        self.client.post(reverse('generate_discount_code'), {'discount_percentage': 5}, format='json')
+        # The order reaches the rollups through its order_placed job
+        self.assertEqual(work_off(), (1, 0))
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('view_purchase_summary'))
+        self.assertEqual(response.data['total_orders'], 1)
+        self.assertEqual(response.data['total_revenue'], 300.0)
+        self.assertEqual(response.data['total_discount_codes'], 1)
+        self.assertEqual(len(response.data['discount_codes']), 1)
+
+        response = self.client.get(reverse('view_purchase_summary'), {'days': 7})
+        self.assertEqual(len(response.data['daily']), 1)
+        self.assertEqual(response.data['daily'][0]['total_orders'], 1)
+
+    def test_purchase_summary_pages_discount_codes(self):
+        """Test that the discount code list is paged."""
+        DiscountCode.objects.bulk_create([
+            DiscountCode(code=f'CODE{i}', discount_percentage=5) for i in range(5)
+        ])
+        url = reverse('view_purchase_summary')
+        response = self.client.get(url, {'limit': 3})
+        self.assertEqual([code['code'] for code in response.data['discount_codes']], ['CODE0', 'CODE1', 'CODE2'])
+        response = self.client.get(url, {'limit': 3, 'cursor': response.data['next_cursor']})
+        self.assertEqual([code['code'] for code in response.data['discount_codes']], ['CODE3', 'CODE4'])
+        self.assertIsNone(response.data['next_cursor'])
+
+        response = self.client.get(url, {'limit': STATS_DISCOUNT_CODES_MAX_PAGE_SIZE + 1})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['message'], f"Limit must be between 1 and {STATS_DISCOUNT_CODES_MAX_PAGE_SIZE}.")
+
+    def test_rebuild_stats_command(self):
+        """Test that drift is detected and repaired by the rebuild_stats command."""
+        Order.objects.create(user_id='user1', total_amount=150.0, discount_amount=10.0)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_stats', '--verify', stdout=StringIO(), stderr=StringIO())
+
+        call_command('rebuild_stats', stdout=StringIO())
+        call_command('rebuild_stats', '--verify', stdout=StringIO())
+        response = self.client.get(reverse('view_purchase_summary'))
+        self.assertEqual(response.data['total_orders'], 1)
+        self.assertEqual(response.data['total_revenue'], 150.0)
+
+
+class SerializerContractTests(BaseTestCase):
+    """Checks that the fast read paths render exactly the bytes of the DRF serializers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.items = [
+            Item.objects.create(item_id='ITEM1', name='Laptop', price=1200.0, description='A laptop'),
+            Item.objects.create(item_id='ITEM2', name='Café ☕', price=3, description=''),
+            Item.objects.create(item_id='ITEM3', name='Line\u2028break "quoted"', price=0.1, description='\\ \n \t'),
+        ]
+        for item in cls.items:
+            Cart.objects.create(user_id='user1', item=item, quantity=2)
+        DiscountCode.objects.create(code='SAVE10', discount_percentage=10)
+        DiscountCode.objects.create(code='USED', discount_percentage=12.5, is_valid=False)
+
+    def assertSameBytes(self, expected_data, fast_data):
+        expected = JSONRenderer().render(expected_data)
+        self.assertEqual(JSONRenderer().render(fast_data), expected)
+        self.assertEqual(FastJSONRenderer().render(fast_data), expected)
+
+    def test_items(self):
+        """Test that item_dicts matches ItemSerializer."""
+        self.assertSameBytes(
+            ItemSerializer(Item.objects.order_by('id'), many=True).data,
+            item_dicts(Item.objects.order_by('id').values_list(*ITEM_FIELDS))
+        )
+
+    def test_cart_lines(self):
+        """Test that cart_line_dicts matches CartSerializer."""
+        cart = Cart.objects.filter(user_id='user1').order_by('id')
+        self.assertSameBytes(
+            CartSerializer(cart.select_related('item'), many=True).data,
+            cart_line_dicts(cart.values_list(*CART_LINE_COLUMNS))
+        )
+
+    def test_discount_codes(self):
+        """Test that discount_code_dicts matches DiscountCodeSerializer."""
+        codes = DiscountCode.objects.order_by('id')
+        self.assertSameBytes(
+            DiscountCodeSerializer(codes, many=True).data,
+            discount_code_dicts(codes.values(*DISCOUNT_CODE_FIELDS))
+        )
+
+    def test_renderer_matches_json_renderer(self):
+        """Test that the fast renderer encodes DRF's special types like JSONRenderer, with or without orjson."""
+        data = {
+            'created_at': timezone.now(),
+            'date': timezone.localdate(),
+            'amount': Decimal('12.50'),
+            'big': 2 ** 70,
+            'nested': [{'a': None, 'b': True, 'c': 1.5}],
+            'text': 'Ünïcode \u2029',
+        }
+        expected = JSONRenderer().render(data)
+        self.assertEqual(FastJSONRenderer().render(data), expected)
+        with mock.patch('store.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(data), expected)
+
+
+class MetricsTests(BaseTestCase):
+    """Test cases for the request metrics middleware and the /metrics endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+
+    def test_requests_are_recorded_per_url_name(self):
+        """Test that requests, latency and queries are exported under the URL name."""
+        item = Item.objects.create(item_id='ITEM123', name='Tablet', price=300.0)
+        Cart.objects.create(user_id='user1', item=item, quantity=1)
+        with self.assertNumQueries(1):
+            self.client.get(reverse('view_cart', args=['user1']))
+
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('store_http_requests_total{view="view_cart",method="GET",status="200"} 1', body)
+        self.assertIn('store_http_request_duration_seconds_count{view="view_cart"} 1', body)
+        self.assertIn('store_db_queries_per_request_sum{view="view_cart"} 1', body)
+        self.assertIn('store_http_response_size_bytes_bucket{view="view_cart",le="+Inf"} 1', body)
+
+    def test_repeated_query_shape_is_logged(self):
+        """Test that one SQL shape repeated more than the threshold is logged as an N+1 pattern."""
+        def n_plus_one_view(request):
+            for pk in range(METRICS_N_PLUS_ONE_THRESHOLD + 1):
+                Item.objects.filter(pk__in=[pk] * (pk + 1)).exists()
+            return HttpResponse()
+
+        with self.assertLogs('store.metrics', 'WARNING') as logs:
+            MetricsMiddleware(n_plus_one_view)(RequestFactory().get('/'))
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn(f'{METRICS_N_PLUS_ONE_THRESHOLD + 1} executions', logs.output[0])
+        self.assertIn('store_db_repeated_queries_total{view="unmatched"} 1', registry.render())
+
 
 class IntegrationTests(BaseTestCase):
     """End-to-end tests combining multiple endpoints."""
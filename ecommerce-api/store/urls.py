@@ -1,12 +1,28 @@
 from django.urls import path
-from .views import add_item, add_to_cart, checkout, generate_discount_code, list_items, view_purchase_summary, view_cart
+from . import async_views
+from .views import add_item, add_to_cart, batch_update_cart, bulk_import_items, checkout, generate_discount_code, list_items, list_orders, search_items, set_item_stock, view_cache_stats, view_metrics, view_order, view_purchase_summary, view_cart, view_cart_availability
 
 urlpatterns = [
     path('api/cart/add/', add_to_cart, name='add_to_cart'),
     path('api/cart/view/<str:user_id>/', view_cart, name='view_cart'),
+    path('api/cart/availability/<str:user_id>/', view_cart_availability, name='view_cart_availability'),
+    path('api/cart/batch/', batch_update_cart, name='batch_update_cart'),
     path('api/cart/checkout/', checkout, name='checkout'),
+    path('api/orders/user/<str:user_id>/', list_orders, name='list_orders'),
+    path('api/orders/<int:order_id>/', view_order, name='view_order'),
     path('api/items/', list_items, name='list_items'),
+    path('api/items/search/', search_items, name='search_items'),
     path('api/admin/add-item/', add_item, name='add_item'),
+    path('api/admin/items/bulk/', bulk_import_items, name='bulk_import_items'),
+    path('api/admin/stock/', set_item_stock, name='set_item_stock'),
     path('api/admin/generate-discount/', generate_discount_code, name='generate_discount_code'),
     path('api/admin/stats/', view_purchase_summary, name='view_purchase_summary'),
+    path('api/admin/cache-stats/', view_cache_stats, name='view_cache_stats'),
+    path('metrics', view_metrics, name='metrics'),
+
+    # Native async variants for ASGI deployments
+    path('api/async/items/', async_views.list_items, name='async_list_items'),
+    path('api/async/cart/view/<str:user_id>/', async_views.view_cart, name='async_view_cart'),
+    path('api/async/cart/checkout/', async_views.checkout, name='async_checkout'),
+    path('api/async/admin/stats/', async_views.view_purchase_summary, name='async_view_purchase_summary'),
 ]
@@ -1,10 +1,52 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from django.db.models import Sum, Count
-from .models import Cart, DiscountCode, Item, Order, OrderItem
-from .serializers import ItemSerializer, CartSerializer, DiscountCodeSerializer
+from rest_framework.utils.encoders import JSONEncoder
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import etag, require_GET
+from .cache import catalog_cache
+from .carts import add_quantity, apply_operations
+from .checkout import CheckoutError, place_order
+from .idempotency import idempotent
+from .inventory import cart_availability, set_stock, stock_levels
+from .metrics import registry
+from .models import Cart, DailyStats, DiscountCode, Item, Order, OrderItem
+from .pagination import InvalidCursor, keyset_filter, keyset_page
+from .pricing import cart_totals, priced_lines
+from .routers import read_from_primary, replica_reads, stick_to_primary
+from .search import search_catalog
+from .serializers import (
+    CART_LINE_COLUMNS,
+    DISCOUNT_CODE_FIELDS,
+    ITEM_FIELDS,
+    CartSerializer,
+    ItemSerializer,
+    OrderSerializer,
+    cart_line_dicts,
+    discount_code_dicts,
+    item_dicts,
+)
+from .stats import ROLLUP_FIELDS, get_store_stats, record_discount_codes
+import codecs
+import json
 import uuid
-from ecommerce.settings import DEFAULT_DISCOUNT_ORDER_COUNT
+from decimal import Decimal, InvalidOperation
+from ecommerce.settings import (
+    CATALOG_MAX_PAGE_SIZE,
+    CATALOG_PAGE_SIZE,
+    CATALOG_STREAM_CHUNK_SIZE,
+    CART_BATCH_MAX_OPERATIONS,
+    INVENTORY_SHARDS,
+    MAX_STATS_DAYS,
+    ORDER_HISTORY_MAX_PAGE_SIZE,
+    ORDER_HISTORY_PAGE_SIZE,
+    REPLICA_STICKY_SECONDS,
+    SEARCH_MAX_PAGE_SIZE,
+    SEARCH_PAGE_SIZE,
+    STATS_DISCOUNT_CODES_MAX_PAGE_SIZE,
+    STATS_DISCOUNT_CODES_PAGE_SIZE,
+)
 
 @api_view(['POST'])
 def add_item(request):
@@ -16,9 +58,15 @@ def add_item(request):
     description = request.data.get('description', "")
     price = request.data.get('price')
 
-    if not (item_id and name and price):
+    if not (item_id and name and price not in (None, '')):
         return Response({"message": "Item ID, Name, and Price are required."}, status=400)
 
+    # Imported on use like in bulk_import_items, so both endpoints accept the same prices
+    from .importer import validate_price
+    price, error = validate_price(price)
+    if error:
+        return Response({"message": error}, status=400)
+
     try:
         # Create the new item
         item, created = Item.objects.get_or_create(
@@ -26,11 +74,12 @@ def add_item(request):
             defaults={
                 "name": name,
                 "description": description,
-                "price": float(price),
+                "price": price,
             },
         )
 
         if created:
+            catalog_cache.invalidate_on_commit()
             # Use ItemSerializer to return a response
             serializer = ItemSerializer(item)
             return Response({"message": f"Item '{name}' added successfully.", "item": serializer.data})
@@ -40,134 +89,405 @@ def add_item(request):
         return Response({"message": f"Error: {str(e)}"}, status=500)
 
 
+def is_true(value):
+    """
+    Reads a boolean query parameter such as ?stream=1 or ?summary=true.
+    """
+    return (value or '').lower() in ('1', 'true', 'yes')
+
+
+IMPORT_CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+}
+
+ITEM_ORDERING = ('created_at', 'id')
+
+
+@api_view(['POST'])
+def bulk_import_items(request):
+    """
+    Admin endpoint to create or update many items from a CSV (text/csv, with a header line)
+    or NDJSON (application/x-ndjson) request body. The body is streamed and written in batches;
+    invalid rows are reported per row without aborting the import.
+    """
+    content_type = request.content_type.split(';')[0].strip()
+    fmt = IMPORT_CONTENT_TYPES.get(content_type)
+    if fmt is None:
+        return Response({"message": f"Unsupported content type, expected one of {', '.join(IMPORT_CONTENT_TYPES)}."}, status=415)
+
+    stream = request.stream
+    if stream is None:
+        return Response({"message": "Request body is empty."}, status=400)
+
+    # Imported on use: the importer is only needed by this admin endpoint, not at worker startup
+    from .importer import ImportResult, import_items
+
+    # The batches written before a decoding error stay committed, so report them too
+    result = ImportResult()
+    try:
+        import_items(codecs.iterdecode(stream, request.encoding or 'utf-8'), fmt, result=result)
+    except UnicodeDecodeError:
+        return Response({
+            "message": f"Request body is not valid UTF-8, imported {result.created + result.updated} items before the error.",
+            **result.as_dict()
+        }, status=400)
+
+    return Response({
+        "message": f"Imported {result.created + result.updated} of {result.rows} items.",
+        **result.as_dict()
+    })
+
+
+def catalog_etag(request, *args, **kwargs):
+    """
+    ETag of every catalog listing: it only changes when the catalog version is bumped.
+
+    Runs before the listing is read. For REPLICA_STICKY_SECONDS after this process sees a new
+    version the listing is read from the primary, so a lagging replica never serves an older
+    catalog under the new version's ETag.
+    """
+    version = catalog_cache.version()
+    if catalog_cache.version_age() < REPLICA_STICKY_SECONDS:
+        read_from_primary()
+    return f'"catalog-{version}"'
+
+
+@replica_reads(sticky=False)
 @api_view(['GET'])
+@etag(catalog_etag)
 def list_items(request):
     """
-    Lists all items in the catalog.
+    Lists the items in the catalog.
+
+    Optional query parameters:
+    - fields: comma separated subset of the item fields to return.
+    - limit / cursor: keyset pagination on (created_at, id), returns {"results", "next_cursor"}.
+    - stream=1: streams the items as NDJSON in chunks instead of one JSON document.
+    Without limit, cursor or stream the whole catalog is returned as a list.
+    Responses carry an ETag derived from the catalog version and If-None-Match gets a 304.
+    """
+    listing = catalog_listing(request.query_params)
+    if isinstance(listing, StreamingHttpResponse):
+        return listing
+    payload, status = listing
+    return Response(payload, status=status)
+
+
+@replica_reads(sticky=False)
+@api_view(['GET'])
+@etag(catalog_etag)
+def search_items(request):
+    """
+    Searches the names and descriptions of the catalog items, best matches first.
+
+    Query parameters:
+    - q: the words to search for; the last one also matches as a prefix, for autocomplete.
+    - min_price / max_price: optional inclusive price range.
+    - limit / cursor: pagination, returns {"results", "next_cursor"}.
+    Responses carry the catalog ETag like list_items.
+    """
+    query = request.query_params.get('q', '')
+    if not query.strip():
+        return Response({"message": "A search query (q) is required."}, status=400)
+
+    try:
+        limit = int(request.query_params.get('limit', SEARCH_PAGE_SIZE))
+    except ValueError:
+        limit = 0
+    if not 0 < limit <= SEARCH_MAX_PAGE_SIZE:
+        return Response({"message": f"Limit must be between 1 and {SEARCH_MAX_PAGE_SIZE}."}, status=400)
+
+    prices = {}
+    for name in ('min_price', 'max_price'):
+        value = request.query_params.get(name)
+        if value is None:
+            continue
+        try:
+            prices[name] = Decimal(value)
+        except InvalidOperation:
+            prices[name] = None
+        if prices[name] is None or not prices[name].is_finite() or prices[name] < 0:
+            return Response({"message": "Prices must be non-negative numbers."}, status=400)
+        # Bounded like the item prices, so converting to cents cannot overflow
+        if prices[name] >= 10 ** (Item._meta.get_field('price').max_digits - 2):
+            return Response({"message": "Prices are too large."}, status=400)
+
+    try:
+        results, next_cursor = search_catalog(
+            query, cursor=request.query_params.get('cursor'), limit=limit, **prices
+        )
+    except InvalidCursor as e:
+        return Response({"message": str(e)}, status=400)
+
+    return Response({
+        "results": results,
+        "next_cursor": next_cursor
+    })
+
+
+def catalog_listing(params, allow_stream=True):
+    """
+    Builds the catalog listing for the list_items query parameters.
+    Returns (payload, status), or a streaming response when stream=1 is requested.
     """
-    items = Item.objects.all()
-    serializer = ItemSerializer(items, many=True)
-    return Response(serializer.data, status=200)
+    fields = ITEM_FIELDS
+    if params.get('fields'):
+        fields = [field.strip() for field in params['fields'].split(',') if field.strip()]
+        unknown = [field for field in fields if field not in ITEM_FIELDS]
+        if unknown or not fields:
+            return {"message": f"Unknown field(s): {', '.join(unknown)}. Allowed fields: {', '.join(ITEM_FIELDS)}."}, 400
+
+    cursor = params.get('cursor')
+    limit = params.get('limit')
+    stream = is_true(params.get('stream'))
+
+    if stream and not allow_stream:
+        return {"message": "Streaming is not available on this endpoint."}, 400
+
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if not 0 < limit <= CATALOG_MAX_PAGE_SIZE:
+            return {"message": f"Limit must be between 1 and {CATALOG_MAX_PAGE_SIZE}."}, 400
 
+    if cursor is None and limit is None and not stream:
+        return item_dicts(Item.objects.values_list(*fields).order_by(*ITEM_ORDERING), fields), 200
 
+    # The ordering columns are always selected so the cursor can be built from the last row.
+    items = Item.objects.values(*fields, *ITEM_ORDERING)
+
+    try:
+        if stream:
+            items = keyset_filter(items, ITEM_ORDERING, cursor)
+            if limit is not None:
+                items = items[:limit]
+            return StreamingHttpResponse(
+                _stream_ndjson(items.iterator(chunk_size=CATALOG_STREAM_CHUNK_SIZE), fields),
+                content_type='application/x-ndjson',
+            )
+
+        page, next_cursor = keyset_page(items, ITEM_ORDERING, cursor, limit or CATALOG_PAGE_SIZE)
+    except InvalidCursor as e:
+        return {"message": str(e)}, 400
+
+    return {
+        "results": [{field: row[field] for field in fields} for row in page],
+        "next_cursor": next_cursor
+    }, 200
+
+
+def _stream_ndjson(rows, fields):
+    """
+    Yields the rows as newline delimited JSON, CATALOG_STREAM_CHUNK_SIZE lines per chunk.
+    """
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps(
+            {field: row[field] for field in fields}, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')
+        ))
+        if len(chunk) >= CATALOG_STREAM_CHUNK_SIZE:
+            yield '\n'.join(chunk) + '\n'
+            chunk = []
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
+
+
+@idempotent('add_to_cart')
 @api_view(['POST'])
 def add_to_cart(request):
     """
     Adds an item to the user's cart.
+    Retries sent with the same Idempotency-Key header get the first response back.
     """
     user_id = request.data.get('user_id')
     item_id = request.data.get('item_id')
-    quantity = int(request.data.get('quantity', 1))
-
     try:
-        # Fetch the item
-        item = Item.objects.get(item_id=item_id)
-
-        # Add to cart
-        cart_item, created = Cart.objects.get_or_create(user_id=user_id, item=item)
-        if not created:
-            cart_item.quantity += quantity
-        else:
-            cart_item.quantity = quantity
-        cart_item.save()
+        quantity = int(request.data.get('quantity', 1))
+    except (TypeError, ValueError):
+        quantity = 0
+    if quantity < 1:
+        return Response({"message": "Quantity to add must be a whole number of at least 1."}, status=400)
+
+    # Fetch the item
+    item = catalog_cache.get_item(item_id)
+    if item is None:
+        return Response({"message": "Item does not exist."}, status=404)
 
+    try:
+        # Add to cart in a single upsert
+        cart_item = Cart(user_id=user_id, item=item, quantity=add_quantity(user_id, item, quantity))
+        stick_to_primary(user_id)
         cart_serializer = CartSerializer(cart_item)
 
         return Response({
             "message": f"Added {quantity} of '{item.name}' to the cart.",
             "cart": cart_serializer.data
         })
-    except Item.DoesNotExist:
-        return Response({"message": "Item does not exist."}, status=404)
     except Exception as e:
         return Response({"message": f"Error: {str(e)}"}, status=500)
 
 
+@replica_reads
 @api_view(['GET'])
 def view_cart(request, user_id):
     """
     Fetches all items in the user's cart.
+    With ?summary=1 only the line count, item count and total amount are returned.
     """
-    cart_items = Cart.objects.filter(user_id=user_id)
+    return Response(cart_contents(user_id, summary=is_true(request.query_params.get('summary'))))
 
-    if not cart_items.exists():
-        return Response({"message": "Your cart is empty.", "cart":[], "amount":0})
 
-    cart_serializer = CartSerializer(cart_items, many=True)
-    
-    total_amount = sum(cart_item['quantity'] * cart_item['item']['price'] for cart_item in cart_serializer.data)
+@replica_reads
+@api_view(['GET'])
+def view_cart_availability(request, user_id):
+    """
+    Checks the stock of every item in the user's cart at once, e.g. before checkout.
+    "available" is false when any line asks for more than the stock of its item;
+    "stock" is null for items whose stock is not tracked.
+    """
+    lines = cart_availability(user_id)
+    return Response({
+        "available": all(line['available'] for line in lines),
+        "items": lines
+    })
+
+
+@api_view(['POST'])
+def batch_update_cart(request):
+    """
+    Applies many cart changes in one request and returns the resulting cart.
+
+    Expects {"user_id": ..., "operations": [{"item_id": ..., "quantity": ..., "op": "add" | "set" | "remove"}]}.
+    Operations that cannot be applied (e.g. unknown items) are reported per line in "errors".
+    """
+    user_id = request.data.get('user_id')
+    operations = request.data.get('operations')
+
+    if not user_id or not isinstance(operations, list):
+        return Response({"message": "User ID and a list of operations are required."}, status=400)
+    if len(operations) > CART_BATCH_MAX_OPERATIONS:
+        return Response({"message": f"At most {CART_BATCH_MAX_OPERATIONS} operations are allowed per request."}, status=400)
+
+    errors = apply_operations(user_id, operations)
+    stick_to_primary(user_id)
 
     return Response({
-        "message": f"Your cart has {len(cart_items)} items.",
-        "cart": cart_serializer.data,
-        "total_amount": total_amount
+        **cart_contents(user_id),
+        "applied": len(operations) - len(errors),
+        "errors": errors
     })
 
 
+def cart_contents(user_id, summary=False):
+    """
+    Builds the cart payload shared by the cart endpoints. With summary the lines are left out
+    and the totals come from a single aggregate query.
+    """
+    if summary:
+        totals = cart_totals(user_id)
+        if not totals['line_count']:
+            return {"message": "Your cart is empty.", **totals}
+        return {"message": f"Your cart has {totals['line_count']} items.", **totals}
+
+    # One query for the lines, their items and their totals, serialized straight from the row tuples
+    rows = list(priced_lines(user_id).values_list(*CART_LINE_COLUMNS, 'line_total'))
+
+    if not rows:
+        return {"message": "Your cart is empty.", "cart":[], "amount":0}
+
+    return {
+        "message": f"Your cart has {len(rows)} items.",
+        "cart": cart_line_dicts(rows),
+        "total_amount": sum(row[-1] for row in rows)
+    }
+
+
+@idempotent('checkout')
 @api_view(['POST'])
 def checkout(request):
     """
     Processes the user's cart and creates an order.
+    Retries sent with the same Idempotency-Key header get the first response back.
     """
     user_id = request.data.get('user_id')
     discount_code_input = request.data.get('discount_code')
 
-    # Fetch cart items
-    cart_items = Cart.objects.filter(user_id=user_id)
-    if not cart_items.exists():
-        return Response({"message": "Cart is empty."}, status=400)
+    try:
+        order = place_order(user_id, discount_code_input)
+    except CheckoutError as e:
+        return Response({"message": e.message}, status=e.status)
+    stick_to_primary(user_id)
 
-    # Calculate total price
-    total_amount = sum(cart_item.quantity * cart_item.item.price for cart_item in cart_items)
-    discount_amount = 0
-    discount_code = None
+    return Response({
+        "message": "Order placed successfully.",
+        **order
+    })
 
-    # Validate discount code
-    if discount_code_input:
-        try:
-            discount_code = DiscountCode.objects.get(code=discount_code_input, is_valid=True)
-            discount_amount = total_amount * (discount_code.discount_percentage / 100)
-            discount_code.is_valid = False  # Invalidate the code
-            discount_code.save()
-        except DiscountCode.DoesNotExist as e:
-            return Response({"message": "Invalid or expired discount code."}, status=400)
-
-    # Final total
-    final_amount = total_amount - discount_amount
-
-    # Create order
-    order = Order.objects.create(
-        user_id=user_id,
-        total_amount=final_amount,
-        discount_amount=discount_amount,
-        discount_code=discount_code
+ORDER_ORDERING = ('created_at', 'id')
+
+
+def orders_with_items():
+    """
+    Orders with their discount code joined, and their lines and reward codes prefetched
+    in one extra query each.
+    """
+    return Order.objects.select_related('discount_code').prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.order_by('id')),
+        Prefetch('reward_codes', queryset=DiscountCode.objects.order_by('id')),
     )
 
-    # Create order items
-    for cart_item in cart_items:
-        OrderItem.objects.create(
-            order=order,
-            item_id=cart_item.item.item_id,
-            quantity=cart_item.quantity,
-            price=cart_item.item.price
-        )
 
-    # Clear cart
-    cart_items.delete()
+def order_dicts(orders):
+    """
+    Serializes orders fetched with orders_with_items(). The items of all their lines are
+    looked up in one batch through the catalog cache, so the queries do not grow with the page.
+    """
+    item_ids = {line.item_id for order in orders for line in order.items.all()}
+    items = catalog_cache.get_items(item_ids) if item_ids else {}
+    return OrderSerializer(orders, many=True, context={'items': items}).data
+
 
-    # Generate a new discount code for every nth order
-    new_discount_code = None
-    if Order.objects.count() % DEFAULT_DISCOUNT_ORDER_COUNT == 0:
-        new_discount_code = str(uuid.uuid4())[:8].upper()
-        DiscountCode.objects.create(code=new_discount_code)
+@api_view(['GET'])
+def list_orders(request, user_id):
+    """
+    Lists the user's orders with their lines, newest first.
+    Keyset pagination on (created_at, id) with the limit / cursor query parameters.
+    """
+    cursor = request.query_params.get('cursor')
+    try:
+        limit = int(request.query_params.get('limit', ORDER_HISTORY_PAGE_SIZE))
+    except ValueError:
+        limit = 0
+    if not 0 < limit <= ORDER_HISTORY_MAX_PAGE_SIZE:
+        return Response({"message": f"Limit must be between 1 and {ORDER_HISTORY_MAX_PAGE_SIZE}."}, status=400)
+
+    try:
+        orders, next_cursor = keyset_page(
+            orders_with_items().filter(user_id=user_id), ORDER_ORDERING, cursor, limit, descending=True
+        )
+    except InvalidCursor as e:
+        return Response({"message": str(e)}, status=400)
 
     return Response({
-        "message": "Order placed successfully.",
-        "order_id": order.id,
-        "final_amount": final_amount,
-        "new_discount_code": new_discount_code
+        "results": order_dicts(orders),
+        "next_cursor": next_cursor
     })
 
+
+@api_view(['GET'])
+def view_order(request, order_id):
+    """
+    Fetches a single order with its lines.
+    """
+    orders = list(orders_with_items().filter(id=order_id))
+    if not orders:
+        return Response({"message": "Order does not exist."}, status=404)
+    return Response(order_dicts(orders)[0])
+
+
 @api_view(['POST'])
 def generate_discount_code(request):
     """
@@ -176,31 +496,105 @@ def generate_discount_code(request):
     discount_percentage = request.data.get("discount_percentage")
 
     code = str(uuid.uuid4())[:8].upper()  # Generate an 8-character code
-    DiscountCode.objects.create(code=code, is_valid=True, discount_percentage=discount_percentage)
+    with transaction.atomic():
+        DiscountCode.objects.create(code=code, is_valid=True, discount_percentage=discount_percentage)
+        record_discount_codes()
 
     return Response({"message": "Discount code generated.", "code": code})
 
 
+@api_view(['POST'])
+def set_item_stock(request):
+    """
+    Admin endpoint to set the stock of an item, which checkouts then take from.
+    Expects {"item_id": ..., "quantity": ...} and optionally the number of "shards" to split the
+    stock over: more shards let more checkouts of the item run at the same time.
+    """
+    item_id = request.data.get('item_id')
+    try:
+        quantity = int(request.data.get('quantity'))
+        shards = int(request.data.get('shards', INVENTORY_SHARDS))
+    except (TypeError, ValueError):
+        return Response({"message": "Quantity and shards must be integers."}, status=400)
+    if quantity < 0 or shards < 1:
+        return Response({"message": "Quantity cannot be negative and there must be at least one shard."}, status=400)
+
+    item = catalog_cache.get_item(item_id)
+    if item is None:
+        return Response({"message": "Item does not exist."}, status=404)
+
+    set_stock(item, quantity, shards)
+    return Response({
+        "message": f"Stock of '{item.name}' set to {quantity}.",
+        "item_id": item.item_id,
+        "stock": stock_levels([item.pk])[item.pk],
+        "shards": shards
+    })
+
+
+@api_view(['GET'])
+def view_cache_stats(request):
+    """
+    Admin endpoint with the hit and miss counters of this process's catalog cache.
+    """
+    return Response(catalog_cache.stats())
+
+
+@require_GET
+def view_metrics(request):
+    """
+    Request, latency and query metrics of this process in the Prometheus text format.
+    """
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@replica_reads(sticky=False)
 @api_view(['GET'])
 def view_purchase_summary(request):
     """
     Provides a summary of purchases and discounts.
-    Optimized to minimize database queries.
+
+    The totals are read from the StoreStats rollup row, so the cost does not grow with the
+    number of orders. Discount codes are paged by id (limit / cursor query parameters) and
+    the last N daily buckets can be included with ?days=N.
     """
-    # Aggregate total_orders, total_revenue, and total_discount in a single query
-    order_summary = Order.objects.aggregate(
-        total_orders=Count('id'),
-        total_revenue=Sum('total_amount'),
-        total_discount=Sum('discount_amount')
-    )
+    payload, status = purchase_summary(request.query_params)
+    return Response(payload, status=status)
 
-    # Fetch all discount codes in one query
-    discount_codes = DiscountCode.objects.all()
-    discount_code_serializer = DiscountCodeSerializer(discount_codes, many=True)
 
-    return Response({
-        "total_orders": order_summary.get("total_orders", 0),
-        "total_revenue": order_summary.get("total_revenue", 0.0),
-        "total_discount": order_summary.get("total_discount", 0.0),
-        "discount_codes": discount_code_serializer.data
-    })
+def purchase_summary(params):
+    """
+    Builds the purchase summary for the view_purchase_summary query parameters.
+    Returns (payload, status).
+    """
+    cursor = params.get('cursor')
+    try:
+        limit = int(params.get('limit', STATS_DISCOUNT_CODES_PAGE_SIZE))
+        days = int(params.get('days', 0))
+    except ValueError:
+        return {"message": "Limit and days must be integers."}, 400
+    if not 0 < limit <= STATS_DISCOUNT_CODES_MAX_PAGE_SIZE:
+        return {"message": f"Limit must be between 1 and {STATS_DISCOUNT_CODES_MAX_PAGE_SIZE}."}, 400
+
+    totals = get_store_stats()
+
+    try:
+        discount_codes, next_cursor = keyset_page(
+            DiscountCode.objects.values('id', *DISCOUNT_CODE_FIELDS), ('id',), cursor, limit
+        )
+    except InvalidCursor as e:
+        return {"message": str(e)}, 400
+
+    summary = {
+        "total_orders": totals["total_orders"],
+        "total_revenue": totals["total_revenue"],
+        "total_discount": totals["total_discount"],
+        "total_discount_codes": totals["total_discount_codes"],
+        "discount_codes": discount_code_dicts(discount_codes),
+        "next_cursor": next_cursor
+    }
+    if days > 0:
+        summary["daily"] = list(
+            DailyStats.objects.order_by('-date').values('date', *ROLLUP_FIELDS)[:min(days, MAX_STATS_DAYS)]
+        )
+    return summary, 200